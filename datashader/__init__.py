@@ -1,33 +1,77 @@
 from __future__ import absolute_import
 
-from distutils.version import LooseVersion
+import sys
+from importlib import import_module
 
 import param
 __version__ = str(param.version.Version(fpath=__file__, archive_commit="$Format:%h$",reponame="datashader"))
 
-from .core import Canvas                                 # noqa (API import)
-from .reductions import *                                # noqa (API import)
-from .glyphs import Point                                # noqa (API import)
-from .pipeline import Pipeline                           # noqa (API import)
-from . import transfer_functions as tf                   # noqa (API import)
-from . import data_libraries                             # noqa (API import)
+# The public API, mapped to the submodule each name is defined in. Importing
+# these submodules pulls in dask, xarray, numba and other slow to import
+# libraries, so on Python 3.7+ they are only imported when one of their
+# names is first accessed (PEP 562). Older versions import them eagerly.
+_reduction_names = ('_sum_zero', '_upsample', 'any', 'by', 'count',
+                    'count_cat', 'first', 'last', 'max', 'mean', 'min', 'mode',
+                    'quantile', 'std', 'sum', 'summary', 'var')
+
+_lazy_names = dict(Canvas='core', Point='glyphs', Pipeline='pipeline',
+                   **{name: 'reductions' for name in _reduction_names})
+
+_lazy_modules = dict(tf='transfer_functions', data_libraries='data_libraries')
+
+__all__ = sorted(set(_lazy_names) | set(_lazy_modules) |
+                 {'datatypes', 'copy_examples', 'fetch_data', 'examples'})
+
+# Register the Ragged pandas extension dtype, which only needs pandas
+from . import datatypes  # noqa (API import)
+
+
+def __getattr__(name):
+    if name in _lazy_names:
+        value = getattr(import_module('.' + _lazy_names[name], __name__), name)
+    elif name in _lazy_modules:
+        value = import_module('.' + _lazy_modules[name], __name__)
+    elif not name.startswith('_') and _find_spec('.' + name, __name__):
+        # Submodules used to be available as attributes once datashader was
+        # imported, keep them accessible
+        value = import_module('.' + name, __name__)
+    else:
+        raise AttributeError("module {0!r} has no attribute {1!r}"
+                             .format(__name__, name))
+    globals()[name] = value
+    return value
+
+
+def _find_spec(name, package):
+    from importlib.util import find_spec
+    return find_spec(name, package)
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
+
+if sys.version_info < (3, 7):
+    for _name in sorted(_lazy_names) + sorted(_lazy_modules):
+        __getattr__(_name)
+    del _name
 
-# Make RaggedArray pandas extension array available for
-# pandas >= 0.24.0 is installed
-from pandas import __version__ as pandas_version
-if LooseVersion(pandas_version) >= LooseVersion('0.24.0'):
-    from . import datatypes  # noqa (API import)
 
 # make pyct's example/data commands available if possible
-from functools import partial
-try:
-    from pyct.cmd import copy_examples as _copy, fetch_data as _fetch, examples as _examples
-    copy_examples = partial(_copy,'datashader')
-    fetch_data = partial(_fetch,'datashader')
-    examples = partial(_examples,'datashader')
-except ImportError:
-    def _missing_cmd(*args,**kw): return("install pyct to enable this command (e.g. `conda install pyct or `pip install pyct[cmd]`)")
-    _copy = _fetch = _examples = _missing_cmd
-    def err(): raise ValueError(_missing_cmd())
-    fetch_data = copy_examples = examples = err
-del partial, _examples, _copy, _fetch
+def _missing_cmd(*args,**kw): return("install pyct to enable this command (e.g. `conda install pyct or `pip install pyct[cmd]`)")
+
+
+def _pyct_cmd(name):
+    def cmd(*args, **kwargs):
+        try:
+            import pyct.cmd
+        except ImportError:
+            raise ValueError(_missing_cmd())
+        return getattr(pyct.cmd, name)('datashader', *args, **kwargs)
+    cmd.__name__ = name
+    return cmd
+
+
+copy_examples = _pyct_cmd('copy_examples')
+fetch_data = _pyct_cmd('fetch_data')
+examples = _pyct_cmd('examples')
@@ -162,6 +162,13 @@ class InteractiveImage(object):
         process new events without the previous one having
         reported completion. Increase for very long running
         callbacks.
+    progressive: bool
+        If True, the callback returns an iterator of images from
+        coarse to fine, such as ``Pipeline.progressive``, and each
+        image is sent to the plot as soon as it is computed. When
+        only the last image can be used, as for the initial image
+        and in ``update_image``, the callback is passed
+        ``final=True`` and may skip the intermediate images.
     **kwargs
         Any kwargs provided here will be passed to the callback
         function.
@@ -229,7 +236,7 @@ class InteractiveImage(object):
     _callbacks = {}
 
     def __init__(self, bokeh_plot, callback, delay=200, timeout=2000, throttle=None,
-                 **kwargs):
+                 progressive=False, **kwargs):
         warnings.warn('InteractiveImage has been deprecated as of datashader 0.8.0. '
                       'It is not supported in JupyterLab and Bokeh server '
                       'environments. Please use the HoloViews datashader '
@@ -241,6 +248,7 @@ class InteractiveImage(object):
         self.comms_handle = None
         self.delay = delay
         self.timeout = timeout
+        self.progressive = progressive
         if throttle:
             print("Warning: throttle parameter no longer supported; will not be accepted in future versions")
 
@@ -282,7 +290,7 @@ class InteractiveImage(object):
         x_range = (xmin, xmax)
         y_range = (ymin, ymax)
         dw, dh = xmax - xmin, ymax - ymin
-        image = self.callback(x_range, y_range, width, height, **self.kwargs)
+        image = self._final_image(x_range, y_range, width, height)
 
         ds = ColumnDataSource(data=dict(image=[image.data], x=[xmin],
                                         y=[ymin], dw=[dw], dh=[dh]))
@@ -306,9 +314,16 @@ class InteractiveImage(object):
             comm = get_comms(self.ref)
             comm_args = (comm, self.doc) if bokeh_version > '0.12.9' else (comm, self.doc, {})
             self.comms_handle = CommsHandle(*comm_args)
+        comm = self.comms_handle.comms
+        if self.progressive:
+            for image in self._images(ranges):
+                self._set_image(ranges, image)
+                msg = self.get_update_event()
+                if msg is not None:
+                    send_patch(msg, comm)
+            return 'Complete'
         self.update_image(ranges)
         msg = self.get_update_event()
-        comm = self.comms_handle.comms
         send_patch(msg, comm)
         return 'Complete'
 
@@ -324,13 +339,31 @@ class InteractiveImage(object):
         """
         x_range = (ranges['xmin'], ranges['xmax'])
         y_range = (ranges['ymin'], ranges['ymax'])
-        dh = y_range[1] - y_range[0]
-        dw = x_range[1] - x_range[0]
+        image = self._final_image(x_range, y_range, ranges['w'], ranges['h'])
+        self._set_image(ranges, image)
 
-        image = self.callback(x_range, y_range, ranges['w'],
-                              ranges['h'], **self.kwargs)
-        new_data = dict(image=[image.data], x=[x_range[0]],
-                        y=[y_range[0]], dw=[dw], dh=[dh])
+    def _images(self, ranges):
+        x_range = (ranges['xmin'], ranges['xmax'])
+        y_range = (ranges['ymin'], ranges['ymax'])
+        return self.callback(x_range, y_range, ranges['w'],
+                             ranges['h'], **self.kwargs)
+
+    def _final_image(self, x_range, y_range, width, height):
+        if not self.progressive:
+            return self.callback(x_range, y_range, width, height,
+                                 **self.kwargs)
+        images = self.callback(x_range, y_range, width, height, final=True,
+                               **self.kwargs)
+        image = None
+        for image in images:
+            pass
+        return image
+
+    def _set_image(self, ranges, image):
+        dh = ranges['ymax'] - ranges['ymin']
+        dw = ranges['xmax'] - ranges['xmin']
+        new_data = dict(image=[image.data], x=[ranges['xmin']],
+                        y=[ranges['ymin']], dw=[dw], dh=[dh])
         self.ds.data.update(new_data)
 
     def _repr_html_(self):
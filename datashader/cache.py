@@ -0,0 +1,287 @@
+"""
+Size-bounded in-memory caches for intermediate results.
+"""
+from __future__ import absolute_import, division, print_function
+
+import sys
+from collections import OrderedDict
+from threading import RLock
+
+import pandas as pd
+from dask.base import tokenize, is_dask_collection
+
+from .column_store import ColumnStore
+from .utils import Expr
+
+__all__ = ['LRUCache', 'AggregateCache', 'ExtentsCache', 'source_token']
+
+
+class LRUCache(object):
+    """A mapping that evicts its least recently used entries once their
+    total size exceeds ``max_size``.
+
+    Parameters
+    ----------
+    max_size : int
+        Budget for the total size of all entries.
+    sizeof : callable, optional
+        Returns the size of a value. By default every entry has size 1, so
+        ``max_size`` bounds the number of entries.
+
+    Attributes
+    ----------
+    hits, misses, evictions : int
+        Number of lookups that found or missed an entry, and number of entries
+        evicted to stay within budget.
+    size : int
+        Total size of the entries currently held.
+    """
+    def __init__(self, max_size, sizeof=None):
+        self.max_size = max_size
+        self.sizeof = sizeof or (lambda value: 1)
+        self.hits = self.misses = self.evictions = 0
+        self.size = 0
+        self._data = OrderedDict()
+        self._lock = RLock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key, default=None):
+        """Return the value for ``key`` and mark it as most recently used, or
+        ``default`` if there is no such entry."""
+        with self._lock:
+            try:
+                value, size = self._data.pop(key)
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data[key] = (value, size)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """Store ``value`` for ``key``, evicting old entries as needed.
+
+        Values larger than the whole budget are not stored."""
+        size = self.sizeof(value)
+        with self._lock:
+            self.pop(key)
+            if size > self.max_size:
+                return
+            self._data[key] = (value, size)
+            self.size += size
+            while self.size > self.max_size:
+                _, (_, old_size) = self._data.popitem(last=False)
+                self.size -= old_size
+                self.evictions += 1
+
+    def pop(self, key, default=None):
+        """Remove the entry for ``key`` and return its value"""
+        with self._lock:
+            try:
+                value, size = self._data.pop(key)
+            except KeyError:
+                return default
+            self.size -= size
+            return value
+
+    def clear(self):
+        """Remove all entries, keeping the statistics"""
+        with self._lock:
+            self._data.clear()
+            self.size = 0
+
+    def stats(self):
+        """Return a dict of the cache statistics"""
+        return dict(hits=self.hits, misses=self.misses,
+                    evictions=self.evictions, entries=len(self),
+                    size=self.size, max_size=self.max_size)
+
+    def __repr__(self):
+        return '{0}({1})'.format(type(self).__name__, ', '.join(
+            '{0}={1}'.format(k, v) for k, v in self.stats().items()))
+
+
+def _nbytes(agg):
+    if hasattr(agg, 'data_vars'):
+        return sum(v.data.nbytes for v in agg.data_vars.values())
+    return agg.data.nbytes
+
+
+class AggregateCache(LRUCache):
+    """LRU cache of aggregates computed by ``bypixel``.
+
+    Aggregates are keyed by a token of the source (see ``source_token``),
+    the canvas, the glyph and the reduction, and evicted once their total
+    size exceeds ``max_bytes``. Enable it with::
+
+        datashader.core.bypixel.cache = AggregateCache(max_bytes=2**30)
+
+    Cached aggregates are returned as is, so they must not be modified in
+    place. Call ``clear`` after modifying a pandas source in place.
+
+    Parameters
+    ----------
+    max_bytes : int, optional
+        Budget for the total size in bytes of the cached aggregates.
+        Default is 256 MB.
+    """
+    def __init__(self, max_bytes=2**28):
+        super(AggregateCache, self).__init__(max_bytes, sizeof=_nbytes)
+
+    @property
+    def max_bytes(self):
+        return self.max_size
+
+    def key(self, source, canvas, glyph, agg):
+        """Return the cache key of an aggregate, or None if ``source`` can't
+        be tokenized cheaply."""
+        token = source_token(source)
+        if token is None:
+            return None
+        canvas_key = (canvas.plot_width, canvas.plot_height,
+                      canvas.x_range, canvas.y_range,
+                      type(canvas.x_axis).__name__,
+                      type(canvas.y_axis).__name__)
+        return (token, canvas_key, glyph, agg)
+
+
+class ExtentsCache(LRUCache):
+    """LRU cache of the extents glyphs compute to auto-range canvases.
+
+    The ``(min, max)`` of each column is keyed by a token of the source
+    (see ``source_token``) and the column name, so it is shared by every
+    glyph reading the column. Bounds of glyphs that aren't made of column
+    extents are keyed by the glyph instead. Before scanning a column, the
+    extents already known from the source are used: the ranges of a
+    ``SpatialPointsFrame``, the divisions of a Dask frame indexed by the
+    column, and extents passed to ``register``, e.g. those read from
+    Parquet footers by ``datashader.parquet.parquet_extents``.
+
+    The cache used by glyphs is ``Glyph.extents_cache``. Set it to None to
+    always scan the sources.
+
+    Parameters
+    ----------
+    max_entries : int, optional
+        Maximum number of extents held.
+    cache_pandas : bool, optional
+        Whether to cache the extents of pandas frames. pandas frames can be
+        modified in place, and only a fingerprint of their rows is checked
+        (see ``source_token``), so a modification outside the rows
+        fingerprinted would leave stale extents in the cache. Their
+        extents are therefore computed by scanning them unless this is
+        True [default False]. Dask collections and column stores mapped
+        from files are identified by their content and always cached.
+    min_rows : int, optional
+        With ``cache_pandas``, pandas frames with fewer rows are scanned
+        rather than tokenized, as their scan is cheaper than their token.
+    """
+    def __init__(self, max_entries=1024, cache_pandas=False, min_rows=2**16):
+        super(ExtentsCache, self).__init__(max_entries)
+        self.cache_pandas = cache_pandas
+        self.min_rows = min_rows
+
+    def _token(self, source):
+        if isinstance(source, pd.DataFrame) and (
+                not self.cache_pandas or len(source) < self.min_rows):
+            return None
+        return source_token(source)
+
+    def register(self, source, extents):
+        """Record the known ``(min, max)`` extents of columns of ``source``,
+        given as a dict mapping column names to extents."""
+        token = self._token(source)
+        if token is None:
+            raise ValueError("Can't register extents of a {0}"
+                             .format(type(source).__name__))
+        for column, (lo, hi) in extents.items():
+            self.put((token, column), (lo, hi))
+
+    def lookup(self, source, column):
+        """Return the known or cached ``(min, max)`` of ``column`` in
+        ``source``, or None."""
+        known = known_extents(source, column)
+        if known is not None:
+            return known
+        token = self._token(source)
+        return None if token is None else self.get((token, column))
+
+    def store(self, source, key, extents):
+        """Cache the extents of ``source`` for ``key``, a column name or a
+        glyph"""
+        token = self._token(source)
+        if token is not None:
+            self.put((token, key), extents)
+
+    def extents(self, source, key, compute):
+        """Return the cached extents of ``source`` for ``key``, a column name
+        or a glyph, or store and return the result of ``compute()``."""
+        if not isinstance(key, Expr):
+            known = known_extents(source, key)
+            if known is not None:
+                return known
+        token = self._token(source)
+        if token is None:
+            return compute()
+        result = self.get((token, key))
+        if result is None:
+            result = compute()
+            self.put((token, key), result)
+        return result
+
+
+def known_extents(source, column):
+    """Return the ``(min, max)`` of ``column`` in ``source`` if it is known
+    without reading the data, or None."""
+    if 'datashader.spatial.points' in sys.modules:
+        from datashader.spatial.points import SpatialPointsFrame
+        if (isinstance(source, SpatialPointsFrame) and
+                source.spatial is not None):
+            if column == source.spatial.x:
+                return tuple(source.spatial.x_range)
+            if column == source.spatial.y:
+                return tuple(source.spatial.y_range)
+    if is_dask_collection(source) and hasattr(source, 'known_divisions'):
+        if (source.known_divisions and source.index.name == column and
+                column in source.columns):
+            return (source.divisions[0], source.divisions[-1])
+    return None
+
+
+# Number of rows hashed to fingerprint a pandas DataFrame
+fingerprint_rows = 1000
+
+
+def source_token(source):
+    """Return a token identifying the data in ``source``, or None if it
+    can't be computed cheaply.
+
+    Dask collections, and other objects implementing ``__dask_tokenize__``,
+    are identified by their token. Column stores are identified by their
+    ``token``, which is None unless they were mapped from files. pandas
+    DataFrames are identified by a fingerprint made of their identity,
+    shape, columns, dtypes and a hash of ``fingerprint_rows`` rows spread
+    evenly across the frame, so that the token is cheap to compute even for
+    very large frames. Modifications of a frame in place that don't change
+    any of these are not detected.
+    """
+    if isinstance(source, ColumnStore):
+        token = source.token
+        return None if token is None else tokenize(token)
+    elif is_dask_collection(source) or hasattr(source, '__dask_tokenize__'):
+        return tokenize(source)
+    elif isinstance(source, pd.DataFrame):
+        nrows = len(source)
+        step = max(1, nrows // fingerprint_rows)
+        sample = source.iloc[::step]
+        if nrows:
+            sample = pd.concat([sample, source.iloc[-1:]])
+        return tokenize(type(source).__name__, id(source), nrows,
+                        list(source.columns), [str(d) for d in source.dtypes],
+                        sample)
+    return None
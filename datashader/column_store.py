@@ -0,0 +1,173 @@
+"""
+Column stores of NumPy arrays, typically memory-mapped from ``.npy`` files.
+
+A ``ColumnStore`` can be aggregated like a DataFrame without building one:
+the kernels read its columns block by block, so a store memory-mapped from
+files larger than memory is paged in and out by the operating system.
+
+>>> import datashader as ds
+>>> from datashader.column_store import ColumnStore
+>>> store = ColumnStore.from_npy('points_dir')  # doctest: +SKIP
+>>> agg = ds.Canvas().points(store, 'x', 'y')  # doctest: +SKIP
+"""
+from __future__ import absolute_import, division, print_function
+
+import os
+import uuid
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+__all__ = ['ColumnStore']
+
+
+class ColumnStore(object):
+    """A table of equal length 1D NumPy arrays.
+
+    Parameters
+    ----------
+    columns : dict
+        Mapping from column names to arrays, such as ``np.memmap`` arrays or
+        arrays loaded with ``np.load(..., mmap_mode='r')``.
+    categories : dict, optional
+        Mapping from the names of categorical columns to their categories.
+        Categorical columns hold the integer codes of their categories, -1
+        for missing values.
+    """
+    def __init__(self, columns, categories=None):
+        # Keep np.memmap arrays as they are, to keep their filename
+        self._columns = OrderedDict(
+            (name, array if isinstance(array, np.ndarray) else np.asarray(array))
+            for name, array in columns.items())
+        self.categories = dict(categories or {})
+        lengths = set(len(array) for array in self._columns.values())
+        if len(lengths) > 1:
+            raise ValueError('All columns must have the same length')
+        for name, array in self._columns.items():
+            if array.ndim != 1:
+                raise ValueError('Column {0!r} is not one-dimensional'
+                                 .format(name))
+        for name in self.categories:
+            if name not in self._columns:
+                raise ValueError('Categorical column {0!r} not found'
+                                 .format(name))
+            if self._columns[name].dtype.kind not in 'iu':
+                raise ValueError('Categorical column {0!r} must hold integer '
+                                 'codes'.format(name))
+        self._length = lengths.pop() if lengths else 0
+        # The files the columns are read from and the row slices taken of
+        # them, if the store was mapped with ``from_npy``
+        self._files = None
+        self._rows = ()
+
+    @classmethod
+    def from_npy(cls, path, columns=None, categories=None):
+        """Memory-map the ``<column>.npy`` files in directory ``path``.
+
+        Parameters
+        ----------
+        path : str
+            Directory holding one ``.npy`` file per column.
+        columns : list of str, optional
+            Columns to map. Default is every ``.npy`` file of ``path``.
+        categories : dict, optional
+            See ``ColumnStore``.
+        """
+        if columns is None:
+            columns = sorted(name[:-4] for name in os.listdir(path)
+                             if name.endswith('.npy'))
+        files = OrderedDict((name, os.path.abspath(
+            os.path.join(path, name + '.npy'))) for name in columns)
+        store = cls(OrderedDict((name, np.load(filename, mmap_mode='r'))
+                                for name, filename in files.items()),
+                    categories)
+        store._files = OrderedDict((name, _file_stamp(filename))
+                                   for name, filename in files.items())
+        return store
+
+    @property
+    def columns(self):
+        return list(self._columns)
+
+    def __len__(self):
+        return self._length
+
+    def __repr__(self):
+        return 'ColumnStore(columns={0}, rows={1})'.format(self.columns,
+                                                           len(self))
+
+    def __getitem__(self, key):
+        """Return column ``key`` as a pandas Series sharing its memory, or the
+        ``ColumnStore`` of the columns in list ``key``."""
+        if isinstance(key, list):
+            store = ColumnStore(OrderedDict((k, self._columns[k]) for k in key),
+                                dict((k, v) for k, v in self.categories.items()
+                                     if k in key))
+            if self._files is not None:
+                store._files = OrderedDict((k, self._files[k]) for k in key)
+            store._rows = self._rows
+            return store
+        array = self._columns[key]
+        if key in self.categories:
+            return pd.Series(pd.Categorical.from_codes(
+                array, self.categories[key]), name=key)
+        return pd.Series(array, name=key, copy=False)
+
+    @property
+    def values(self):
+        """The columns stacked into a 2D array"""
+        return np.column_stack(list(self._columns.values()))
+
+    @property
+    def iloc(self):
+        """Slice rows with ``store.iloc[start:stop]``, without copying
+        them"""
+        return _RowIndexer(self)
+
+    def head(self, n=5):
+        """Return the first ``n`` rows as a pandas DataFrame"""
+        rows = self.iloc[:n]
+        return pd.DataFrame(OrderedDict((name, rows[name])
+                                        for name in self.columns))
+
+    @property
+    def token(self):
+        """A token identifying the data of a store mapped with ``from_npy``
+        by the path, size and modification time of its files and the rows
+        sliced from them, or None for other stores.
+
+        The arrays of stores built from in-memory arrays can be modified or
+        freed, and their memory reused by new arrays, so they can't be
+        identified without reading them all.
+        """
+        if self._files is None:
+            return None
+        return (type(self).__name__, len(self), list(self._files.items()),
+                sorted(self.categories.items()), self._rows)
+
+    def __dask_tokenize__(self):
+        token = self.token
+        # Stores that can't be identified get a token of their own
+        return uuid.uuid4().hex if token is None else token
+
+
+class _RowIndexer(object):
+    def __init__(self, store):
+        self.store = store
+
+    def __getitem__(self, rows):
+        if not isinstance(rows, slice):
+            raise TypeError('Column stores only support slicing rows')
+        store = self.store
+        sliced = ColumnStore(OrderedDict((name, array[rows]) for name, array
+                                         in store._columns.items()),
+                             store.categories)
+        sliced._files = store._files
+        sliced._rows = store._rows + (rows.indices(len(store)),)
+        return sliced
+
+
+def _file_stamp(filename):
+    stat = os.stat(filename)
+    return (filename, stat.st_size, stat.st_mtime)
@@ -7,11 +7,12 @@ import numpy as np
 import xarray as xr
 
 from .compatibility import _exec
+from .kernel_cache import load_kernel
 from .reductions import by, category_codes, summary
 from .utils import ngjit
 
 
-__all__ = ['compile_components']
+__all__ = ['compile_components', 'base_arrays']
 
 
 @memoize
@@ -57,18 +58,74 @@ def compile_components(agg, schema, glyph, cuda=False):
     calls = [_get_call_tuples(b, d, schema, cuda) for (b, d) in zip(bases, dshapes)]
     # List of unique column names needed
     cols = list(unique(concat(pluck(2, calls))))
+    # Columns only read by the glyph's row filter go first, so categorical
+    # aggregations still find their category column last
+    filter_cols = []
+    if glyph.filter is not None:
+        filter_cols = glyph.filter.preprocess(schema)
+        cols = [c for c in filter_cols if c not in cols] + cols
     # List of temps needed
     temps = list(pluck(3, calls))
 
     create = make_create(bases, dshapes, cuda)
     info = make_info(cols)
-    append = make_append(bases, cols, calls, glyph, isinstance(agg, by))
+    append = make_append(bases, cols, calls, glyph, isinstance(agg, by), cuda,
+                         filter_cols, schema)
     combine = make_combine(bases, dshapes, temps)
     finalize = make_finalize(bases, agg, schema, cuda)
 
     return create, info, append, combine, finalize
 
 
+def base_arrays(agg, base, shape, cuda=False):
+    """Return the tuple of base arrays of the aggregation ``agg`` held by
+    ``base``, in the order used by the functions of ``compile_components``.
+
+    Parameters
+    ----------
+    agg : Aggregation
+    base : DataArray, Dataset or tuple of arrays
+        The finalized output of ``agg``, or its raw base arrays. Finalized
+        outputs are only accepted if every reduction of ``agg`` is computed
+        from a single base array, which is then its output.
+    shape : tuple
+        Shape of the aggregate, ``(height, width)``.
+    """
+    bases = list(unique(concat(r._build_bases(cuda)
+                               for r in traverse_aggregation(agg))))
+    if isinstance(base, (tuple, list)):
+        arrays = tuple(base)
+    else:
+        if isinstance(agg, summary):
+            pairs = [(v, base[k].data) for k, v in zip(agg.keys, agg.values)]
+        else:
+            pairs = [(agg, base.data)]
+        lookup = {}
+        for red, data in pairs:
+            red_bases = red._build_bases(cuda)
+            if (len(red_bases) != 1 or
+                    type(_inner(red_bases[0])) is not type(_inner(red))):
+                raise ValueError(
+                    "The output of reduction {0} can't be used as a base "
+                    "aggregate, pass its raw base arrays or aggregate its "
+                    "components instead".format(type(red).__name__))
+            lookup[red_bases[0]] = data
+        arrays = tuple(lookup[b] for b in bases)
+
+    if len(arrays) != len(bases):
+        raise ValueError('Expected {0} base arrays, got {1}'.format(
+            len(bases), len(arrays)))
+    for a in arrays:
+        if tuple(a.shape[:2]) != tuple(shape):
+            raise ValueError('Base aggregate has shape {0}, expected {1}'
+                             .format(a.shape[:2], shape))
+    return arrays
+
+
+def _inner(red):
+    return red.reduction if isinstance(red, by) else red
+
+
 def traverse_aggregation(agg):
     """Yield a left->right traversal of an aggregation"""
     if isinstance(agg, summary):
@@ -98,7 +155,8 @@ def make_info(cols):
     return lambda df: tuple(c.apply(df) for c in cols)
 
 
-def make_append(bases, cols, calls, glyph, categorical):
+def make_append(bases, cols, calls, glyph, categorical, cuda=False,
+                filter_cols=(), schema=None):
     names = ('_{0}'.format(i) for i in count())
     inputs = list(bases) + list(cols)
     signature = [next(names) for i in inputs]
@@ -141,6 +199,14 @@ def make_append(bases, cols, calls, glyph, categorical):
         aggs = ['{0} = {0}[:, :, cat]'.format(s) for s in signature[:len(calls)]]
         body = [cat_var] + aggs + body
 
+    # Rows failing the glyph's filter are skipped before touching any array
+    if glyph.filter is not None:
+        names = dict((col.column, arg_lk[col] if ndims is None else
+                      '{0}[{1}]'.format(arg_lk[col], subscript))
+                     for col in filter_cols)
+        body = ['if not ({0}):'.format(glyph.filter.condition(schema, names)),
+                '    return'] + body
+
     if ndims is None:
         code = ('def append(x, y, {0}):\n'
                 '    {1}').format(', '.join(signature), '\n    '.join(body))
@@ -148,6 +214,11 @@ def make_append(bases, cols, calls, glyph, categorical):
         code = ('def append({0}, x, y, {1}):\n'
                 '    {2}'
                 ).format(subscript, ', '.join(signature), '\n    '.join(body))
+    # Kernels called from CUDA kernels are compiled for the device on use,
+    # there is nothing to gain from caching their CPU code
+    cached = None if cuda else load_kernel('@_jit\n' + code, 'append', namespace)
+    if cached is not None:
+        return cached
     _exec(code, namespace)
     return ngjit(namespace['append'])
 
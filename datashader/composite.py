@@ -45,18 +45,51 @@ if jit_enabled:
 composite_op_lookup = {}
 
 
-def operator(f):
-    """Define and register a new composite operator"""
+class CompositeOperator(object):
+    """A compositing operator, compiled to a ufunc on ``uint32`` RGBA values
+    the first time it is used.
+
+    Compiling all operators takes a large share of the time needed to import
+    datashader, so it is deferred until an operator is actually called (or
+    its ufunc is requested for use in another jitted function).
+    """
+    def __init__(self, func):
+        self.func = func
+        self.__name__ = func.__name__
+        self.__doc__ = func.__doc__
+        self._ufunc = None
+
+    @property
+    def ufunc(self):
+        """The compiled operator, usable from nopython mode"""
+        if self._ufunc is None:
+            if jit_enabled:
+                ufunc = nb.vectorize(self.func)
+                ufunc._compile_for_argtys((nb.types.uint32, nb.types.uint32))
+                ufunc._frozen = True
+            else:
+                ufunc = np.vectorize(self.func)
+            self._ufunc = ufunc
+        return self._ufunc
+
+    def __call__(self, *args, **kwargs):
+        return self.ufunc(*args, **kwargs)
+
+    def __getattr__(self, attr):
+        # Expose ufunc methods such as reduce and accumulate
+        if attr.startswith('_'):
+            raise AttributeError(attr)
+        return getattr(self.ufunc, attr)
+
+    def __repr__(self):
+        return '<composite operator {0}>'.format(self.__name__)
 
-    if jit_enabled:
-        f2 = nb.vectorize(f)
-        f2._compile_for_argtys((nb.types.uint32, nb.types.uint32))
-        f2._frozen = True
-    else:
-        f2 = np.vectorize(f)
 
-    composite_op_lookup[f.__name__] = f2
-    return f2
+def operator(f):
+    """Define and register a new composite operator"""
+    op = CompositeOperator(f)
+    composite_op_lookup[f.__name__] = op
+    return op
 
 
 @operator
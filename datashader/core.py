@@ -1,5 +1,7 @@
 from __future__ import absolute_import, division, print_function
 
+import copy
+from bisect import bisect_left, bisect_right
 from numbers import Number
 from math import log10
 
@@ -11,11 +13,23 @@ from six import string_types
 from xarray import DataArray, Dataset
 from collections import OrderedDict
 
+try:
+    from collections.abc import Iterator
+except ImportError:
+    from collections import Iterator
+
 from .utils import Dispatcher, ngjit, calc_res, calc_bbox, orient_array, \
     compute_coords, dshape_from_xarray_dataset
 from .utils import get_indices, dshape_from_pandas, dshape_from_dask
+from .utils import dshape_from_arrow
 from .utils import Expr # noqa (API import)
 from .resampling import resample_2d, resample_2d_distributed
+from .column_store import ColumnStore
+from .cache import LRUCache, source_token
+from .parquet import prune_row_groups
+from .compiler import base_arrays, traverse_aggregation
+from .filters import as_filter
+from .pyramid import AggregatePyramid
 from . import reductions as rd
 
 try:
@@ -157,24 +171,36 @@ class Canvas(object):
     x_axis_type, y_axis_type : str, optional
         The type of the axis. Valid options are ``'linear'`` [default], and
         ``'log'``.
+    threads : int, optional
+        Number of threads used to aggregate pandas DataFrames. The rows are
+        split into chunks that are aggregated concurrently into separate
+        buffers, which are then combined. Default is ``None``, aggregating
+        in the calling thread.
     """
     def __init__(self, plot_width=600, plot_height=600,
                  x_range=None, y_range=None,
-                 x_axis_type='linear', y_axis_type='linear'):
+                 x_axis_type='linear', y_axis_type='linear',
+                 threads=None):
         self.plot_width = plot_width
         self.plot_height = plot_height
         self.x_range = None if x_range is None else tuple(x_range)
         self.y_range = None if y_range is None else tuple(y_range)
         self.x_axis = _axis_lookup[x_axis_type]
         self.y_axis = _axis_lookup[y_axis_type]
+        self.threads = threads
 
-    def points(self, source, x=None, y=None, agg=None, geometry=None):
+    def points(self, source, x=None, y=None, agg=None, geometry=None,
+               base=None, sparse=False, x_sorted=None, filter=None,
+               sample=None, inplace=False, random_state=None):
         """Compute a reduction by pixel, mapping data to pixels as points.
 
         Parameters
         ----------
         source : pandas.DataFrame, dask.DataFrame, or xarray.DataArray/Dataset
-            The input datasource.
+            The input datasource. Can also be an ``AggregatePyramid`` of
+            precomputed aggregates, see ``datashader.pyramid``, or an
+            iterator of DataFrames aggregated one chunk at a time, see
+            ``bypixel``.
         x, y : str
             Column names for the x and y coordinates of each point. If provided,
             the geometry argument may not also be provided.
@@ -183,6 +209,43 @@ class Canvas(object):
         geometry: str
             Column name of a PointsArray of the coordinates of each point. If provided,
             the x and y arguments may not also be provided.
+        base : DataArray, Dataset or tuple of arrays, optional
+            An aggregate previously computed on this canvas with the same
+            reduction, to which the rows of ``source`` are added. Requires
+            ``x_range`` and ``y_range`` to be set on the canvas. See
+            ``bypixel`` for details.
+        inplace : bool, optional
+            Add the rows to the arrays of ``base`` in place rather than to a
+            copy of them. See ``bypixel``.
+        sparse : bool, optional
+            If True, accumulate only the pixels that receive data and return
+            an aggregate backed by a ``sparse.COO`` array, for canvases too
+            large to hold dense aggregates. Requires the ``sparse`` package
+            and x and y columns, and supports only the ``count``, ``any``,
+            ``sum`` and ``mean`` reductions (optionally per category with
+            ``by``/``count_cat``, or combined with ``summary``). See
+            ``datashader.sparse_agg`` for details.
+        x_sorted : bool, optional
+            Whether ``x`` is sorted in increasing order, in which case only
+            the rows within ``x_range`` are aggregated. See ``bypixel`` for
+            details.
+        filter : list of tuple or Filter, optional
+            Only aggregate the rows satisfying every ``(column, op, value)``
+            predicate, e.g. ``[('status', '==', 'error'), ('v', '>', 3)]``.
+            Rows are skipped inside the aggregation loop rather than
+            selected beforehand. See ``datashader.filters`` for the
+            supported operators.
+        sample : float, optional
+            Aggregate a stratified random sample of about this fraction of
+            the rows of a pandas or Dask DataFrame, scaling ``count`` and
+            ``sum`` reductions (and their categorical versions) back up.
+            The estimated relative error of the count of rows in each pixel
+            is stored in the ``relative_error`` coordinate of the aggregate.
+            See ``datashader.sampling`` for details.
+        random_state : int or numpy.random.RandomState, optional
+            Seed or random state drawing the rows of ``sample``, so that
+            the same rows are sampled on every call. See
+            ``datashader.sampling.sample_rows``.
         """
         from .glyphs import Point, MultiPointGeometry
         from .reductions import count as count_rdn
@@ -192,6 +255,16 @@ class Canvas(object):
         if agg is None:
             agg = count_rdn()
 
+        if isinstance(source, AggregatePyramid):
+            if (x, y) != (source.x, source.y):
+                raise ValueError('The pyramid aggregates columns {0!r} '
+                                 'and {1!r}'.format(source.x, source.y))
+            if (base is not None or sparse or filter is not None or
+                    sample is not None):
+                raise ValueError('base, sparse, filter and sample are not '
+                                 'supported with aggregate pyramids')
+            return source.aggregate(self, agg)
+
         # Handle down-selecting of SpatialPointsFrame
         if geometry is None:
             import sys
@@ -221,9 +294,31 @@ class Canvas(object):
 
             glyph = MultiPointGeometry(geometry)
 
-        return bypixel(source, self, glyph, agg)
-
-    def line(self, source, x=None, y=None, agg=None, axis=0, geometry=None):
+        glyph.filter = as_filter(filter)
+
+        if sparse:
+            if base is not None or filter is not None or sample is not None:
+                raise ValueError('base, filter and sample are not supported '
+                                 'with sparse=True')
+            from .sparse_agg import sparse_bypixel
+            return sparse_bypixel(source, self, glyph, agg)
+
+        if sample is not None:
+            if base is not None:
+                raise ValueError('base is not supported with sample')
+            from .sampling import (sample_rows, sampled_aggregation,
+                                   scale_aggregate)
+            source, fraction = sample_rows(source, sample, random_state)
+            result = bypixel(source, self, glyph, sampled_aggregation(agg),
+                             x_sorted=x_sorted)
+            return scale_aggregate(agg, result, fraction)
+
+        return bypixel(source, self, glyph, agg, base=base, x_sorted=x_sorted,
+                       inplace=inplace)
+
+    def line(self, source, x=None, y=None, agg=None, axis=0, geometry=None,
+             base=None, x_sorted=None, decimate=False, filter=None,
+             inplace=False):
         """Compute a reduction by pixel, mapping data to pixels as one or
         more lines.
 
@@ -239,7 +334,8 @@ class Canvas(object):
         Parameters
         ----------
         source : pandas.DataFrame, dask.DataFrame, or xarray.DataArray/Dataset
-            The input datasource.
+            The input datasource. Can also be an iterator of DataFrames
+            aggregated one chunk at a time, see ``bypixel``.
         x, y : str or number or list or tuple or np.ndarray
             Specification of the x and y coordinates of each vertex
             * str or number: Column labels in source
@@ -257,6 +353,32 @@ class Canvas(object):
         geometry : str
             Column name of a LinesArray of the coordinates of each line. If provided,
             the x and y arguments may not also be provided.
+        base : DataArray, Dataset or tuple of arrays, optional
+            An aggregate previously computed on this canvas with the same
+            reduction, to which the rows of ``source`` are added. Lines are not
+            joined across batches. Requires
+            ``x_range`` and ``y_range`` to be set on the canvas. See
+            ``bypixel`` for details.
+        inplace : bool, optional
+            Add the rows to the arrays of ``base`` in place rather than to a
+            copy of them. See ``bypixel``.
+        x_sorted : bool, optional
+            Whether ``x`` is sorted in increasing order, in which case only
+            the rows within ``x_range``, and one more on each side, are
+            drawn. Only used with a single line along axis 0. See
+            ``bypixel`` for details.
+        decimate : bool, optional
+            If True, only draw the first, lowest, highest and last vertices
+            of each run of vertices within the same pixel column (M4), which
+            covers the same pixels at a fraction of the cost for dense
+            series. Only supported for a single line along axis 0 with the
+            default ``any()`` reduction. See ``bypixel`` for details.
+        filter : list of tuple or Filter, optional
+            Only draw the segments starting at rows satisfying every ``(column, op, value)``
+            predicate, e.g. ``[('status', '==', 'error'), ('v', '>', 3)]``.
+            Rows are skipped inside the aggregation loop rather than
+            selected beforehand. See ``datashader.filters`` for the
+            supported operators.
 
         Examples
         --------
@@ -397,16 +519,20 @@ See docstring for more information on valid usage""".format(
 The axis argument to Canvas.line must be 0 or 1
     Received: {axis}""".format(axis=axis))
 
-        return bypixel(source, self, glyph, agg)
+        glyph.filter = as_filter(filter)
+        return bypixel(source, self, glyph, agg, base=base, x_sorted=x_sorted,
+                       decimate=decimate, inplace=inplace)
 
-    def area(self, source, x, y, agg=None, axis=0, y_stack=None):
+    def area(self, source, x, y, agg=None, axis=0, y_stack=None, base=None,
+             filter=None, inplace=False):
         """Compute a reduction by pixel, mapping data to pixels as a filled
         area region
 
         Parameters
         ----------
         source : pandas.DataFrame, dask.DataFrame, or xarray.DataArray/Dataset
-            The input datasource.
+            The input datasource. Can also be an iterator of DataFrames
+            aggregated one chunk at a time, see ``bypixel``.
         x, y : str or number or list or tuple or np.ndarray
             Specification of the x and y coordinates of each vertex of the
             line defining the starting edge of the area region.
@@ -431,6 +557,21 @@ The axis argument to Canvas.line must be 0 or 1
 
             If y_stack is not None, then the form of y_stack must match the
             form of y.
+        base : DataArray, Dataset or tuple of arrays, optional
+            An aggregate previously computed on this canvas with the same
+            reduction, to which the rows of ``source`` are added. Areas are not
+            joined across batches. Requires
+            ``x_range`` and ``y_range`` to be set on the canvas. See
+            ``bypixel`` for details.
+        inplace : bool, optional
+            Add the rows to the arrays of ``base`` in place rather than to a
+            copy of them. See ``bypixel``.
+        filter : list of tuple or Filter, optional
+            Only fill the segments starting at rows satisfying every ``(column, op, value)``
+            predicate, e.g. ``[('status', '==', 'error'), ('v', '>', 3)]``.
+            Rows are skipped inside the aggregation loop rather than
+            selected beforehand. See ``datashader.filters`` for the
+            supported operators.
 
         Examples
         --------
@@ -634,7 +775,8 @@ See docstring for more information on valid usage""".format(
 The axis argument to Canvas.line must be 0 or 1
     Received: {axis}""".format(axis=axis))
 
-        return bypixel(source, self, glyph, agg)
+        glyph.filter = as_filter(filter)
+        return bypixel(source, self, glyph, agg, base=base, inplace=inplace)
 
     def polygons(self, source, geometry, agg=None):
         """Compute a reduction by pixel, mapping data to pixels as one or
@@ -1135,9 +1277,12 @@ x- and y-coordinate arrays must have 1 or 2 dimensions.
         """Check that parameter settings are valid for this object"""
         self.x_axis.validate(self.x_range)
         self.y_axis.validate(self.y_range)
+        if self.threads is not None and self.threads < 1:
+            raise ValueError('threads must be a positive integer or None')
 
 
-def bypixel(source, canvas, glyph, agg):
+def bypixel(source, canvas, glyph, agg, base=None, x_sorted=None,
+            decimate=False, inplace=False):
     """Compute an aggregate grouped by pixel sized bins.
 
     Aggregate input data ``source`` into a grid with shape and axis matching
@@ -1146,13 +1291,339 @@ def bypixel(source, canvas, glyph, agg):
 
     Parameters
     ----------
-    source : pandas.DataFrame, dask.DataFrame
-        Input datasource
+    source : pandas.DataFrame, dask.DataFrame, pyarrow.Table or ColumnStore
+        Input datasource. A dict of 1D arrays is aggregated as a
+        ``datashader.column_store.ColumnStore``. An iterator of DataFrames,
+        such as ``pd.read_csv(path, chunksize=...)``, is aggregated one
+        chunk at a time into running base arrays, holding a single chunk in
+        memory. pyarrow record batches, such as those of
+        ``ParquetFile.iter_batches()``, are converted to pandas as they are
+        read. Iterators require ``x_range`` and ``y_range`` to be set on
+        the canvas, otherwise ``source`` can be a function returning a new
+        iterator each time it's called: the ranges are then computed in a
+        first pass over the chunks. Lines and areas are joined across
+        chunks, and the columns read must have the same dtypes in every
+        chunk.
     canvas : Canvas
     glyph : Glyph
     agg : Reduction
+    base : DataArray, Dataset or tuple of arrays, optional
+        Existing aggregate to add the rows of ``source`` to, making the cost
+        of adding a batch of rows proportional to the size of the batch. It
+        can be the result of an earlier call with the same canvas and
+        reduction, if every reduction in ``agg`` is computed from a single
+        base array (``count``, ``any``, ``sum``, ``min``, ``max`` and their
+        categorical versions). Other reductions, such as ``mean``, can be
+        expressed as a ``summary`` of such reductions, or the raw tuple of
+        base arrays can be passed instead. ``canvas`` must have both
+        ``x_range`` and ``y_range`` set. The rows are added to a copy of
+        the base arrays, leaving ``base`` unchanged, unless ``inplace`` is
+        True.
+    x_sorted : bool, optional
+        Whether the x column of a point or line glyph is sorted in
+        increasing order. If it is, and both ``x_range`` and ``y_range``
+        are set on the canvas, only the rows within ``x_range`` (and one
+        more on each side for lines) are aggregated, as found by binary
+        search. Checking whether x is sorted would scan every row, so
+        pandas sources are only pruned if this is True. None [default]
+        prunes Dask sources indexed by x using their divisions. False
+        disables pruning.
+    decimate : bool, optional
+        Reduce each run of consecutive vertices of a single line glyph that
+        fall in the same pixel column to its first, lowest, highest and
+        last vertices (M4) before drawing it, per partition for Dask
+        sources. The line covers the same pixels, so it is only supported
+        with the ``any()`` reduction, which then gives identical results.
+    inplace : bool, optional
+        Add the rows to the base arrays of ``base`` in place, saving a copy
+        of them per call when streaming batches of rows into an aggregate.
+        Only the returned aggregate should then be used afterwards, and
+        ``base`` must not be an aggregate held by ``bypixel.cache``.
+
+    Aggregates are looked up in and stored into ``bypixel.cache`` if it is
+    set to an ``AggregateCache``. It is None by default, and iterators are
+    never cached.
     """
+    if isinstance(source, Iterator) or callable(source):
+        return _bypixel_chunks(source, canvas, glyph, agg, base=base,
+                               x_sorted=x_sorted, decimate=decimate,
+                               inplace=inplace)
+
+    if base is not None:
+        if canvas.x_range is None or canvas.y_range is None:
+            raise ValueError('x_range and y_range must be set on the canvas '
+                             'to add rows to a base aggregate')
+        shape = (canvas.plot_height, canvas.plot_width)
+        bases = base_arrays(agg, base, shape)
+        if not inplace:
+            bases = tuple(b.copy() for b in bases)
+        return _bypixel(source, canvas, glyph, agg, base=bases,
+                        x_sorted=x_sorted, decimate=decimate)
+
+    cache = bypixel.cache
+    key = None if cache is None else cache.key(source, canvas, glyph, agg)
+    if key is not None:
+        result = cache.get(key)
+        if result is None:
+            result = _bypixel(source, canvas, glyph, agg, x_sorted=x_sorted,
+                              decimate=decimate)
+            cache.put(key, result)
+        return result
+    return _bypixel(source, canvas, glyph, agg, x_sorted=x_sorted,
+                    decimate=decimate)
+
+
+def _bypixel(source, canvas, glyph, agg, base=None, x_sorted=None,
+             decimate=False):
+    source, schema = _bypixel_source(source, canvas, glyph, agg, x_sorted,
+                                     decimate)
+
+    # All-NaN objects (e.g. chunks of arrays with no data) are valid in Datashader
+    with np.warnings.catch_warnings():
+        np.warnings.filterwarnings('ignore', r'All-NaN (slice|axis) encountered')
+        if base is None:
+            return bypixel.pipeline(source, schema, canvas, glyph, agg)
+        return bypixel.pipeline(source, schema, canvas, glyph, agg, base=base)
+
 
+def bypixel_many(source, views, x_sorted=False):
+    """Compute the aggregates of several views of the same source.
+
+    The aggregate of each ``(canvas, glyph, agg)`` view is the one computed
+    by ``bypixel(source, canvas, glyph, agg)``, for instance for an
+    overview, a detail view and a minimap of the same points. The rows of
+    pandas DataFrames are aggregated block by block, each block being
+    aggregated by every view while its columns are in the CPU caches, so
+    that the source is read from memory once rather than once per view.
+    The blocks are aggregated on a single thread, whatever the ``threads``
+    of the canvases. Other sources are aggregated for each view in turn.
+
+    Parameters
+    ----------
+    source : pandas.DataFrame, dask.DataFrame, pyarrow.Table or ColumnStore
+        Input datasource, see ``bypixel``.
+    views : list of tuple
+        The ``(canvas, glyph, agg)`` views to aggregate.
+    x_sorted : bool, optional
+        Whether the x columns of point and line glyphs are sorted, see
+        ``bypixel``.
+
+    Returns
+    -------
+    list
+        The aggregate of each view, looked up in and stored into
+        ``bypixel.cache`` if it is set.
+    """
+    views = [tuple(view) for view in views]
+    for view in views:
+        if len(view) != 3:
+            raise ValueError('views must be (canvas, glyph, agg) tuples, '
+                             'got {0!r}'.format(view))
+    if not (isinstance(source, pd.DataFrame) and len(views) > 1):
+        return [bypixel(source, canvas, glyph, agg, x_sorted=x_sorted)
+                for canvas, glyph, agg in views]
+
+    cache = bypixel.cache
+    results = [None] * len(views)
+    keys = [None] * len(views)
+    missing = []
+    for i, (canvas, glyph, agg) in enumerate(views):
+        if cache is not None:
+            keys[i] = cache.key(source, canvas, glyph, agg)
+            if keys[i] is not None:
+                results[i] = cache.get(keys[i])
+        if results[i] is None:
+            missing.append(i)
+
+    if missing:
+        from .data_libraries.pandas import views_pipeline
+        prepared = []
+        for i in missing:
+            canvas, glyph, agg = views[i]
+            df, schema = _bypixel_source(source, canvas, glyph, agg, x_sorted)
+            prepared.append((df, schema, canvas, glyph, agg))
+        with np.warnings.catch_warnings():
+            np.warnings.filterwarnings('ignore',
+                                       r'All-NaN (slice|axis) encountered')
+            aggs = views_pipeline(prepared)
+        for i, result in zip(missing, aggs):
+            results[i] = result
+            if keys[i] is not None:
+                cache.put(keys[i], result)
+    return results
+
+
+def _bypixel_chunks(chunks, canvas, glyph, agg, base=None, x_sorted=None,
+                    decimate=False, inplace=False):
+    """Aggregate the DataFrames yielded by the iterator ``chunks``, or by
+    the iterator it returns if it's a function, see ``bypixel``."""
+    for result in iter_bypixel(chunks, canvas, glyph, agg, base=base,
+                               x_sorted=x_sorted, decimate=decimate,
+                               progressive=False, inplace=inplace):
+        pass
+    return result
+
+
+def iter_bypixel(chunks, canvas, glyph, agg, base=None, x_sorted=None,
+                 decimate=False, progressive=True, inplace=False):
+    """Aggregate the DataFrames yielded by the iterator ``chunks`` one at a
+    time, yielding the aggregate of the rows read so far after each chunk.
+
+    Intermediate aggregates are copies, that are not updated by later
+    chunks. ``chunks`` and the other arguments are as for ``bypixel``:
+    ``chunks`` can be a function returning a new iterator, in which case
+    ranges missing from ``canvas`` are computed in a first pass.
+
+    Parameters
+    ----------
+    progressive : bool or callable, optional
+        If False, only the final aggregate is yielded. If a callable, it is
+        called with the number of chunks aggregated so far after each
+        chunk, and the aggregate is only copied and yielded if it returns
+        True, the final aggregate being yielded after the last chunk.
+    """
+    from .compiler import compile_components
+    from .data_libraries.pandas import _connected_glyphs, _threaded_extend
+
+    if decimate or any(isinstance(red, rd.by) and red.top_k is not None
+                       for red in traverse_aggregation(agg)):
+        raise ValueError('decimate and top_k are not supported for '
+                         'iterators of chunks')
+    if canvas.x_range is None or canvas.y_range is None:
+        if base is not None:
+            raise ValueError('x_range and y_range must be set on the canvas '
+                             'to add rows to a base aggregate')
+        if not callable(chunks):
+            raise ValueError('x_range and y_range must be set on the canvas '
+                             'to aggregate an iterator of chunks, or pass a '
+                             'function returning a new iterator to compute '
+                             'them in a first pass')
+        canvas = _chunk_ranges(chunks(), canvas, glyph, agg)
+    if callable(chunks):
+        chunks = chunks()
+
+    # Pruning the ends of chunks would break the lines joining them
+    connected = isinstance(glyph, _connected_glyphs)
+    if connected:
+        x_sorted = False
+
+    width, height = canvas.plot_width, canvas.plot_height
+    x_st = canvas.x_axis.compute_scale_and_translate(canvas.x_range, width)
+    y_st = canvas.y_axis.compute_scale_and_translate(canvas.y_range, height)
+    vt = x_st + y_st
+    bounds = canvas.x_range + canvas.y_range
+    threads = getattr(canvas, 'threads', None)
+    coords = OrderedDict([
+        (glyph.x_label, canvas.x_axis.compute_index(x_st, width)),
+        (glyph.y_label, canvas.y_axis.compute_index(y_st, height))])
+    dims = [glyph.y_label, glyph.x_label]
+
+    if callable(progressive):
+        snapshot = progressive
+    else:
+        progressive = bool(progressive)
+        snapshot = lambda nchunks: False
+
+    schema = None
+    previous = None
+    nchunks = 0
+    for chunk in chunks:
+        chunk, chunk_schema = _bypixel_source(_as_frame(chunk), canvas,
+                                              glyph, agg, x_sorted)
+        if schema is None:
+            schema = chunk_schema
+            create, info, append, combine, finalize = \
+                compile_components(agg, schema, glyph, False)
+            extend = glyph._build_extend(canvas.x_axis.mapper,
+                                         canvas.y_axis.mapper, info, append)
+            if base is None:
+                bases = create((height, width))
+            else:
+                bases = base_arrays(agg, base, (height, width))
+                if not inplace:
+                    bases = tuple(b.copy() for b in bases)
+        elif chunk_schema != schema:
+            raise ValueError('The columns of all chunks must have the same '
+                             'dtypes, got {0} and then {1}. Pass dtype to '
+                             'read_csv, with a CategoricalDtype for '
+                             'categorical columns'
+                             .format(schema, chunk_schema))
+        if not len(chunk):
+            pass
+        elif not connected:
+            if threads and threads > 1:
+                results = _threaded_extend(glyph, create, extend, combine,
+                                           chunk, (height, width), vt, bounds,
+                                           threads)
+                for b, r in zip(bases, combine([bases, results])):
+                    b[...] = r
+            else:
+                extend(bases, chunk, vt, bounds)
+        else:
+            if previous is None:
+                extend(bases, chunk, vt, bounds)
+            else:
+                # Draw the segment joining the last row of the previous chunk
+                # to the first row of this one
+                joint = pd.concat([previous, chunk.iloc[:1]])
+                extend(bases, joint, vt, bounds, plot_start=False)
+                extend(bases, chunk, vt, bounds, plot_start=False)
+            # Copy the last row, so that the previous chunk can be freed
+            previous = chunk.iloc[-1:].copy()
+        nchunks += 1
+        if progressive is True or snapshot(nchunks):
+            yield _finalize_chunks(finalize, tuple(b.copy() for b in bases),
+                                   coords, dims)
+    if schema is None:
+        raise ValueError('The iterator of chunks is empty')
+    if progressive is not True:
+        yield _finalize_chunks(finalize, bases, coords, dims)
+
+
+def _finalize_chunks(finalize, bases, coords, dims):
+    # All-NaN objects (e.g. chunks of arrays with no data) are valid in Datashader
+    with np.warnings.catch_warnings():
+        np.warnings.filterwarnings('ignore', r'All-NaN (slice|axis) encountered')
+        return finalize(bases, cuda=False, coords=coords, dims=dims)
+
+
+def _chunk_ranges(chunks, canvas, glyph, agg):
+    """Return a copy of ``canvas`` with its missing ranges set to the union
+    of the bounds of the glyph in the DataFrames yielded by ``chunks``."""
+    x_bounds, y_bounds = [], []
+    for chunk in chunks:
+        chunk, _ = _bypixel_source(_as_frame(chunk), canvas, glyph, agg,
+                                   x_sorted=False)
+        if len(chunk):
+            x_bounds.append(glyph.compute_x_bounds(chunk))
+            y_bounds.append(glyph.compute_y_bounds(chunk))
+    if not x_bounds:
+        raise ValueError('The iterator of chunks is empty')
+    ranges = copy.copy(canvas)
+    if ranges.x_range is None:
+        ranges.x_range = (min(b[0] for b in x_bounds),
+                          max(b[1] for b in x_bounds))
+    if ranges.y_range is None:
+        ranges.y_range = (min(b[0] for b in y_bounds),
+                          max(b[1] for b in y_bounds))
+    return ranges
+
+
+def _as_frame(chunk):
+    if isinstance(chunk, pd.DataFrame):
+        return chunk
+    if _is_arrow_table(chunk) or type(chunk).__name__ == 'RecordBatch':
+        return chunk.to_pandas()
+    raise ValueError('Iterators must yield pandas DataFrames or pyarrow '
+                     'record batches, got {0}'.format(type(chunk).__name__))
+
+
+def _bypixel_source(source, canvas, glyph, agg, x_sorted=None,
+                    decimate=False):
+    """Convert ``source`` to a DataFrame (or multi-dimensional Dataset)
+    holding only the rows (see ``bypixel``) needed, validate the
+    aggregation and return the converted source along with the schema of
+    the columns needed."""
     # Convert 1D xarray DataArrays and DataSets into Dask DataFrames
     if isinstance(source, DataArray) and source.ndim == 1:
         if not source.name:
@@ -1166,47 +1637,247 @@ def bypixel(source, canvas, glyph, agg):
 
     if (isinstance(source, pd.DataFrame) or
             (cudf and isinstance(source, cudf.DataFrame))):
+        source = _prune_sorted(source, canvas, glyph, x_sorted)
+        if decimate:
+            source = _decimate_line(source, canvas, glyph, agg)
+        source = _top_categories(source, agg)
         # Avoid datashape.Categorical instantiation bottleneck
-        # by only retaining the necessary columns:
+        # by only describing the necessary columns:
         # https://github.com/bokeh/datashader/issues/396
-        # Preserve column ordering without duplicates
+        # Preserve column ordering without duplicates. The frame itself
+        # isn't trimmed, which would copy the columns and give it a new
+        # identity for the extents cache.
         cols_to_keep = _cols_to_keep(source.columns, glyph, agg)
-        if len(cols_to_keep) < len(source.columns):
-            source = source[cols_to_keep]
-        dshape = dshape_from_pandas(source)
+        dshape = dshape_from_pandas(source, cols_to_keep)
     elif isinstance(source, dd.DataFrame):
+        # Before deriving other frames, which have no row group statistics
+        source = prune_row_groups(source, canvas, glyph)
+        source = _prune_sorted(source, canvas, glyph, x_sorted)
+        if decimate:
+            source = _decimate_line(source, canvas, glyph, agg)
+        source = _top_categories(source, agg)
         dshape = dshape_from_dask(source)
     elif isinstance(source, Dataset):
         # Multi-dimensional Dataset
         dshape = dshape_from_xarray_dataset(source)
+    elif isinstance(source, (ColumnStore, dict)):
+        if decimate or any(isinstance(red, rd.by) and red.top_k is not None
+                           for red in traverse_aggregation(agg)):
+            raise ValueError('decimate and top_k are not supported for '
+                             'column stores')
+        if isinstance(source, dict):
+            source = ColumnStore(source)
+        # As for pandas, only the needed columns are described
+        cols_to_keep = _cols_to_keep(source.columns, glyph, agg)
+        dshape = len(source) * dshape_from_pandas(source.head(0),
+                                                  cols_to_keep).measure
+    elif _is_arrow_table(source):
+        if decimate or any(isinstance(red, rd.by) and red.top_k is not None
+                           for red in traverse_aggregation(agg)):
+            raise ValueError('decimate and top_k are not supported for '
+                             'Arrow sources')
+        # Selecting columns doesn't copy them, unifying the dictionaries of
+        # the chunks of dictionary encoded columns gives consistent codes
+        cols_to_keep = _cols_to_keep(source.column_names, glyph, agg)
+        source = source.select(cols_to_keep).unify_dictionaries()
+        dshape = dshape_from_arrow(source)
     else:
         raise ValueError("source must be a pandas or dask DataFrame")
     schema = dshape.measure
     glyph.validate(schema)
+    if glyph.filter is not None:
+        glyph.filter.validate(schema)
     agg.validate(schema)
     canvas.validate()
+    return source, schema
+
+
+def _is_arrow_table(source):
+    import sys
+    return ('pyarrow' in sys.modules and
+            isinstance(source, sys.modules['pyarrow'].Table))
+
+
+def _prune_sorted(source, canvas, glyph, x_sorted):
+    """Return the rows of ``source`` that can be drawn within the x range of
+    ``canvas`` when the x column of ``glyph`` is sorted, see ``bypixel``."""
+    from .glyphs import Point, LineAxis0
+
+    if (x_sorted is False or type(glyph) not in (Point, LineAxis0) or
+            canvas.x_range is None or canvas.y_range is None):
+        return source
+    # Segments of lines ending or starting outside the range may cross it
+    pad = 1 if isinstance(glyph, LineAxis0) else 0
+    x0, x1 = canvas.x_range
+
+    if isinstance(source, dd.DataFrame):
+        if not (source.known_divisions and source.index.name == glyph.x):
+            return source
+        divisions = source.divisions
+        start = bisect_left(divisions[1:], x0)
+        stop = bisect_right(divisions[:-1], x1)
+        nparts = source.npartitions
+        start = min(max(start - pad, 0), nparts - 1)
+        stop = min(max(stop + pad, start + 1), nparts)
+        if start == 0 and stop == nparts:
+            return source
+        return source.partitions[start:stop]
+
+    if not isinstance(source, pd.DataFrame) or x_sorted is not True:
+        return source
+    xs = source[glyph.x].values
+    start = max(xs.searchsorted(x0, 'left') - pad, 0)
+    stop = min(xs.searchsorted(x1, 'right') + pad, len(xs))
+    if start == 0 and stop == len(xs):
+        return source
+    return source.iloc[start:stop]
+
+
+def _decimate_line(source, canvas, glyph, agg):
+    """Drop the vertices of the line drawn by ``glyph`` that don't change
+    the pixels it covers, see ``bypixel``."""
+    from .glyphs import LineAxis0
+    from .glyphs.line import m4_indices
+
+    if type(glyph) is not LineAxis0:
+        raise ValueError('decimate is only supported for a single line '
+                         'along axis 0')
+    if type(agg) is not rd.any or agg.column is not None:
+        raise ValueError('decimate is only supported with the any() '
+                         'reduction, as it changes how often pixels are hit')
+    if glyph.filter is not None:
+        raise ValueError('decimate is not supported with a filter, as it '
+                         'changes which segments start at filtered rows')
+    if not isinstance(source, (pd.DataFrame, dd.DataFrame)):
+        return source
+
+    width = canvas.plot_width
+    x_range = canvas.x_range
+    if x_range is None:
+        if isinstance(source, dd.DataFrame):
+            x_range = glyph.compute_bounds_dask(source)[0]
+        else:
+            x_range = glyph.compute_x_bounds(source)
+    sx, tx = canvas.x_axis.compute_scale_and_translate(x_range, width)
+    log = isinstance(canvas.x_axis, LogAxis)
+
+    def decimate(df):
+        xs = np.asarray(df[glyph.x].values, dtype='f8')
+        ys = np.asarray(df[glyph.y].values, dtype='f8')
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # Pixel columns, as mapped when drawing; vertices outside the
+            # x range are never drawn between themselves
+            cols = np.clip(np.floor((np.log10(xs) if log else xs) * sx + tx),
+                           0, width - 1)
+            cols[xs < x_range[0]] = -1
+            cols[xs > x_range[1]] = width
+        # Vertices with missing coordinates break the line, keep them
+        cols[np.isnan(xs) | np.isnan(ys)] = np.nan
+        index = m4_indices(cols, ys)
+        return df if len(index) == len(df) else df.iloc[index]
+
+    if isinstance(source, dd.DataFrame):
+        return source.map_partitions(decimate, meta=source._meta)
+    return decimate(source)
+
+
+def _top_categories(source, agg):
+    """Merge all but the most frequent categories of the categorical columns
+    of ``by`` reductions that set ``top_k`` into their ``other`` category.
+
+    The categories kept retain their order, followed by ``other``. Columns
+    with at most ``top_k`` categories are left as they are. The codes of
+    the columns are remapped through a lookup table into a shallow copy of
+    the source, which shares its other columns. Counting the categories
+    takes one pass over the column, which is computed right away for Dask
+    sources, so the remapped source is kept in ``_top_categories.cache``,
+    keyed by the token of the source (see ``cache.source_token``), and
+    reused by later aggregations.
+    """
+    tops = OrderedDict()
+    for red in traverse_aggregation(agg):
+        if isinstance(red, rd.by) and red.top_k is not None:
+            top = tops.setdefault(red.cat_column, (red.top_k, red.other))
+            if top != (red.top_k, red.other):
+                raise ValueError('Conflicting top_k or other for categorical '
+                                 'column {0!r}'.format(red.cat_column))
+    if not tops:
+        return source
+
+    cache = _top_categories.cache
+    token = None if cache is None else source_token(source)
+    key = None if token is None else (token, tuple(tops.items()))
+    if key is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
+    result = source
+    for column, (top_k, other) in tops.items():
+        col = source[column]
+        cats = list(col.cat.categories)
+        if len(cats) <= top_k:
+            continue
+        counts = col.value_counts()
+        if isinstance(counts, dd.Series):
+            counts = counts.compute()
+        top = set(counts.index[:top_k])
+        keep = [c for c in cats if c in top and c != other]
+        # Codes of the categories kept, or of other, by code, and -1 for
+        # missing values in the last entry
+        lookup = np.full(len(cats) + 1, len(keep),
+                         dtype=col.cat.codes.dtype)
+        for i, c in enumerate(keep):
+            lookup[cats.index(c)] = i
+        lookup[-1] = -1
+        dtype = pd.api.types.CategoricalDtype(keep + [other],
+                                              ordered=col.cat.ordered)
+        if isinstance(result, dd.DataFrame):
+            meta = _remap_categories(result._meta, column, lookup, dtype)
+            result = result.map_partitions(_remap_categories, column,
+                                           lookup, dtype, meta=meta)
+        else:
+            result = _remap_categories(result, column, lookup, dtype)
+
+    if key is not None:
+        cache.put(key, result)
+    return result
 
-    # All-NaN objects (e.g. chunks of arrays with no data) are valid in Datashader
-    with np.warnings.catch_warnings():
-        np.warnings.filterwarnings('ignore', r'All-NaN (slice|axis) encountered')
-        return bypixel.pipeline(source, schema, canvas, glyph, agg)
+
+# Sources with their top categories merged, see _top_categories
+_top_categories.cache = LRUCache(max_size=8)
+
+
+def _remap_categories(df, column, lookup, dtype):
+    """Return a shallow copy of ``df`` with the codes of the categorical
+    ``column`` mapped through ``lookup`` to the categories of ``dtype``."""
+    codes = lookup[df[column].cat.codes.values]
+    df = df.copy(deep=False)
+    df[column] = pd.Categorical.from_codes(codes, dtype=dtype)
+    return df
 
 
 def _cols_to_keep(columns, glyph, agg):
     cols_to_keep = OrderedDict({col: False for col in columns})
     for col in glyph.required_columns():
         cols_to_keep[col] = True
-
-    if hasattr(agg, 'values'):
-        for subagg in agg.values:
-            if subagg.column is not None:
-                cols_to_keep[subagg.column] = True
-    elif hasattr(agg, 'columns'):
-        for column in agg.columns:
+    if glyph.filter is not None:
+        for col in glyph.filter.columns:
+            if col not in columns:
+                raise ValueError("filter column {0!r} not found".format(col))
+            cols_to_keep[col] = True
+
+    # Columns read by the reductions, including the values of categorical
+    # reductions and the order columns of first and last. Missing order
+    # columns can't be described, so they are reported here.
+    for red in traverse_aggregation(agg):
+        order = getattr(red, 'order', None)
+        if order is not None and order not in columns:
+            raise ValueError("specified order column not found")
+    for inp in agg.inputs:
+        for column in getattr(inp, 'columns', [inp.column]):
             if column is not None:
                 cols_to_keep[column] = True
-    elif agg.column is not None:
-        cols_to_keep[agg.column] = True
     return [col for col, keepit in cols_to_keep.items() if keepit]
 
 
@@ -1224,3 +1895,34 @@ def _broadcast_column_specifications(*args):
 
 
 bypixel.pipeline = Dispatcher()
+bypixel.cache = None
+
+
+# The pipeline for each data library is registered when its module in
+# datashader.data_libraries is imported, which happens the first time a
+# source from that library is aggregated.
+@bypixel.pipeline.register_lazy('pandas')
+@bypixel.pipeline.register_lazy('xarray')
+@bypixel.pipeline.register_lazy('dask')
+def _register_data_libraries():
+    from . import data_libraries  # noqa (registers pipelines)
+
+
+@bypixel.pipeline.register_lazy('cudf')
+def _register_cudf():
+    from .data_libraries import cudf  # noqa (registers pipeline)
+
+
+@bypixel.pipeline.register_lazy('datashader')
+def _register_column_store():
+    from .data_libraries import column_store  # noqa (registers pipeline)
+
+
+@bypixel.pipeline.register_lazy('pyarrow')
+def _register_arrow():
+    from .data_libraries import arrow  # noqa (registers pipeline)
+
+
+@bypixel.pipeline.register_lazy('dask_cudf')
+def _register_dask_cudf():
+    from .data_libraries import dask_cudf  # noqa (registers pipeline)
@@ -6,13 +6,5 @@ try:
 except ImportError:
     pass
 
-try:
-    import cudf as _cudf  # noqa (Test cudf installed)
-    import cupy as _cupy  # noqa (Test cupy installed)
-    from . import cudf    # noqa (API import)
-
-    import dask_cudf as _dask_cudf  # noqa (Test dask_cudf installed)
-    from . import dask_cudf         # noqa (API import)
-
-except Exception:
-    pass
+# The cudf and dask_cudf modules import their (slow to import) libraries, so
+# they are only imported when a source of their type is first aggregated.
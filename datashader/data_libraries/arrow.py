@@ -0,0 +1,148 @@
+"""
+Aggregation of pyarrow Tables without converting them to pandas.
+
+The kernels read NumPy views of the Arrow buffers of each record batch of
+the table in turn, so a table memory-mapped from an Arrow IPC file is
+aggregated without copying it. Only the columns of batches with nulls,
+which have to be filled with NaN (or -1 for the codes of dictionary
+encoded columns), and boolean columns, which Arrow packs into bits, are
+copied, one batch at a time.
+"""
+from __future__ import absolute_import, division
+
+from collections import OrderedDict
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from datashader.core import bypixel
+from datashader.compiler import compile_components
+from datashader.glyphs import Glyph, Point, LineAxis0, LineAxis0Multi
+
+__all__ = ()
+
+
+# Glyphs whose bounds are the extents of their x and y columns
+_glyphs = (Point, LineAxis0, LineAxis0Multi)
+
+
+@bypixel.pipeline.register(pa.Table)
+def arrow_pipeline(table, schema, canvas, glyph, summary, base=None):
+    if type(glyph) not in _glyphs:
+        raise ValueError('Arrow sources are only supported for points and '
+                         'lines along axis 0')
+    create, info, append, combine, finalize = \
+        compile_components(summary, schema, glyph, False)
+    x_mapper = canvas.x_axis.mapper
+    y_mapper = canvas.y_axis.mapper
+    extend = glyph._build_extend(x_mapper, y_mapper, info, append)
+
+    x_range = canvas.x_range or _bounds(table, glyph.x)
+    y_range = canvas.y_range or _bounds(table, glyph.y)
+
+    width = canvas.plot_width
+    height = canvas.plot_height
+
+    x_st = canvas.x_axis.compute_scale_and_translate(x_range, width)
+    y_st = canvas.y_axis.compute_scale_and_translate(y_range, height)
+
+    x_axis = canvas.x_axis.compute_index(x_st, width)
+    y_axis = canvas.y_axis.compute_index(y_st, height)
+
+    vt = x_st + y_st
+    bounds = x_range + y_range
+    bases = create((height, width)) if base is None else base
+    previous = None
+    for batch in table.to_batches():
+        if not batch.num_rows:
+            continue
+        if isinstance(glyph, Point):
+            extend(bases, ArrowFrame(batch), vt, bounds)
+            continue
+        if previous is not None:
+            # Draw the segment joining the last row of the previous batch to
+            # the first row of this one
+            joint = pa.Table.from_batches(
+                [previous.slice(previous.num_rows - 1), batch.slice(0, 1)]
+            ).combine_chunks().to_batches()[0]
+            extend(bases, ArrowFrame(joint), vt, bounds, plot_start=False)
+        extend(bases, ArrowFrame(batch), vt, bounds,
+               plot_start=previous is None)
+        previous = batch
+
+    return finalize(bases,
+                    cuda=False,
+                    coords=OrderedDict([(glyph.x_label, x_axis),
+                                        (glyph.y_label, y_axis)]),
+                    dims=[glyph.y_label, glyph.x_label])
+
+
+def _bounds(table, columns):
+    if not isinstance(columns, (list, tuple)):
+        columns = [columns]
+    mins, maxes = [], []
+    for column in columns:
+        extents = pc.min_max(table.column(column))
+        if extents['min'].is_valid:
+            mins.append(extents['min'].as_py())
+            maxes.append(extents['max'].as_py())
+    if not mins:
+        return Glyph.maybe_expand_bounds((np.nan, np.nan))
+    return Glyph.maybe_expand_bounds((min(mins), max(maxes)))
+
+
+class ArrowFrame(object):
+    """The columns of a ``pyarrow.RecordBatch`` as NumPy arrays, behind the
+    part of the DataFrame interface read by the aggregation kernels:
+    ``frame[column].values`` and ``frame[column].cat.codes.values``."""
+    def __init__(self, batch):
+        self.batch = batch
+        self.columns = batch.schema.names
+
+    def __len__(self):
+        return self.batch.num_rows
+
+    def __getitem__(self, key):
+        if isinstance(key, list):
+            return _Values(np.column_stack([self[k].values for k in key]))
+        return ArrowColumn(self.batch.column(self.columns.index(key)))
+
+
+class _Values(object):
+    def __init__(self, values):
+        self.values = values
+
+
+class ArrowColumn(object):
+    """A column of an ``ArrowFrame``. Dictionary encoded columns are read
+    as their codes, also through ``column.cat.codes``."""
+    def __init__(self, array):
+        self.array = array
+
+    @property
+    def cat(self):
+        return self
+
+    @property
+    def codes(self):
+        return self
+
+    @property
+    def values(self):
+        return arrow_to_numpy(self.array)
+
+
+def arrow_to_numpy(array):
+    """Return the values of a ``pyarrow.Array`` as a NumPy array, a view of
+    its data buffer if it has no nulls. Nulls are filled with NaN, or -1 for
+    the codes of dictionary encoded arrays."""
+    if pa.types.is_dictionary(array.type):
+        codes = array.indices
+        if codes.null_count:
+            codes = codes.fill_null(-1)
+        return codes.to_numpy(zero_copy_only=True)
+    if array.null_count == 0 and not pa.types.is_boolean(array.type):
+        return array.to_numpy(zero_copy_only=True)
+    # Copies, converting integers with nulls to floats with NaN
+    return array.to_numpy(zero_copy_only=False)
@@ -0,0 +1,69 @@
+from __future__ import absolute_import, division
+
+from collections import OrderedDict
+
+from datashader.core import bypixel
+from datashader.column_store import ColumnStore
+from datashader.compiler import compile_components
+from datashader.data_libraries.pandas import row_chunks, _threaded_extend
+from datashader.glyphs.points import _PointLike
+from datashader.glyphs.area import _AreaToLineLike
+from datashader.glyphs.trimesh import Triangles
+
+__all__ = ()
+
+
+# Number of rows aggregated at a time, small enough for the columns of a
+# block to stay in the CPU caches
+block_rows = 2**16
+
+
+@bypixel.pipeline.register(ColumnStore)
+def column_store_pipeline(store, schema, canvas, glyph, summary, base=None):
+    if (not isinstance(glyph, (_PointLike, _AreaToLineLike)) or
+            isinstance(glyph, Triangles)):
+        raise ValueError('{0} glyphs are not supported for column stores'
+                         .format(type(glyph).__name__))
+    create, info, append, combine, finalize = \
+        compile_components(summary, schema, glyph, False)
+    x_mapper = canvas.x_axis.mapper
+    y_mapper = canvas.y_axis.mapper
+    extend = glyph._build_extend(x_mapper, y_mapper, info, append)
+
+    x_range = canvas.x_range or glyph.compute_x_bounds(store)
+    y_range = canvas.y_range or glyph.compute_y_bounds(store)
+
+    width = canvas.plot_width
+    height = canvas.plot_height
+
+    x_st = canvas.x_axis.compute_scale_and_translate(x_range, width)
+    y_st = canvas.y_axis.compute_scale_and_translate(y_range, height)
+
+    x_axis = canvas.x_axis.compute_index(x_st, width)
+    y_axis = canvas.y_axis.compute_index(y_st, height)
+
+    vt = x_st + y_st
+    bounds = x_range + y_range
+    threads = getattr(canvas, 'threads', None)
+    if threads and threads > 1:
+        bases = _threaded_extend(glyph, create, extend, combine, store,
+                                 (height, width), vt, bounds, threads)
+        if base is not None:
+            for b, r in zip(base, combine([base, bases])):
+                b[...] = r
+            bases = base
+    else:
+        bases = create((height, width)) if base is None else base
+        nblocks = -(-len(store) // block_rows)
+        for start, stop, plot_start in row_chunks(glyph, len(store), nblocks):
+            block = store.iloc[start:stop]
+            if plot_start:
+                extend(bases, block, vt, bounds)
+            else:
+                extend(bases, block, vt, bounds, plot_start=False)
+
+    return finalize(bases,
+                    cuda=False,
+                    coords=OrderedDict([(glyph.x_label, x_axis),
+                                        (glyph.y_label, y_axis)]),
+                    dims=[glyph.y_label, glyph.x_label])
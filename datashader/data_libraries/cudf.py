@@ -5,5 +5,5 @@ import cudf
 
 
 @bypixel.pipeline.register(cudf.DataFrame)
-def cudf_pipeline(df, schema, canvas, glyph, summary):
-    return default(glyph, df, schema, canvas, summary, cuda=True)
+def cudf_pipeline(df, schema, canvas, glyph, summary, base=None):
+    return default(glyph, df, schema, canvas, summary, cuda=True, base=base)
@@ -9,14 +9,16 @@ from datashader.core import bypixel
 from datashader.compatibility import apply
 from datashader.compiler import compile_components
 from datashader.glyphs import Glyph, LineAxis0
+from datashader.parquet import prune_row_groups  # noqa (API import)
 from datashader.utils import Dispatcher
 
 __all__ = ()
 
 
 @bypixel.pipeline.register(dd.DataFrame)
-def dask_pipeline(df, schema, canvas, glyph, summary, cuda=False):
-    dsk, name = glyph_dispatch(glyph, df, schema, canvas, summary, cuda=cuda)
+def dask_pipeline(df, schema, canvas, glyph, summary, cuda=False, base=None):
+    dsk, name = glyph_dispatch(glyph, df, schema, canvas, summary, cuda=cuda,
+                               base=base)
 
     # Get user configured scheduler (if any), or fall back to default
     # scheduler for dask DataFrame
@@ -56,11 +58,49 @@ def shape_bounds_st_and_axis(df, canvas, glyph):
     return shape, bounds, st, axis
 
 
+def combine_tree(dsk, name, keys, combine, split_every=None):
+    """Add a tree reduction of the aggregates at ``keys`` to ``dsk``.
+
+    Aggregates are combined in groups of at most ``split_every`` per task,
+    level by level, so that no task holds more than ``split_every``
+    aggregates at once. Returns the keys of the top level, which have to be
+    combined one last time by the caller.
+
+    ``split_every`` defaults to the ``datashader.split_every`` dask config
+    value, or 8 if that is not set.
+    """
+    if split_every is None:
+        split_every = dask.config.get('datashader.split_every', 8)
+    if split_every < 2:
+        raise ValueError('split_every must be at least 2')
+
+    depth = 0
+    while len(keys) > split_every:
+        depth += 1
+        level = 'combine-{0}-{1}'.format(depth, name)
+        new_keys = []
+        for i in range(0, len(keys), split_every):
+            key = (level, i // split_every)
+            dsk[key] = (combine, keys[i:i + split_every])
+            new_keys.append(key)
+        keys = new_keys
+    return keys
+
+
+def with_base(dsk, name, keys, base):
+    """Prepend a task holding the ``base`` arrays, if any, to ``keys``"""
+    if base is None:
+        return keys
+    key = ('base-' + name, 0)
+    dsk[key] = (tuple, list(base))
+    return [key] + keys
+
+
 glyph_dispatch = Dispatcher()
 
 
 @glyph_dispatch.register(Glyph)
-def default(glyph, df, schema, canvas, summary, cuda=False):
+def default(glyph, df, schema, canvas, summary, cuda=False, base=None):
     shape, bounds, st, axis = shape_bounds_st_and_axis(df, canvas, glyph)
 
     # Compile functions
@@ -79,13 +119,14 @@ def default(glyph, df, schema, canvas, summary, cuda=False):
     keys = df.__dask_keys__()
     keys2 = [(name, i) for i in range(len(keys))]
     dsk = dict((k2, (chunk, k)) for (k2, k) in zip(keys2, keys))
+    keys2 = combine_tree(dsk, name, with_base(dsk, name, keys2, base), combine)
     dsk[name] = (apply, finalize, [(combine, keys2)],
                  dict(cuda=cuda, coords=axis, dims=[glyph.y_label, glyph.x_label]))
     return dsk, name
 
 
 @glyph_dispatch.register(LineAxis0)
-def line(glyph, df, schema, canvas, summary, cuda=False):
+def line(glyph, df, schema, canvas, summary, cuda=False, base=None):
     if cuda:
         from cudf import concat
     else:
@@ -115,6 +156,7 @@ def line(glyph, df, schema, canvas, summary, cuda=False):
     for i in range(1, df.npartitions):
         dsk[(name, i)] = (chunk, (old_name, i - 1), (old_name, i))
     keys2 = [(name, i) for i in range(df.npartitions)]
+    keys2 = combine_tree(dsk, name, with_base(dsk, name, keys2, base), combine)
     dsk[name] = (apply, finalize, [(combine, keys2)],
                  dict(cuda=cuda, coords=axis, dims=[glyph.y_label, glyph.x_label]))
     return dsk, name
@@ -5,5 +5,6 @@ import dask_cudf
 
 
 @bypixel.pipeline.register(dask_cudf.DataFrame)
-def dask_cudf_pipeline(df, schema, canvas, glyph, summary):
-    return dask_pipeline(df, schema, canvas, glyph, summary, cuda=True)
+def dask_cudf_pipeline(df, schema, canvas, glyph, summary, base=None):
+    return dask_pipeline(df, schema, canvas, glyph, summary, cuda=True,
+                         base=base)
@@ -1,5 +1,6 @@
 from collections import OrderedDict
 from datashader.compiler import compile_components
+from datashader.data_libraries.dask import combine_tree
 from datashader.utils import Dispatcher
 from datashader.glyphs.quadmesh import (
     QuadMeshRaster, QuadMeshRectilinear, QuadMeshCurvilinear, build_scale_translate
@@ -128,6 +129,7 @@ def dask_rectilinear(glyph, xr_ds, schema, canvas, summary, cuda):
     keys = [k for row in xr_ds.__dask_keys__()[0] for k in row]
     keys2 = [(name, i) for i in range(len(keys))]
     dsk = dict((k2, (chunk, k, k[1], k[2])) for (k2, k) in zip(keys2, keys))
+    keys2 = combine_tree(dsk, name, keys2, combine)
     dsk[name] = (apply, finalize, [(combine, keys2)],
                  dict(cuda=cuda, coords=axis, dims=[glyph.y_label, glyph.x_label]))
     return dsk, name
@@ -219,6 +221,7 @@ def dask_raster(glyph, xr_ds, schema, canvas, summary, cuda):
     keys = [k for row in xr_ds.__dask_keys__()[0] for k in row]
     keys2 = [(name, i) for i in range(len(keys))]
     dsk = dict((k2, (chunk, k, k[1], k[2])) for (k2, k) in zip(keys2, keys))
+    keys2 = combine_tree(dsk, name, keys2, combine)
     dsk[name] = (apply, finalize, [(combine, keys2)],
                  dict(cuda=cuda, coords=axis, dims=[glyph.y_label, glyph.x_label]))
     return dsk, name
@@ -324,6 +327,7 @@ def dask_curvilinear(glyph, xr_ds, schema, canvas, summary, cuda):
             result_keys, z_keys, x_overlap_keys, y_overlap_keys
         )
     )
+    result_keys = combine_tree(dsk, result_name, result_keys, combine)
 
     dsk[result_name] = (
         apply, finalize, [(combine, result_keys)],
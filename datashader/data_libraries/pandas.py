@@ -1,20 +1,41 @@
 from __future__ import absolute_import, division
 
+from concurrent.futures import ThreadPoolExecutor
+
 import pandas as pd
 
 from datashader.core import bypixel
 from datashader.compiler import compile_components
 from datashader.glyphs.points import _PointLike, _GeometryLike
-from datashader.glyphs.area import _AreaToLineLike
+from datashader.glyphs.area import (
+    _AreaToLineLike, AreaToZeroAxis0, AreaToLineAxis0,
+    AreaToZeroAxis0Multi, AreaToLineAxis0Multi
+)
+from datashader.glyphs.line import LineAxis0, LineAxis0Multi
+from datashader.glyphs.trimesh import Triangles
 from datashader.utils import Dispatcher
 from collections import OrderedDict
 
 __all__ = ()
 
 
+# Glyphs that connect consecutive rows. Chunks of these must overlap by one
+# row so that the segment spanning a chunk boundary is drawn.
+_connected_glyphs = (LineAxis0, LineAxis0Multi, AreaToZeroAxis0,
+                     AreaToLineAxis0, AreaToZeroAxis0Multi,
+                     AreaToLineAxis0Multi)
+
+# Smallest number of rows worth handing to a separate thread
+min_rows_per_thread = 100000
+
+# Number of rows aggregated at a time by views_pipeline, small enough for the
+# columns of a block to stay in the CPU caches while every view reads them
+views_block_rows = 2**16
+
+
 @bypixel.pipeline.register(pd.DataFrame)
-def pandas_pipeline(df, schema, canvas, glyph, summary):
-    return glyph_dispatch(glyph, df, schema, canvas, summary)
+def pandas_pipeline(df, schema, canvas, glyph, summary, base=None):
+    return glyph_dispatch(glyph, df, schema, canvas, summary, base=base)
 
 
 glyph_dispatch = Dispatcher()
@@ -23,8 +44,9 @@ glyph_dispatch = Dispatcher()
 @glyph_dispatch.register(_PointLike)
 @glyph_dispatch.register(_GeometryLike)
 @glyph_dispatch.register(_AreaToLineLike)
-def default(glyph, source, schema, canvas, summary, cuda=False):
-    create, info, append, _, finalize = compile_components(summary, schema, glyph, cuda)
+def default(glyph, source, schema, canvas, summary, cuda=False, base=None):
+    create, info, append, combine, finalize = \
+        compile_components(summary, schema, glyph, cuda)
     x_mapper = canvas.x_axis.mapper
     y_mapper = canvas.y_axis.mapper
     extend = glyph._build_extend(x_mapper, y_mapper, info, append)
@@ -41,11 +63,131 @@ def default(glyph, source, schema, canvas, summary, cuda=False):
     x_axis = canvas.x_axis.compute_index(x_st, width)
     y_axis = canvas.y_axis.compute_index(y_st, height)
 
-    bases = create((height, width))
-    extend(bases, source, x_st + y_st, x_range + y_range)
+    vt = x_st + y_st
+    bounds = x_range + y_range
+    threads = getattr(canvas, 'threads', None)
+    if threads and threads > 1 and not cuda and isinstance(source, pd.DataFrame):
+        bases = _threaded_extend(glyph, create, extend, combine, source,
+                                 (height, width), vt, bounds, threads)
+        if base is not None:
+            # Update the base arrays in place, as the serial path does
+            for b, r in zip(base, combine([base, bases])):
+                b[...] = r
+            bases = base
+    else:
+        bases = create((height, width)) if base is None else base
+        extend(bases, source, vt, bounds)
 
     return finalize(bases,
                     cuda=cuda,
                     coords=OrderedDict([(glyph.x_label, x_axis),
                                         (glyph.y_label, y_axis)]),
                     dims=[glyph.y_label, glyph.x_label])
+
+
+def views_pipeline(views):
+    """Aggregate several views of the same DataFrame in one pass over it.
+
+    ``views`` is a list of ``(df, schema, canvas, glyph, summary)`` tuples,
+    the DataFrames of which hold the same rows (unless pruned for a view).
+    The rows are read in blocks of ``views_block_rows`` rows, each block
+    being aggregated by every view in turn while its columns are in the CPU
+    caches, so that the rows are read from memory once rather than once
+    per view. Returns the list of the aggregates of the views.
+    """
+    states = []
+    for df, schema, canvas, glyph, summary in views:
+        create, info, append, combine, finalize = \
+            compile_components(summary, schema, glyph, False)
+        extend = glyph._build_extend(canvas.x_axis.mapper,
+                                     canvas.y_axis.mapper, info, append)
+
+        x_range = canvas.x_range or glyph.compute_x_bounds(df)
+        y_range = canvas.y_range or glyph.compute_y_bounds(df)
+        width = canvas.plot_width
+        height = canvas.plot_height
+        x_st = canvas.x_axis.compute_scale_and_translate(x_range, width)
+        y_st = canvas.y_axis.compute_scale_and_translate(y_range, height)
+
+        nblocks = max(1, -(-len(df) // views_block_rows))
+        states.append(dict(
+            df=df, glyph=glyph, extend=extend, finalize=finalize,
+            vt=x_st + y_st, bounds=x_range + y_range,
+            bases=create((height, width)),
+            chunks=row_chunks(glyph, len(df), nblocks),
+            coords=OrderedDict([
+                (glyph.x_label, canvas.x_axis.compute_index(x_st, width)),
+                (glyph.y_label, canvas.y_axis.compute_index(y_st, height))])))
+
+    # Views of the same rows split them at the same block boundaries
+    for k in range(max(len(state['chunks']) for state in states)):
+        for state in states:
+            if k >= len(state['chunks']):
+                continue
+            start, stop, plot_start = state['chunks'][k]
+            block = state['df'].iloc[start:stop]
+            if plot_start:
+                state['extend'](state['bases'], block, state['vt'],
+                                state['bounds'])
+            else:
+                state['extend'](state['bases'], block, state['vt'],
+                                state['bounds'], plot_start=False)
+
+    return [state['finalize'](state['bases'],
+                              cuda=False,
+                              coords=state['coords'],
+                              dims=[state['glyph'].y_label,
+                                    state['glyph'].x_label])
+            for state in states]
+
+
+def row_chunks(glyph, nrows, nchunks):
+    """Split ``nrows`` rows into at most ``nchunks`` contiguous chunks that
+    can be aggregated independently for ``glyph``.
+
+    Returns a list of ``(start, stop, plot_start)`` tuples. Chunks of glyphs
+    that connect consecutive rows overlap by one row, with ``plot_start``
+    set to False for all but the first chunk.
+    """
+    # Triangles are made of three consecutive rows, never split them
+    step = 3 if isinstance(glyph, Triangles) else 1
+    nunits = nrows // step
+    nchunks = max(1, min(nchunks, nunits))
+    overlap = 1 if isinstance(glyph, _connected_glyphs) else 0
+
+    chunks = []
+    for k in range(nchunks):
+        start = (nunits * k // nchunks) * step
+        stop = (nunits * (k + 1) // nchunks) * step
+        if k == nchunks - 1:
+            stop = nrows
+        if k > 0:
+            start -= overlap
+        chunks.append((start, stop, k == 0 or not overlap))
+    return chunks
+
+
+def _threaded_extend(glyph, create, extend, combine, df, shape, vt, bounds,
+                     threads):
+    """Aggregate row chunks of ``df`` concurrently, each into its own base
+    arrays, and combine the results"""
+    nchunks = min(threads, max(1, len(df) // min_rows_per_thread))
+    chunks = row_chunks(glyph, len(df), nchunks)
+    if len(chunks) == 1:
+        bases = create(shape)
+        extend(bases, df, vt, bounds)
+        return bases
+
+    def chunk(args):
+        start, stop, plot_start = args
+        bases = create(shape)
+        if plot_start:
+            extend(bases, df.iloc[start:stop], vt, bounds)
+        else:
+            extend(bases, df.iloc[start:stop], vt, bounds,
+                   plot_start=plot_start)
+        return bases
+
+    with ThreadPoolExecutor(len(chunks)) as executor:
+        results = list(executor.map(chunk, chunks))
+    return combine(results)
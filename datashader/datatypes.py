@@ -1,14 +1,14 @@
 from __future__ import absolute_import
 
 import re
+import sys
 
 from distutils.version import LooseVersion
-from functools import total_ordering
+from functools import total_ordering, wraps
 
 import numpy as np
 import pandas as pd
 
-from numba import jit
 from pandas.api.extensions import (
     ExtensionDtype, ExtensionArray, register_extension_dtype)
 from numbers import Integral
@@ -16,11 +16,22 @@ from numbers import Integral
 from pandas.api.types import pandas_dtype, is_extension_array_dtype
 
 
-try:
-    # See if we can register extension type with dask >= 1.1.0
-    from dask.dataframe.extensions import make_array_nonempty
-except ImportError:
-    make_array_nonempty = None
+
+def _jit(func):
+    """Compile ``func`` with numba in nopython mode on its first call.
+
+    This module is imported by ``import datashader`` to register the
+    ``Ragged`` dtype with pandas, so it doesn't import numba itself.
+    """
+    compiled = []
+
+    @wraps(func)
+    def wrapper(*args):
+        if not compiled:
+            from numba import jit
+            compiled.append(jit(nopython=True, nogil=True)(func))
+        return compiled[0](*args)
+    return wrapper
 
 
 def _validate_ragged_properties(start_indices, flat_array):
@@ -629,7 +640,7 @@ Invalid indices for take with allow_fill True: {inds}""".format(
         return np.array([v for v in self], dtype=dtype, copy=copy)
 
 
-@jit(nopython=True, nogil=True)
+@_jit
 def _eq_ragged_ragged(start_indices1,
                       flat_array1,
                       start_indices2,
@@ -687,7 +698,7 @@ def _eq_ragged_ragged(start_indices1,
     return result
 
 
-@jit(nopython=True, nogil=True)
+@_jit
 def _eq_ragged_scalar(start_indices, flat_array, val):
     """
     Compare elements of a RaggedArray with a scalar array
@@ -769,7 +780,7 @@ def _eq_ragged_ndarray1d(start_indices, flat_array, a):
     return result
 
 
-@jit(nopython=True, nogil=True)
+@_jit
 def _eq_ragged_ndarray2d(start_indices, flat_array, a):
     """
     Compare a RaggedArray with rows of a 2D numpy object array
@@ -812,7 +823,7 @@ def _eq_ragged_ndarray2d(start_indices, flat_array, a):
     return result
 
 
-@jit(nopython=True, nogil=True)
+@_jit
 def _lexograph_lt(a1, a2):
     """
     Compare two 1D numpy arrays lexographically
@@ -840,5 +851,18 @@ def ragged_array_non_empty(dtype):
     return RaggedArray([[1], [1, 2]], dtype=dtype)
 
 
-if make_array_nonempty:
+def _register_dask():
+    """Register the non-empty ``RaggedArray`` dask uses for metadata"""
+    try:
+        # See if we can register extension type with dask >= 1.1.0
+        from dask.dataframe.extensions import make_array_nonempty
+    except ImportError:
+        return
     make_array_nonempty.register(RaggedDtype)(ragged_array_non_empty)
+
+
+# Importing dask here would make ``import datashader`` slow, so the
+# registration is done here only if dask.dataframe is already imported, and
+# otherwise by datashader.utils, which every dask code path imports.
+if 'dask.dataframe' in sys.modules:
+    _register_dask()
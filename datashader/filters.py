@@ -0,0 +1,176 @@
+"""
+Row filters applied while aggregating.
+
+A filter is a list of ``(column, op, value)`` predicates that a row must all
+satisfy to be aggregated, in the form of the ``filters`` of
+``dask.dataframe.read_parquet``:
+
+>>> flt = [('status', '==', 'error'), ('latency', '>', 3),
+...        ('t', 'between', (0, 100)), ('region', 'in', ['eu', 'us'])]
+
+Supported operators are ``==``, ``!=``, ``<``, ``<=``, ``>``, ``>=``,
+``between`` (inclusive bounds), ``in`` and ``not in``, on numeric, boolean
+and categorical columns. Categorical columns only support equality and
+membership, and are compared by category code.
+
+Filters are compiled into the generated ``append`` kernel, so rows that fail
+them are skipped inside the aggregation loop without building a filtered
+copy of the source. As with pandas comparisons, missing values fail every
+predicate except ``!=`` and ``not in``.
+"""
+from __future__ import absolute_import, division, print_function
+
+from numbers import Number
+
+import numpy as np
+from datashape import isnumeric
+from datashape import coretypes as ct
+from toolz import unique
+
+from .reductions import category_codes, extract
+from .utils import Expr
+
+__all__ = ['Filter', 'as_filter']
+
+_comparisons = ('==', '!=', '<', '<=', '>', '>=')
+_categorical_ops = ('==', '!=', 'in', 'not in')
+_ops = _comparisons + ('between', 'in', 'not in')
+
+
+class Filter(Expr):
+    """A conjunction of ``(column, op, value)`` row predicates.
+
+    Parameters
+    ----------
+    predicates : list of tuple
+        The ``(column, op, value)`` predicates rows must satisfy. ``value``
+        is a ``(low, high)`` pair for ``between``, and a list of values for
+        ``in`` and ``not in``.
+    """
+    def __init__(self, predicates):
+        normalized = []
+        for predicate in predicates:
+            try:
+                column, op, value = predicate
+            except (TypeError, ValueError):
+                raise ValueError('Filter predicates must be (column, op, '
+                                 'value) tuples, got {0!r}'.format(predicate))
+            if op not in _ops:
+                raise ValueError('Unsupported filter operator {0!r}, must be '
+                                 'one of {1}'.format(op, ', '.join(_ops)))
+            if op in ('in', 'not in'):
+                value = tuple(value)
+            elif op == 'between':
+                value = tuple(value)
+                if len(value) != 2:
+                    raise ValueError("'between' filters take a (low, high) "
+                                     "pair of values")
+            normalized.append((column, op, value))
+        if not normalized:
+            raise ValueError('A filter needs at least one predicate')
+        self.predicates = tuple(normalized)
+
+    @property
+    def inputs(self):
+        return self.predicates
+
+    def __repr__(self):
+        return 'Filter({0!r})'.format(list(self.predicates))
+
+    @property
+    def columns(self):
+        """The columns read by the filter"""
+        return list(unique(column for column, _, _ in self.predicates))
+
+    def validate(self, in_dshape):
+        for column, op, value in self.predicates:
+            if column not in in_dshape.dict:
+                raise ValueError("filter column {0!r} not found".format(column))
+            dtype = in_dshape.measure[column]
+            if isinstance(dtype, ct.Categorical):
+                if op not in _categorical_ops:
+                    raise ValueError(
+                        "categorical filter column {0!r} only supports the "
+                        "{1} operators".format(column,
+                                               ', '.join(_categorical_ops)))
+            elif not (isnumeric(dtype) or _isbool(dtype)):
+                raise ValueError("filter column {0!r} must be numeric, boolean "
+                                 "or categorical".format(column))
+            else:
+                values = value if op in ('in', 'not in', 'between') else (value,)
+                for v in values:
+                    if not isinstance(v, (Number, np.number, np.bool_)):
+                        raise ValueError("filter values for column {0!r} must "
+                                         "be numbers, got {1!r}".format(column, v))
+                    if v != v:
+                        raise ValueError("NaN can't be used as a filter value, "
+                                         "rows with missing values fail every "
+                                         "comparison but '!='")
+
+    def preprocess(self, schema):
+        """Return the preprocessing step reading each column of the filter,
+        in the order of ``columns``"""
+        return [category_codes(column)
+                if isinstance(schema.measure[column], ct.Categorical)
+                else extract(column) for column in self.columns]
+
+    def condition(self, schema, names):
+        """Return the source of a boolean expression evaluating the filter,
+        given a mapping from column to the expression of its value in the
+        current row."""
+        terms = []
+        for column, op, value in self.predicates:
+            name = names[column]
+            dtype = schema.measure[column]
+            if isinstance(dtype, ct.Categorical):
+                # Values that aren't categories match no row
+                categories = list(dtype.categories)
+                values = (value,) if op in ('==', '!=') else value
+                term = _isin(name, [str(categories.index(v)) for v in values
+                                    if v in categories])
+                if op in ('!=', 'not in'):
+                    term = '(not {0})'.format(term)
+            elif op in _comparisons:
+                term = '({0} {1} {2})'.format(name, op, _literal(value))
+            elif op == 'between':
+                term = '({0} <= {1} <= {2})'.format(
+                    _literal(value[0]), name, _literal(value[1]))
+            else:
+                term = _isin(name, [_literal(v) for v in value])
+                if op == 'not in':
+                    term = '(not {0})'.format(term)
+            terms.append(term)
+        return ' and '.join(terms)
+
+
+def as_filter(spec):
+    """Return the ``Filter`` given by ``spec``: a ``Filter``, a single
+    ``(column, op, value)`` predicate, or a list of them."""
+    if spec is None or isinstance(spec, Filter):
+        return spec
+    if isinstance(spec, tuple) and len(spec) == 3 and spec[1] in _ops:
+        spec = [spec]
+    return Filter(spec)
+
+
+def _isbool(dtype):
+    if isinstance(dtype, ct.Option):
+        dtype = dtype.ty
+    return dtype == ct.bool_
+
+
+def _isin(name, literals):
+    if not literals:
+        return 'False'
+    return '({0})'.format(' or '.join('{0} == {1}'.format(name, lit)
+                                      for lit in literals))
+
+
+def _literal(value):
+    """Return the source of a numeric constant, spelling infinities as
+    float literals that overflow."""
+    if isinstance(value, (bool, np.bool_)):
+        return str(bool(value))
+    if np.isinf(value):
+        return '1e999' if value > 0 else '-1e999'
+    return repr(value.item() if isinstance(value, np.generic) else value)
@@ -2,7 +2,7 @@ from __future__ import absolute_import, division
 import numpy as np
 from toolz import memoize
 
-from datashader.glyphs.glyph import Glyph, isnull
+from datashader.glyphs.glyph import Glyph, isnull, cached_bounds
 from datashader.glyphs.line import _build_map_onto_pixel_for_line, _clipt
 from datashader.glyphs.points import _PointLike
 from datashader.utils import isreal, ngjit
@@ -76,7 +76,7 @@ class AreaToZeroAxis0(_PointLike):
         # Expand bounds if needed
         return self.maybe_expand_bounds(bounds)
 
-    @memoize
+    @cached_bounds
     def compute_bounds_dask(self, ddf):
 
         r = ddf.map_partitions(lambda df: np.array([[
@@ -157,7 +157,7 @@ class AreaToLineAxis0(_AreaToLineLike):
         # Expand bounds if needed
         return self.maybe_expand_bounds(bounds)
 
-    @memoize
+    @cached_bounds
     def compute_bounds_dask(self, ddf):
         r = ddf.map_partitions(lambda df: np.array([[
             np.nanmin(df[self.x].values).item(),
@@ -252,7 +252,7 @@ class AreaToZeroAxis0Multi(_PointLike):
         mx = max(0, max(maxes))
         return self.maybe_expand_bounds((mn, mx))
 
-    @memoize
+    @cached_bounds
     def compute_bounds_dask(self, ddf):
 
         r = ddf.map_partitions(lambda df: np.array([[
@@ -343,7 +343,7 @@ class AreaToLineAxis0Multi(_AreaToLineLike):
 
         return self.maybe_expand_bounds((min(mins), max(maxes)))
 
-    @memoize
+    @cached_bounds
     def compute_bounds_dask(self, ddf):
 
         r = ddf.map_partitions(lambda df: np.array([[
@@ -450,7 +450,7 @@ class AreaToZeroAxis1(_PointLike):
 
         return self.maybe_expand_bounds((mn, mx))
 
-    @memoize
+    @cached_bounds
     def compute_bounds_dask(self, ddf):
 
         r = ddf.map_partitions(lambda df: np.array([[
@@ -558,7 +558,7 @@ class AreaToLineAxis1(_AreaToLineLike):
 
         return self.maybe_expand_bounds((min(mins), max(maxes)))
 
-    @memoize
+    @cached_bounds
     def compute_bounds_dask(self, ddf):
 
         r = ddf.map_partitions(lambda df: np.array([[
@@ -633,7 +633,7 @@ class AreaToZeroAxis1XConstant(AreaToZeroAxis1):
         x_max = np.nanmax(self.x)
         return self.maybe_expand_bounds((x_min, x_max))
 
-    @memoize
+    @cached_bounds
     def compute_bounds_dask(self, ddf):
 
         r = ddf.map_partitions(lambda df: np.array([[
@@ -709,7 +709,7 @@ class AreaToLineAxis1XConstant(AreaToLineAxis1):
         x_max = np.nanmax(self.x)
         return self.maybe_expand_bounds((x_min, x_max))
 
-    @memoize
+    @cached_bounds
     def compute_bounds_dask(self, ddf):
 
         r = ddf.map_partitions(lambda df: np.array([[
@@ -781,7 +781,7 @@ class AreaToZeroAxis1YConstant(AreaToZeroAxis1):
         y_max = np.nanmax(self.y)
         return self.maybe_expand_bounds((y_min, y_max))
 
-    @memoize
+    @cached_bounds
     def compute_bounds_dask(self, ddf):
 
         r = ddf.map_partitions(lambda df: np.array([[
@@ -847,7 +847,7 @@ class AreaToLineAxis1YConstant(AreaToLineAxis1):
         y_max = max(np.nanmax(self.y), np.nanmax(self.y_stack))
         return self.maybe_expand_bounds((y_min, y_max))
 
-    @memoize
+    @cached_bounds
     def compute_bounds_dask(self, ddf):
 
         r = ddf.map_partitions(lambda df: np.array([[
@@ -922,7 +922,7 @@ class AreaToZeroAxis1Ragged(_PointLike):
 
         return self.maybe_expand_bounds(bounds)
 
-    @memoize
+    @cached_bounds
     def compute_bounds_dask(self, ddf):
 
         r = ddf.map_partitions(lambda df: np.array([[
@@ -1002,7 +1002,7 @@ class AreaToLineAxis1Ragged(_AreaToLineLike):
 
         return self.maybe_expand_bounds(bounds)
 
-    @memoize
+    @cached_bounds
     def compute_bounds_dask(self, ddf):
 
         r = ddf.map_partitions(lambda df: np.array([[
@@ -2,11 +2,13 @@ from __future__ import absolute_import, division
 import inspect
 import warnings
 import os
+from functools import wraps
 from math import isnan
 
 import numpy as np
 import pandas as pd
 
+from datashader.cache import ExtentsCache
 from datashader.utils import Expr, ngjit
 from datashader.macros import expand_varargs
 
@@ -16,6 +18,19 @@ except Exception:
     cudf = None
 
 
+def cached_bounds(compute_bounds_dask):
+    """Store the bounds computed by a ``compute_bounds_dask`` method in
+    ``Glyph.extents_cache``, keyed by the source and the glyph."""
+    @wraps(compute_bounds_dask)
+    def wrapper(self, source):
+        cache = self.extents_cache
+        if cache is None:
+            return compute_bounds_dask(self, source)
+        return cache.extents(source, self,
+                             lambda: compute_bounds_dask(self, source))
+    return wrapper
+
+
 @ngjit
 def isnull(val):
     """
@@ -27,6 +42,18 @@ def isnull(val):
 class Glyph(Expr):
     """Base class for glyphs."""
 
+    #: Optional ``datashader.filters.Filter`` of the rows to draw
+    filter = None
+
+    #: ``ExtentsCache`` of the bounds computed over sources, or None
+    extents_cache = ExtentsCache()
+
+    def _hashable_inputs(self):
+        inputs = super(Glyph, self)._hashable_inputs()
+        if self.filter is None:
+            return inputs
+        return inputs + (self.filter,)
+
     @property
     def ndims(self):
         """
@@ -50,6 +77,38 @@ class Glyph(Expr):
             minval, maxval = minval-1, minval+1
         return minval, maxval
 
+    def _column_bounds(self, df, column):
+        """Return the ``(min, max)`` of ``column`` in the DataFrame ``df``,
+        through ``extents_cache``"""
+        if self.extents_cache is None:
+            return self._compute_bounds(df[column])
+        return self.extents_cache.extents(
+            df, column, lambda: self._compute_bounds(df[column]))
+
+    def _dask_column_bounds(self, ddf, columns):
+        """Return the ``(min, max)`` of each of ``columns`` in the Dask
+        DataFrame ``ddf``, scanning it once for the extents that aren't
+        known or cached"""
+        cache = self.extents_cache
+        bounds = {}
+        if cache is not None:
+            for column in columns:
+                found = cache.lookup(ddf, column)
+                if found is not None:
+                    bounds[column] = found
+        missing = [c for c in dict.fromkeys(columns) if c not in bounds]
+        if missing:
+            r = ddf.map_partitions(lambda df: np.array([[
+                f(df[c].values).item() for c in missing
+                for f in (np.nanmin, np.nanmax)]]
+            )).compute()
+            for i, column in enumerate(missing):
+                bounds[column] = (np.nanmin(r[:, 2 * i]),
+                                  np.nanmax(r[:, 2 * i + 1]))
+                if cache is not None:
+                    cache.store(ddf, column, bounds[column])
+        return [bounds[c] for c in columns]
+
     @staticmethod
     def _compute_bounds(s):
         if cudf and isinstance(s, cudf.Series):
@@ -138,6 +197,11 @@ class Glyph(Expr):
             # decorated with @jit and @expand_varargs decorators
             return lambda fn: fn
 
+        return expand_varargs(Glyph._aggs_and_cols_len(append, ndims))
+
+    @staticmethod
+    def _aggs_and_cols_len(append, ndims):
+        """Number of aggregate and column arguments accepted by append"""
         with warnings.catch_warnings():
             warnings.simplefilter("ignore")
             try:
@@ -158,6 +222,4 @@ class Glyph(Expr):
         dim_arglen = (ndims or 0)
 
         # The remaining arguments are for aggregates and columns
-        aggs_and_cols_len = append_arglen - xy_arglen - dim_arglen
-
-        return expand_varargs(aggs_and_cols_len)
+        return append_arglen - xy_arglen - dim_arglen
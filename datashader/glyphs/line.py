@@ -3,7 +3,7 @@ import numpy as np
 from toolz import memoize
 
 from datashader.glyphs.points import _PointLike, _GeometryLike
-from datashader.glyphs.glyph import isnull
+from datashader.glyphs.glyph import isnull, cached_bounds
 from datashader.utils import isreal, ngjit
 from numba import cuda
 
@@ -79,29 +79,24 @@ class LineAxis0Multi(_PointLike):
         return self.x + self.y
 
     def compute_x_bounds(self, df):
-        bounds_list = [self._compute_bounds(df[x])
+        bounds_list = [self._column_bounds(df, x)
                        for x in self.x]
         mins, maxes = zip(*bounds_list)
         return self.maybe_expand_bounds((min(mins), max(maxes)))
 
     def compute_y_bounds(self, df):
-        bounds_list = [self._compute_bounds(df[y])
+        bounds_list = [self._column_bounds(df, y)
                        for y in self.y]
         mins, maxes = zip(*bounds_list)
         return self.maybe_expand_bounds((min(mins), max(maxes)))
 
-    @memoize
     def compute_bounds_dask(self, ddf):
-
-        r = ddf.map_partitions(lambda df: np.array([[
-            np.nanmin([np.nanmin(df[c].values).item() for c in self.x]),
-            np.nanmax([np.nanmax(df[c].values).item() for c in self.x]),
-            np.nanmin([np.nanmin(df[c].values).item() for c in self.y]),
-            np.nanmax([np.nanmax(df[c].values).item() for c in self.y])]]
-        )).compute()
-
-        x_extents = np.nanmin(r[:, 0]), np.nanmax(r[:, 1])
-        y_extents = np.nanmin(r[:, 2]), np.nanmax(r[:, 3])
+        bounds = self._dask_column_bounds(ddf, list(self.x) + list(self.y))
+        x_bounds, y_bounds = bounds[:len(self.x)], bounds[len(self.x):]
+        x_extents = (np.nanmin([b[0] for b in x_bounds]),
+                     np.nanmax([b[1] for b in x_bounds]))
+        y_extents = (np.nanmin([b[0] for b in y_bounds]),
+                     np.nanmax([b[1] for b in y_bounds]))
 
         return (self.maybe_expand_bounds(x_extents),
                 self.maybe_expand_bounds(y_extents))
@@ -198,7 +193,7 @@ class LinesAxis1(_PointLike):
 
         return self.maybe_expand_bounds((min(mins), max(maxes)))
 
-    @memoize
+    @cached_bounds
     def compute_bounds_dask(self, ddf):
 
         r = ddf.map_partitions(lambda df: np.array([[
@@ -269,7 +264,7 @@ class LinesAxis1XConstant(LinesAxis1):
         x_max = np.nanmax(self.x)
         return self.maybe_expand_bounds((x_min, x_max))
 
-    @memoize
+    @cached_bounds
     def compute_bounds_dask(self, ddf):
 
         r = ddf.map_partitions(lambda df: np.array([[
@@ -338,7 +333,7 @@ class LinesAxis1YConstant(LinesAxis1):
         y_max = np.nanmax(self.y)
         return self.maybe_expand_bounds((y_min, y_max))
 
-    @memoize
+    @cached_bounds
     def compute_bounds_dask(self, ddf):
 
         r = ddf.map_partitions(lambda df: np.array([[
@@ -410,7 +405,7 @@ class LinesAxis1Ragged(_PointLike):
         bounds = self._compute_bounds(df[self.y].array.flat_array)
         return self.maybe_expand_bounds(bounds)
 
-    @memoize
+    @cached_bounds
     def compute_bounds_dask(self, ddf):
 
         r = ddf.map_partitions(lambda df: np.array([[
@@ -656,6 +651,39 @@ def _build_draw_segment(append, map_onto_pixel, expand_aggs_and_cols):
     return draw_segment
 
 
+@ngjit
+def m4_indices(cols, ys):
+    """Return the indices of the rows of a line to keep to draw it with the
+    same pixels, given the pixel column ``cols`` of each vertex.
+
+    Each run of consecutive vertices in the same pixel column draws a
+    vertical run of pixels between the smallest and largest y of the run,
+    so only the first, lowest, highest and last vertices of a run (M4) are
+    kept, in their original order. Vertices with a NaN column never equal
+    their neighbours and are always kept.
+    """
+    n = len(cols)
+    result = np.empty(n, dtype=np.int64)
+    count = 0
+    start = 0
+    while start < n:
+        stop = imin = imax = start
+        while stop + 1 < n and cols[stop + 1] == cols[start]:
+            stop += 1
+            if ys[stop] < ys[imin]:
+                imin = stop
+            if ys[stop] > ys[imax]:
+                imax = stop
+        last = -1
+        for i in (start, min(imin, imax), max(imin, imax), stop):
+            if i > last:
+                result[count] = i
+                count += 1
+                last = i
+        start = stop + 1
+    return result[:count]
+
+
 @ngjit
 def _clipt(p, q, t0, t1):
     accept = True
@@ -2,7 +2,7 @@ from __future__ import absolute_import, division
 import numpy as np
 from toolz import memoize
 
-from datashader.glyphs.glyph import Glyph
+from datashader.glyphs.glyph import Glyph, cached_bounds
 from datashader.utils import isreal, ngjit
 
 from numba import cuda
@@ -66,7 +66,7 @@ class _GeometryLike(Glyph):
         bounds = df[self.geometry].array.total_bounds_y
         return self.maybe_expand_bounds(bounds)
 
-    @memoize
+    @cached_bounds
     def compute_bounds_dask(self, ddf):
         total_bounds = ddf[self.geometry].total_bounds
         x_extents = (total_bounds[0], total_bounds[2])
@@ -108,26 +108,15 @@ class _PointLike(Glyph):
         return [self.x, self.y]
 
     def compute_x_bounds(self, df):
-        bounds = self._compute_bounds(df[self.x])
+        bounds = self._column_bounds(df, self.x)
         return self.maybe_expand_bounds(bounds)
 
     def compute_y_bounds(self, df):
-        bounds = self._compute_bounds(df[self.y])
+        bounds = self._column_bounds(df, self.y)
         return self.maybe_expand_bounds(bounds)
 
-    @memoize
     def compute_bounds_dask(self, ddf):
-
-        r = ddf.map_partitions(lambda df: np.array([[
-            np.nanmin(df[self.x].values).item(),
-            np.nanmax(df[self.x].values).item(),
-            np.nanmin(df[self.y].values).item(),
-            np.nanmax(df[self.y].values).item()]]
-        )).compute()
-
-        x_extents = np.nanmin(r[:, 0]), np.nanmax(r[:, 1])
-        y_extents = np.nanmin(r[:, 2]), np.nanmax(r[:, 3])
-
+        x_extents, y_extents = self._dask_column_bounds(ddf, [self.x, self.y])
         return (self.maybe_expand_bounds(x_extents),
                 self.maybe_expand_bounds(y_extents))
 
@@ -0,0 +1,275 @@
+"""
+Persistent on-disk cache for generated numba kernels.
+
+Kernels that datashader generates at runtime (such as the ``append``
+function built by ``compile_components``, and the ``extend`` kernels each
+glyph builds for an aggregation in ``_build_extend``) are normally compiled
+from source text held in memory, or from functions nested in others, which
+numba cannot cache across processes. When a cache directory is configured,
+the source is instead written to an importable module in that directory and
+compiled with ``cache=True``, so that fresh processes load the compiled
+machine code instead of JIT compiling it again. Nested functions compiled
+with ``utils.ngjit`` go through ``jit_function``, which writes out their own
+source, as expanded by ``macros.expand_varargs``, along with the values of
+the names they refer to.
+
+The module for a kernel is named after a hash of its full source text, which
+spells out every function the kernel calls (the reduction append functions,
+axis mappers and so on) along with the datashader and numba versions, and a
+hash of the source of those functions and of the functions they call in
+turn. Numba doesn't check whether the functions a cached kernel calls have
+changed, so editing one of them, for instance in a development install,
+gives a new module compiled from scratch. The argument types of each
+compiled specialization (and hence the schema dtypes) are tracked by numba's
+own cache index.
+
+The cache is enabled by setting the ``DATASHADER_KERNEL_CACHE_DIR``
+environment variable, or by calling ``set_cache_dir``.
+"""
+from __future__ import absolute_import, division, print_function
+
+import dis
+import hashlib
+import importlib
+import inspect
+import os
+import sys
+import tempfile
+import textwrap
+import types
+
+import numba as nb
+
+from .compatibility import PY3
+
+__all__ = ['get_cache_dir', 'set_cache_dir', 'import_path', 'resolve',
+           'load_kernel', 'jit_function']
+
+_module_prefix = 'datashader_kernel_'
+
+_cache_dir = [os.environ.get('DATASHADER_KERNEL_CACHE_DIR') or None]
+
+
+def get_cache_dir():
+    """Return the kernel cache directory, or None if caching is disabled"""
+    return _cache_dir[0]
+
+
+def set_cache_dir(path):
+    """Set the directory used to cache generated kernels.
+
+    Parameters
+    ----------
+    path : str or None
+        Directory in which generated kernel modules (and numba's compiled
+        code for them) are stored. It is created if it doesn't exist. None
+        disables the cache.
+    """
+    if path is not None:
+        path = os.path.abspath(os.path.expanduser(path))
+    _cache_dir[0] = path
+
+
+def resolve(module, qualname):
+    """Import ``module`` and look up the dotted ``qualname`` in it"""
+    obj = importlib.import_module(module)
+    for attr in qualname.split('.'):
+        obj = getattr(obj, attr)
+    return obj
+
+
+def import_path(func):
+    """Return ``(module, qualname)`` such that ``resolve(module, qualname)``
+    returns ``func``, or None if ``func`` can't be looked up that way (for
+    example because it is a closure)."""
+    py_func = getattr(func, 'py_func', func)
+    module = getattr(py_func, '__module__', None)
+    qualname = getattr(py_func, '__qualname__', None)
+    if module is None or qualname is None or '<' in qualname:
+        return None
+    try:
+        if resolve(module, qualname) is func:
+            return module, qualname
+    except (ImportError, AttributeError):
+        pass
+    return None
+
+
+def _versions():
+    from datashader import __version__
+    return 'datashader {0}, numba {1}'.format(__version__, nb.__version__)
+
+
+def _source_digest(funcs):
+    """Return a hash of the source of ``funcs`` and of the Python and numba
+    functions they reference as globals, recursively."""
+    sha = hashlib.sha1()
+    seen = set()
+    stack = list(funcs)
+    while stack:
+        func = stack.pop()
+        func = getattr(func, 'py_func', func)
+        if not isinstance(func, types.FunctionType) or func in seen:
+            continue
+        seen.add(func)
+        try:
+            source = inspect.getsource(func)
+        except (IOError, OSError, TypeError):
+            source = ''
+        sha.update('{0}.{1}\n{2}'.format(
+            func.__module__, getattr(func, '__qualname__', func.__name__),
+            source).encode('utf-8'))
+        codes = [func.__code__]
+        while codes:
+            code = codes.pop()
+            for name in code.co_names:
+                value = func.__globals__.get(name)
+                if value is not None and (
+                        isinstance(value, types.FunctionType) or
+                        hasattr(value, 'py_func')):
+                    stack.append(value)
+            codes.extend(c for c in code.co_consts
+                         if isinstance(c, types.CodeType))
+    return sha.hexdigest()[:20]
+
+
+def load_kernel(code, name, namespace):
+    """Compile the function ``name`` defined by the source ``code`` through
+    the kernel cache.
+
+    Parameters
+    ----------
+    code : str
+        Source text defining the function ``name`` and any helpers it calls.
+        Functions to be compiled must be decorated with ``@_jit``, which is
+        numba's ``jit`` in nopython, nogil and cache mode.
+    name : str
+        Name of the function to return.
+    namespace : dict
+        Global names referenced by ``code``, mapped to the functions,
+        modules, or ``bool``, ``int``, ``float``, ``str`` or None constants
+        they refer to. Every function must be importable by qualified name.
+
+    Returns
+    -------
+    The jitted function, or None if the cache is disabled (always the case
+    on Python 2) or ``namespace`` contains values that can't be defined in
+    a generated module.
+    """
+    cache_dir = get_cache_dir()
+    if cache_dir is None or not PY3:
+        return None
+
+    imports = []
+    for key in sorted(namespace):
+        line = _namespace_line(key, namespace[key])
+        if line is None:
+            return None
+        imports.append(line)
+
+    digest = _source_digest([namespace[key] for key in sorted(namespace)])
+    source = '\n'.join(
+        ['# Kernel generated by datashader ({0}), do not edit'.format(_versions()),
+         '# Sources of the functions called: {0}'.format(digest),
+         'from numba import jit',
+         'from importlib import import_module as _import_module',
+         'from datashader.kernel_cache import resolve as _resolve',
+         '',
+         '_jit = jit(nopython=True, nogil=True, cache=True)'] + imports +
+        ['', '', code, ''])
+    digest = hashlib.sha1(source.encode('utf-8')).hexdigest()[:20]
+    modname = _module_prefix + digest
+
+    module = sys.modules.get(modname)
+    if module is None:
+        module = _import_file(cache_dir, modname, source)
+    return getattr(module, name)
+
+
+def _namespace_line(name, value):
+    """Return the line of a generated module binding ``name`` to ``value``,
+    or None if it can't be."""
+    if isinstance(value, types.ModuleType):
+        return '{0} = _import_module({1!r})'.format(name, value.__name__)
+    if value is None or type(value) in (bool, int, float, str):
+        return '{0} = {1!r}'.format(name, value)
+    path = import_path(value)
+    if path is None:
+        return None
+    return '{0} = _resolve({1!r}, {2!r})'.format(name, *path)
+
+
+def jit_function(func):
+    """Compile the function ``func``, typically nested in another, through
+    the kernel cache.
+
+    The source of ``func`` is that recorded by ``macros.expand_varargs``,
+    or read by ``inspect``, without its decorators. The global names and
+    the variables of enclosing functions it refers to must have values
+    ``load_kernel`` can bind, such as functions compiled by ``jit_function``
+    themselves.
+
+    Returns
+    -------
+    The jitted function, or None if the cache is disabled or ``func`` can't
+    be written to a module.
+    """
+    if get_cache_dir() is None or not PY3:
+        return None
+    source = getattr(func, '_kernel_source', None)
+    if source is None:
+        try:
+            source = textwrap.dedent(inspect.getsource(func))
+        except (IOError, OSError, TypeError):
+            return None
+    lines = source.splitlines()
+    while lines and lines[0].startswith('@'):
+        lines.pop(0)
+    if not lines or not lines[0].startswith('def {0}('.format(func.__name__)):
+        return None
+
+    code = func.__code__
+    namespace = {}
+    if code.co_freevars:
+        for name, cell in zip(code.co_freevars, func.__closure__):
+            try:
+                namespace[name] = cell.cell_contents
+            except ValueError:
+                # Not assigned yet
+                return None
+    codes = [code]
+    while codes:
+        code = codes.pop()
+        for instr in dis.get_instructions(code):
+            # Names missing from the globals are builtins
+            if (instr.opname == 'LOAD_GLOBAL' and
+                    instr.argval in func.__globals__):
+                namespace[instr.argval] = func.__globals__[instr.argval]
+        codes.extend(c for c in code.co_consts
+                     if isinstance(c, types.CodeType))
+    return load_kernel('@_jit\n' + '\n'.join(lines) + '\n', func.__name__,
+                       namespace)
+
+
+def _import_file(cache_dir, modname, source):
+    if not os.path.isdir(cache_dir):
+        os.makedirs(cache_dir)
+    path = os.path.join(cache_dir, modname + '.py')
+    if not os.path.exists(path):
+        # Write to a temporary file first so that concurrent processes
+        # never import a partially written module
+        fd, tmp = tempfile.mkstemp(suffix='.py', dir=cache_dir)
+        with os.fdopen(fd, 'w') as f:
+            f.write(source)
+        os.replace(tmp, path)
+
+    import importlib.util
+    spec = importlib.util.spec_from_file_location(modname, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[modname] = module
+    try:
+        spec.loader.exec_module(module)
+    except Exception:
+        del sys.modules[modname]
+        raise
+    return module
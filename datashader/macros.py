@@ -298,5 +298,27 @@ def expand_varargs(expand_number):
     def _expand_varargs(fn):
         fn_ast = function_to_ast(fn)
         fn_expanded_ast = expand_function_ast_varargs(fn_ast, expand_number)
-        return function_ast_to_function(fn_expanded_ast, stacklevel=2)
+        expanded = function_ast_to_function(fn_expanded_ast, stacklevel=2)
+        expanded._kernel_source = _expanded_source(
+            fn, fn_ast, fn_expanded_ast, expand_number)
+        return expanded
     return _expand_varargs
+
+
+def _expanded_source(fn, fn_ast, fn_expanded_ast, expand_number):
+    """
+    Source code of the function ``fn`` with its variable length argument
+    expanded as in ``fn_expanded_ast``, without decorators, so that it can
+    be written to a module by ``kernel_cache.jit_function``
+    """
+    vararg = fn_ast.body[0].args.vararg
+    vararg_name = vararg if isinstance(vararg, str) else vararg.arg
+    expanded_args = fn_expanded_ast.body[0].args.args
+    expand_names = [getattr(arg, 'arg', None) or arg.id
+                    for arg in expanded_args[len(expanded_args) -
+                                             expand_number:]]
+    lines = textwrap.dedent(inspect.getsource(fn)).splitlines()
+    while lines and lines[0].startswith('@'):
+        lines.pop(0)
+    return re.sub(r'\*\s*' + re.escape(vararg_name) + r'\b',
+                  ', '.join(expand_names), '\n'.join(lines) + '\n')
@@ -0,0 +1,238 @@
+"""
+Column statistics stored in the footers of Parquet files.
+
+Parquet files record the minimum and maximum of each column in each row
+group. They give the extents of a dataset without reading its rows, and
+let the Dask pipeline skip the row groups that can't hold any point in
+the viewport of a canvas.
+
+>>> from datashader.parquet import read_parquet
+>>> ddf = read_parquet('points.parquet', columns=['x', 'y'])  # doctest: +SKIP
+>>> cvs = ds.Canvas(x_range=(0, 1), y_range=(0, 1))  # doctest: +SKIP
+>>> agg = cvs.points(ddf, 'x', 'y')  # doctest: +SKIP
+
+Pruning pays off when the data is sorted or clustered by x or y, so that
+each row group covers a small part of the extent.
+"""
+from __future__ import absolute_import, division, print_function
+
+import os
+import warnings
+from numbers import Number
+
+import numpy as np
+import pandas as pd
+import dask.dataframe as dd
+from dask.utils import natural_sort_key
+
+from .cache import LRUCache
+
+__all__ = ['parquet_files', 'row_group_statistics', 'parquet_extents',
+           'read_parquet', 'partition_statistics', 'prune_partitions',
+           'prune_row_groups']
+
+# Statistics of the partitions of the frames returned by read_parquet and
+# prune_partitions, by graph name
+_statistics = LRUCache(max_size=64)
+
+
+def _pyarrow_parquet():
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError('Reading Parquet statistics requires pyarrow')
+    return pq
+
+
+def parquet_files(path):
+    """Return the data files of the Parquet dataset at ``path``, a file or a
+    directory of files, in the order dask reads them."""
+    if not os.path.isdir(path):
+        return [path]
+    files = []
+    for root, dirs, names in os.walk(path):
+        files.extend(os.path.join(root, name) for name in names
+                     if not name.startswith(('_', '.')))
+        dirs[:] = [d for d in dirs if not d.startswith(('_', '.'))]
+    return sorted(files, key=natural_sort_key)
+
+
+def _dtypes(fname):
+    """Return the pandas dtypes of the columns of the Parquet file
+    ``fname``."""
+    pq = _pyarrow_parquet()
+    meta = pq.ParquetFile(fname).schema_arrow.empty_table().to_pandas()
+    return meta.dtypes
+
+
+def _as_dtype(value, dtype):
+    """Convert ``value``, a statistic or bound of a column, to the scalar
+    type of ``dtype``, the pandas dtype of the column, so that statistics
+    compare with bounds, e.g. ``datetime`` statistics with ``datetime64``
+    or integer nanosecond bounds."""
+    if dtype.kind == 'M':
+        if isinstance(value, Number):
+            value = int(value)
+        return np.datetime64(pd.Timestamp(value).value, 'ns')
+    if dtype.kind in 'iuf' and isinstance(value, Number):
+        return dtype.type(value)
+    return value
+
+
+def row_group_statistics(path, columns):
+    """Return the statistics of ``columns`` for each row group of the
+    Parquet dataset at ``path``, converted to the dtypes of the columns.
+
+    Returns
+    -------
+    A list holding for each file a list holding for each row group a dict
+    mapping each column to its ``(min, max)``, or None if the row group has
+    no statistics for the column.
+    """
+    pq = _pyarrow_parquet()
+    result = []
+    for fname in parquet_files(path):
+        metadata = pq.ParquetFile(fname).metadata
+        names = [metadata.schema.column(i).path
+                 for i in range(metadata.num_columns)]
+        dtypes = _dtypes(fname)
+        file_stats = []
+        for i in range(metadata.num_row_groups):
+            row_group = metadata.row_group(i)
+            stats = {}
+            for column in columns:
+                stats[column] = None
+                if column not in names:
+                    continue
+                column_stats = row_group.column(names.index(column)).statistics
+                if column_stats is not None and column_stats.has_min_max:
+                    dtype = dtypes[column]
+                    stats[column] = (_as_dtype(column_stats.min, dtype),
+                                     _as_dtype(column_stats.max, dtype))
+            file_stats.append(stats)
+        result.append(file_stats)
+    return result
+
+
+def parquet_extents(path, columns):
+    """Return a dict mapping each of ``columns`` to its ``(min, max)`` over
+    the Parquet dataset at ``path``, for the columns having statistics in
+    every row group."""
+    row_groups = [stats for file_stats in row_group_statistics(path, columns)
+                  for stats in file_stats]
+    return _extents(row_groups, columns)
+
+
+def _extents(row_groups, columns):
+    extents = {}
+    for column in columns:
+        stats = [rg[column] for rg in row_groups]
+        if stats and all(s is not None for s in stats):
+            extents[column] = (min(s[0] for s in stats),
+                               max(s[1] for s in stats))
+    return extents
+
+
+def read_parquet(path, columns=None, **kwargs):
+    """Read the Parquet dataset at ``path`` into a Dask DataFrame with one
+    partition per row group with ``dask.dataframe.read_parquet``, reading
+    the statistics of each row group from the footers once.
+
+    The statistics are kept by the name of the graph of the frame, and the
+    Dask pipeline uses those of the x and y columns to skip the partitions
+    holding no point in the ranges of the canvas. The extents of all the
+    columns are registered in ``Glyph.extents_cache``. Frames derived from
+    the one returned have other names and no statistics, except those
+    returned by ``prune_partitions`` and ``persist``, so select rows or
+    columns by aggregating or in ``read_parquet`` rather than on the frame.
+
+    Parameters
+    ----------
+    path : str
+        A Parquet file, or a directory of Parquet files.
+    columns : list of str, optional
+        Columns to read. Default is all the columns.
+    **kwargs
+        Passed to ``dask.dataframe.read_parquet``.
+
+    Returns
+    -------
+    dask.dataframe.DataFrame
+    """
+    files = parquet_files(path)
+    if not files:
+        raise ValueError('No Parquet files found in {0!r}'.format(path))
+    kwargs = dict(kwargs, engine='pyarrow', split_row_groups=True)
+    ddf = dd.read_parquet(path, columns=columns, **kwargs)
+
+    stat_columns = list(ddf.columns)
+    stats = [row_group_stats for file_stats
+             in row_group_statistics(path, stat_columns)
+             for row_group_stats in file_stats]
+    if len(stats) != ddf.npartitions:
+        # e.g. row groups dropped by filters
+        warnings.warn('The partitions of {0!r} are not its row groups, they '
+                      'will not be pruned'.format(path))
+        return ddf
+    _statistics.put(ddf._name, stats)
+
+    from .glyphs import Glyph
+    if Glyph.extents_cache is not None:
+        Glyph.extents_cache.register(ddf, _extents(stats, stat_columns))
+    return ddf
+
+
+def partition_statistics(ddf):
+    """Return the list of the statistics of each partition of ``ddf``, as
+    dicts mapping columns to ``(min, max)`` or None, if ``ddf`` was
+    returned by ``read_parquet`` or ``prune_partitions``, or None."""
+    return _statistics.get(ddf._name)
+
+
+def prune_partitions(ddf, ranges):
+    """Return the partitions of ``ddf`` whose statistics intersect the
+    ``(min, max)`` ranges of ``ranges``, a dict mapping column names to
+    ranges.
+
+    ``ddf`` is returned as is if it has no statistics. A single partition
+    is kept if no partition intersects the ranges.
+    """
+    stats = partition_statistics(ddf)
+    if stats is None:
+        return ddf
+    dtypes = ddf.dtypes
+    bounds = dict((column, (_as_dtype(lo, dtypes[column]),
+                            _as_dtype(hi, dtypes[column])))
+                  for column, (lo, hi) in ranges.items())
+    mask = np.array([all(_intersects(part_stats.get(column), col_bounds)
+                         for column, col_bounds in bounds.items())
+                     for part_stats in stats])
+    if mask.all():
+        return ddf
+    if not mask.any():
+        mask[0] = True
+    pruned = ddf.partitions[mask]
+    _statistics.put(pruned._name,
+                    [part_stats for part_stats, keep in zip(stats, mask)
+                     if keep])
+    return pruned
+
+
+def _intersects(stats, bounds):
+    """Whether the ``(min, max)`` statistics of a column, None if unknown,
+    intersect ``bounds``, both converted to the dtype of the column."""
+    if stats is None:
+        return True
+    return stats[0] <= bounds[1] and stats[1] >= bounds[0]
+
+
+def prune_row_groups(df, canvas, glyph):
+    """Drop the partitions of a frame read by ``read_parquet`` whose row
+    group statistics show they hold no point within the ranges of
+    ``canvas``."""
+    from .glyphs import Point
+    if (type(glyph) is not Point or canvas.x_range is None or
+            canvas.y_range is None):
+        return df
+    return prune_partitions(df, {glyph.x: canvas.x_range,
+                                 glyph.y: canvas.y_range})
@@ -1,11 +1,89 @@
 from __future__ import absolute_import, division, print_function
 
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+from dask.base import is_dask_collection
+from dask.callbacks import Callback
 from toolz import identity
 
 from . import transfer_functions as tf
 from . import reductions
 from . import core
 
+# Number of rows of pandas sources aggregated between checks for
+# cancellation of asynchronous renders, and between progressive images
+chunk_rows = 2**20
+
+# Number of rows of the uniform sample of pandas sources the first
+# progressive image is computed from
+sample_rows = 10**5
+
+# Number of partitions of Dask sources computed in parallel while
+# progressive images are aggregated
+prefetch_partitions = 4
+
+
+class RenderCancelled(Exception):
+    """Raised in a render superseded by a more recent request"""
+
+
+class _CancelToken(object):
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    def check(self, *args):
+        if self._event.is_set():
+            raise RenderCancelled()
+
+
+class _CancelCallback(Callback):
+    """Checks a ``_CancelToken`` before each task of the Dask graphs
+    computed by the thread entering it.
+
+    Callbacks apply to every graph computed by local schedulers while they
+    are active, whichever thread computes it, and tasks are started by the
+    thread computing their graph: checking the thread leaves the graphs of
+    other renders and computations alone."""
+    def __init__(self, token):
+        super(_CancelCallback, self).__init__()
+        self._token = token
+        self._thread = threading.current_thread()
+
+    def _pretask(self, key, dsk, state):
+        if threading.current_thread() is self._thread:
+            self._token.check()
+
+
+def _computed_partitions(df, ordered=False):
+    """Yield the partitions of the Dask DataFrame ``df`` as pandas frames,
+    computing up to ``prefetch_partitions`` of them in parallel, as they
+    complete or in order if ``ordered``."""
+    from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+    from dask import compute
+    partitions = iter(df.to_delayed())
+    pending = []
+    with ThreadPoolExecutor(prefetch_partitions) as executor:
+        while True:
+            for partition in partitions:
+                pending.append(executor.submit(compute, partition))
+                if len(pending) >= prefetch_partitions:
+                    break
+            if not pending:
+                return
+            if ordered:
+                done = [pending[0]]
+            else:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                pending.remove(future)
+                yield future.result()[0]
+
 
 class Pipeline(object):
     """A datashading pipeline callback.
@@ -39,10 +117,21 @@ class Pipeline(object):
         Factor by which to scale the provided height
     width_scale: float, optional
         Factor by which to scale the provided width
+    executor : concurrent.futures.Executor, optional
+        Executor running the renders of ``render_async``. Default is the
+        default executor of the event loop.
+
+    Attributes
+    ----------
+    timings : OrderedDict
+        Duration in seconds of each stage (``aggregate``, ``transform``,
+        ``shade``, ``spread`` and ``total``) of the last completed render.
+    cancelled_renders : int
+        Number of asynchronous renders cancelled as they were superseded.
     """
     def __init__(self, df, glyph, agg=reductions.count(),
                  transform_fn=identity, color_fn=tf.shade, spread_fn=tf.dynspread,
-                 width_scale=1.0, height_scale=1.0):
+                 width_scale=1.0, height_scale=1.0, executor=None):
         self.df = df
         self.glyph = glyph
         self.agg = agg
@@ -51,6 +140,14 @@ class Pipeline(object):
         self.spread_fn = spread_fn
         self.width_scale = width_scale
         self.height_scale = height_scale
+        self.executor = executor
+        self.timings = OrderedDict()
+        self.cancelled_renders = 0
+        # State of render_async: the token of the running render, the latest
+        # request not rendered yet, and the futures waiting for an image
+        self._running = None
+        self._latest = None
+        self._waiters = []
 
     def __call__(self, x_range=None, y_range=None, width=600, height=600):
         """Compute an image from the specified pipeline.
@@ -63,9 +160,195 @@ class Pipeline(object):
         width, height : int, optional
             The shape of the image
         """
-        canvas = core.Canvas(plot_width=int(width*self.width_scale),
-                             plot_height=int(height*self.height_scale),
-                             x_range=x_range, y_range=y_range)
-        bins = core.bypixel(self.df, canvas, self.glyph, self.agg)
+        return self._render(x_range, y_range, width, height)
+
+    def progressive(self, x_range=None, y_range=None, width=600, height=600,
+                    final=False):
+        """Compute images from the specified pipeline, from coarse to fine.
+
+        For pandas sources, the first image is computed from a uniform
+        sample of ``sample_rows`` rows, so that the time to the first image
+        doesn't depend on the size of the source. The rows are then
+        aggregated in chunks of ``chunk_rows`` rows, or one partition at a
+        time for Dask sources, an image being yielded each time the number
+        of chunks aggregated doubles, and once they all are. Up to
+        ``prefetch_partitions`` partitions of Dask sources are computed in
+        parallel, and aggregated as they complete, in order for lines. The
+        last image is the one returned by calling the pipeline.
+        Intermediate images show partial aggregates, and ranges missing
+        from the viewport are computed first so that every image covers the
+        same area.
+
+        Parameters are those of calling the pipeline, and:
+
+        final : bool, optional
+            If True, only the last image is yielded, computed as by calling
+            the pipeline, for callers that can't display the intermediate
+            images.
+        """
+        df = self.df
+        canvas = self._canvas(x_range, y_range, width, height)
+        if (final or not self._chunkable() or
+                (isinstance(df, pd.DataFrame) and not len(df)) or
+                not (isinstance(df, pd.DataFrame) or is_dask_collection(df))):
+            yield self._render(x_range, y_range, width, height)
+            return
+
+        if canvas.x_range is None or canvas.y_range is None:
+            if is_dask_collection(df):
+                x_bounds, y_bounds = self.glyph.compute_bounds_dask(df)
+            else:
+                x_bounds = self.glyph.compute_x_bounds(df)
+                y_bounds = self.glyph.compute_y_bounds(df)
+            canvas.x_range = canvas.x_range or x_bounds
+            canvas.y_range = canvas.y_range or y_bounds
+
+        if isinstance(df, pd.DataFrame):
+            if len(df) > sample_rows:
+                step = -(-len(df) // sample_rows)
+                yield self._shade(core.bypixel(df.iloc[::step], canvas,
+                                               self.glyph, self.agg))
+            chunks = (df.iloc[start:start + chunk_rows]
+                      for start in range(0, len(df), chunk_rows))
+            nchunks = -(-len(df) // chunk_rows)
+        else:
+            from .data_libraries.pandas import _connected_glyphs
+            # Rows joined by lines must be aggregated in order
+            chunks = _computed_partitions(
+                df, ordered=isinstance(self.glyph, _connected_glyphs))
+            nchunks = df.npartitions
+
+        # Yield after 1, 2, 4, 8... chunks, and after the last one
+        aggs = core.iter_bypixel(
+            chunks, canvas, self.glyph, self.agg,
+            progressive=lambda i: i & (i - 1) == 0 and i < nchunks)
+        for agg in aggs:
+            yield self._shade(agg)
+
+    def render_async(self, x_range=None, y_range=None, width=600,
+                     height=600):
+        """Compute an image from the specified pipeline in ``executor``.
+
+        Returns an ``asyncio.Future`` of the image. Requests are coalesced:
+        a request made while a render is running cancels it, between
+        chunks of rows of pandas sources (unless the glyph or reduction
+        can't be aggregated in chunks, as ``Triangles`` or ``top_k``),
+        between tasks of Dask sources and between stages, and only the latest request made meanwhile is
+        rendered next. Every pending future receives the image of the
+        latest viewport, so that stale renders are never waited for. Must
+        be called from the thread running the event loop.
+
+        Parameters
+        ----------
+        x_range, y_range : tuple, optional
+            The bounding box on the viewport, specified as tuples of
+            ``(min, max)``
+        width, height : int, optional
+            The shape of the image
+        """
+        import asyncio
+        loop = asyncio.get_event_loop()
+        future = loop.create_future()
+        self._waiters.append(future)
+        self._latest = (x_range, y_range, width, height)
+        if self._running is None:
+            self._start(loop)
+        else:
+            self._running.cancel()
+        return future
+
+    def _start(self, loop):
+        token = self._running = _CancelToken()
+        request, self._latest = self._latest, None
+        waiters, self._waiters = self._waiters, []
+        render = loop.run_in_executor(self.executor, self._render,
+                                      *(request + (token,)))
+        render.add_done_callback(
+            lambda render: self._finished(loop, render, waiters))
+
+    def _finished(self, loop, render, waiters):
+        self._running = None
+        if self._latest is not None:
+            # Superseded, the waiters get the image of the latest request
+            if isinstance(render.exception(), RenderCancelled):
+                self.cancelled_renders += 1
+            self._waiters = waiters + self._waiters
+            self._start(loop)
+            return
+        for waiter in waiters:
+            if waiter.done():
+                continue
+            if render.exception() is not None:
+                waiter.set_exception(render.exception())
+            else:
+                waiter.set_result(render.result())
+
+    def _render(self, x_range, y_range, width, height, token=None):
+        start = time.time()
+        timings = OrderedDict()
+
+        def stage(name, fn, *args):
+            if token is not None:
+                token.check()
+            t = time.time()
+            result = fn(*args)
+            timings[name] = time.time() - t
+            return result
+
+        canvas = self._canvas(x_range, y_range, width, height)
+        bins = stage('aggregate', self._aggregate, canvas, token)
+        agg = stage('transform', self.transform_fn, bins)
+        img = stage('shade', self.color_fn, agg)
+        img = stage('spread', self.spread_fn, img)
+        timings['total'] = time.time() - start
+        self.timings = timings
+        return img
+
+    def _canvas(self, x_range, y_range, width, height):
+        return core.Canvas(plot_width=int(width*self.width_scale),
+                           plot_height=int(height*self.height_scale),
+                           x_range=x_range, y_range=y_range)
+
+    def _shade(self, bins):
         img = self.color_fn(self.transform_fn(bins))
         return self.spread_fn(img)
+
+    def _aggregate(self, canvas, token=None):
+        df = self.df
+        if token is None:
+            return core.bypixel(df, canvas, self.glyph, self.agg)
+        if is_dask_collection(df):
+            with _CancelCallback(token):
+                return core.bypixel(df, canvas, self.glyph, self.agg)
+        if not (isinstance(df, pd.DataFrame) and len(df) > chunk_rows and
+                self._chunkable()):
+            return core.bypixel(df, canvas, self.glyph, self.agg)
+
+        # Aggregated in chunks to check for cancellation between them,
+        # looking the aggregate up in bypixel.cache as bypixel does
+        cache = core.bypixel.cache
+        key = (None if cache is None else
+               cache.key(df, canvas, self.glyph, self.agg))
+        if key is not None:
+            result = cache.get(key)
+            if result is not None:
+                return result
+
+        def chunks():
+            for start in range(0, len(df), chunk_rows):
+                token.check()
+                yield df.iloc[start:start + chunk_rows]
+        result = core.bypixel(chunks, canvas, self.glyph, self.agg)
+        if key is not None:
+            cache.put(key, result)
+        return result
+
+    def _chunkable(self):
+        """Whether pandas sources can be aggregated in chunks, see
+        ``core.iter_bypixel``."""
+        from .glyphs import Triangles
+        if isinstance(self.glyph, Triangles):
+            return False
+        return not any(isinstance(red, reductions.by) and
+                       red.top_k is not None
+                       for red in core.traverse_aggregation(self.agg))
@@ -0,0 +1,413 @@
+"""
+Precomputed multi-resolution aggregate pyramids of points.
+
+An aggregate pyramid holds count and sum aggregates of a fixed set of points
+over their full extent at power-of-two resolutions: level ``L`` is a grid of
+``2**L`` by ``2**L`` pixels. The finest level is aggregated from the rows
+once, and every coarser level is derived from the one below it by summing
+blocks of 2x2 pixels. Each level is stored as square tiles of at most
+``tile_size`` pixels per side, one ``.npy`` file per tile and aggregate, and
+tiles that no point falls in aren't stored. Building the pyramid reads the
+rows a chunk (or Dask partition) at a time and adds them to the tiles they
+fall in, and each coarser tile is computed from the four tiles below it, so
+neither building nor reading a pyramid holds a whole level in memory.
+
+Passing a pyramid to ``Canvas.points`` answers the view of the canvas from
+the coarsest level at least as fine as the canvas, summing the pixels of
+that level whose centers fall in each pixel of the canvas, without scanning
+the rows again. Only the tiles overlapping the view are read. Views finer
+than the finest level get the finest pixels assigned to the canvas pixels
+holding their centers, which leaves gaps.
+
+>>> import datashader as ds
+>>> from datashader.pyramid import build_pyramid
+>>> pyramid = build_pyramid('pyramid_dir', df, 'x', 'y', ds.mean('value'),
+...                         levels=12)  # doctest: +SKIP
+>>> cvs = ds.Canvas(plot_width=800, plot_height=600, x_range=(0, 10),
+...                 y_range=(0, 5))
+>>> agg = cvs.points(pyramid, 'x', 'y', ds.mean('value'))  # doctest: +SKIP
+"""
+from __future__ import absolute_import, division, print_function
+
+import json
+import os
+import shutil
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+import dask
+import dask.dataframe as dd
+from numpy.lib.format import open_memmap
+
+from . import reductions as rd
+from .compiler import traverse_aggregation
+from .glyphs import Point
+
+__all__ = ['AggregatePyramid', 'build_pyramid']
+
+_metadata_file = 'pyramid.json'
+
+# Pixels along each side of the tiles the levels are stored in, a power of 2
+tile_size = 512
+
+# Rows of a pandas DataFrame, and partitions of a Dask DataFrame, aggregated
+# at a time when building the finest level
+chunk_rows = 2**20
+chunk_partitions = 8
+
+
+def _base_names(agg):
+    """Return the names of the stored aggregates needed to compute ``agg``,
+    mapped to the reduction computing them."""
+    names = OrderedDict()
+    for red in traverse_aggregation(agg):
+        if type(red) is rd.count:
+            if red.column is None:
+                names['count'] = rd.count()
+            else:
+                names['count_' + red.column] = rd.count(red.column)
+        elif type(red) in (rd.sum, rd.mean):
+            names['count_' + red.column] = rd.count(red.column)
+            names['sum_' + red.column] = rd.sum(red.column)
+        else:
+            raise ValueError("Aggregate pyramids only support count, sum and "
+                             "mean reductions, got {0}"
+                             .format(type(red).__name__))
+    return names
+
+
+def _dtype(name):
+    return np.dtype('u4' if name.startswith('count') else 'f8')
+
+
+def build_pyramid(path, source, x, y, agg=None, levels=10, x_range=None,
+                  y_range=None):
+    """Aggregate the points of ``source`` into a pyramid stored in ``path``.
+
+    Parameters
+    ----------
+    path : str
+        Directory to store the pyramid in. It is created if needed, and any
+        pyramid already stored in it is replaced.
+    source : pandas.DataFrame or dask.DataFrame
+        The points to aggregate.
+    x, y : str
+        Column names for the x and y coordinates of each point.
+    agg : Reduction, optional
+        Reductions the pyramid must be able to answer: ``count``, ``sum``,
+        ``mean``, or a ``summary`` of them. Default is ``count()``.
+    levels : int, optional
+        Number of the finest level, which has ``2**levels`` pixels along each
+        axis. Levels ``0`` to ``levels`` are stored.
+    x_range, y_range : tuple, optional
+        Extent covered by the pyramid. Defaults to the bounds of the points.
+
+    Returns
+    -------
+    The ``AggregatePyramid`` stored in ``path``.
+    """
+    from .core import Canvas, _bypixel_source
+    from .sparse_agg import _append_index, _no_columns, _partials
+
+    if agg is None:
+        agg = rd.count()
+    names = _base_names(agg)
+    if levels < 0:
+        raise ValueError('levels must be non-negative')
+
+    glyph = Point(x, y)
+    if x_range is None or y_range is None:
+        if isinstance(source, dd.DataFrame):
+            bounds = glyph.compute_bounds_dask(source)
+        else:
+            bounds = (glyph.compute_x_bounds(source),
+                      glyph.compute_y_bounds(source))
+        x_range = x_range or bounds[0]
+        y_range = y_range or bounds[1]
+
+    # Rows are added to the tiles already stored, so remove any previous
+    # pyramid, starting with its metadata
+    if os.path.exists(os.path.join(path, _metadata_file)):
+        os.remove(os.path.join(path, _metadata_file))
+    if os.path.isdir(path):
+        for entry in os.listdir(path):
+            if entry.startswith('level_'):
+                shutil.rmtree(os.path.join(path, entry))
+
+    n = 2 ** levels
+    canvas = Canvas(plot_width=n, plot_height=n, x_range=x_range,
+                    y_range=y_range)
+    summary = rd.summary(**names)
+    source, _ = _bypixel_source(source, canvas, glyph, summary)
+    if not isinstance(source, (pd.DataFrame, dd.DataFrame)):
+        raise ValueError('Aggregate pyramids are built from pandas or Dask '
+                         'DataFrames')
+
+    # Map each row to the flat index of its pixel of the finest level with
+    # the kernel of the Point glyph, as when aggregating the rows directly
+    vt = (canvas.x_axis.compute_scale_and_translate(canvas.x_range, n) +
+          canvas.y_axis.compute_scale_and_translate(canvas.y_range, n))
+    bounds = canvas.x_range + canvas.y_range
+    extend = glyph._build_extend(canvas.x_axis.mapper, canvas.y_axis.mapper,
+                                 _no_columns, _append_index)
+    reds = list(names.values())
+
+    def aggregate(df):
+        index = np.full(len(df), -1, dtype='i8')
+        extend((index, np.array([n], dtype='i8')), df, vt, bounds)
+        return [_partials(red, df, index, 0) for red in reds]
+
+    if isinstance(source, dd.DataFrame):
+        parts = source.to_delayed()
+        batches = (dask.compute(*[dask.delayed(aggregate)(part) for part
+                                  in parts[start:start + chunk_partitions]])
+                   for start in range(0, len(parts), chunk_partitions))
+        chunks = (chunk for batch in batches for chunk in batch)
+    else:
+        chunks = (aggregate(source.iloc[start:start + chunk_rows])
+                  for start in range(0, len(source), chunk_rows))
+    for partials in chunks:
+        for name, (keys, counts, sums) in zip(names, partials):
+            values = counts if name.startswith('count') else sums
+            _add_to_tiles(path, levels, name, keys, values)
+
+    for level in range(levels - 1, -1, -1):
+        for name in names:
+            _coarsen(path, level, name)
+
+    metadata = dict(x=x, y=y, x_range=list(x_range), y_range=list(y_range),
+                    levels=levels, names=list(names), tile_size=tile_size)
+    with open(os.path.join(path, _metadata_file), 'w') as f:
+        json.dump(metadata, f)
+    return AggregatePyramid(path)
+
+
+def _tile_file(path, level, name, ty, tx):
+    return os.path.join(path, 'level_{0}'.format(level),
+                        '{0}_{1}_{2}.npy'.format(name, ty, tx))
+
+
+def _open_tile(path, level, name, ty, tx, size):
+    """Memory-map a tile for update, creating it filled with zeros if it
+    isn't stored"""
+    filename = _tile_file(path, level, name, ty, tx)
+    if os.path.exists(filename):
+        return np.load(filename, mmap_mode='r+')
+    directory = os.path.dirname(filename)
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    return open_memmap(filename, mode='w+', dtype=_dtype(name),
+                       shape=(size, size))
+
+
+def _add_to_tiles(path, level, name, keys, values):
+    """Add ``values`` to the pixels of ``level`` with the unique flat indices
+    ``keys``"""
+    n = 2 ** level
+    size = min(tile_size, n)
+    rows, cols = np.divmod(keys, n)
+    tiles = (rows // size) * (n // size) + cols // size
+    order = np.argsort(tiles, kind='mergesort')
+    tiles, rows, cols, values = (tiles[order], rows[order], cols[order],
+                                 values[order])
+    starts = np.flatnonzero(np.diff(tiles, prepend=-1))
+    stops = np.append(starts[1:], len(tiles))
+    for start, stop in zip(starts, stops):
+        ty, tx = divmod(int(tiles[start]), n // size)
+        tile = _open_tile(path, level, name, ty, tx, size)
+        flat = tile.reshape(-1)
+        flat[(rows[start:stop] % size) * size + cols[start:stop] % size] += \
+            values[start:stop].astype(tile.dtype)
+        tile.flush()
+        del flat, tile
+
+
+def _coarsen(path, level, name):
+    """Store the tiles of ``level`` by summing the 2x2 pixel blocks of the
+    tiles of the level below it"""
+    n = 2 ** level
+    size = min(tile_size, n)
+    ntiles = n // size
+    # Each coarse tile covers 2x2 fine tiles, or a single fine tile of twice
+    # its size at the levels smaller than a tile
+    span = 2 if 2 * n > tile_size else 1
+    fine_size = min(tile_size, 2 * n)
+    half = fine_size // 2
+    for ty in range(ntiles):
+        for tx in range(ntiles):
+            coarse = None
+            for dy in range(span):
+                for dx in range(span):
+                    filename = _tile_file(path, level + 1, name,
+                                          span * ty + dy, span * tx + dx)
+                    if not os.path.exists(filename):
+                        continue
+                    fine = np.load(filename, mmap_mode='r')
+                    if coarse is None:
+                        coarse = _open_tile(path, level, name, ty, tx, size)
+                    coarse[dy * half:(dy + 1) * half,
+                           dx * half:(dx + 1) * half] = fine.reshape(
+                        half, 2, half, 2).sum(axis=(1, 3), dtype=fine.dtype)
+                    del fine
+            if coarse is not None:
+                coarse.flush()
+                del coarse
+
+
+class AggregatePyramid(object):
+    """A pyramid of aggregates stored by ``build_pyramid``.
+
+    Pass it as the source of ``Canvas.points`` to aggregate a view from the
+    pyramid instead of from the rows.
+
+    Parameters
+    ----------
+    path : str
+        Directory holding the pyramid.
+    """
+    def __init__(self, path):
+        with open(os.path.join(path, _metadata_file)) as f:
+            metadata = json.load(f)
+        self.path = path
+        self.x = metadata['x']
+        self.y = metadata['y']
+        self.x_range = tuple(metadata['x_range'])
+        self.y_range = tuple(metadata['y_range'])
+        self.levels = metadata['levels']
+        self.names = metadata['names']
+        self.tile_size = metadata['tile_size']
+
+    def __repr__(self):
+        return 'AggregatePyramid({0!r}, levels={1}, x_range={2}, y_range={3})'\
+            .format(self.path, self.levels, self.x_range, self.y_range)
+
+    def level(self, level, name):
+        """Return the whole aggregate ``name`` of level ``level``, read into
+        memory"""
+        n = 2 ** level
+        return self.window(level, name, slice(0, n), slice(0, n))
+
+    def window(self, level, name, rows, cols):
+        """Return the pixels ``rows, cols`` of the aggregate ``name`` of
+        level ``level``, reading only the tiles they overlap.
+
+        Parameters
+        ----------
+        level : int
+        name : str
+        rows, cols : slice
+            Contiguous slices of the pixels of the level, with a step of 1.
+        """
+        if name not in self.names:
+            raise ValueError('The pyramid holds no {0!r} aggregate'
+                             .format(name))
+        n = 2 ** level
+        size = min(self.tile_size, n)
+        r0, r1, _ = rows.indices(n)
+        c0, c1, _ = cols.indices(n)
+        out = np.zeros((max(r1 - r0, 0), max(c1 - c0, 0)), dtype=_dtype(name))
+        for ty in range(r0 // size, (r1 + size - 1) // size):
+            for tx in range(c0 // size, (c1 + size - 1) // size):
+                filename = _tile_file(self.path, level, name, ty, tx)
+                if not os.path.exists(filename):
+                    continue
+                tile = np.load(filename, mmap_mode='r')
+                y0, y1 = max(r0, ty * size), min(r1, (ty + 1) * size)
+                x0, x1 = max(c0, tx * size), min(c1, (tx + 1) * size)
+                out[y0 - r0:y1 - r0, x0 - c0:x1 - c0] = \
+                    tile[y0 - ty * size:y1 - ty * size,
+                         x0 - tx * size:x1 - tx * size]
+                del tile
+        return out
+
+    def select_level(self, canvas):
+        """Return the coarsest level at least as fine as ``canvas``, or the
+        finest level if there is none"""
+        x_range = canvas.x_range or self.x_range
+        y_range = canvas.y_range or self.y_range
+        ratio = max(
+            canvas.plot_width * (self.x_range[1] - self.x_range[0]) /
+            (x_range[1] - x_range[0]),
+            canvas.plot_height * (self.y_range[1] - self.y_range[0]) /
+            (y_range[1] - y_range[0]))
+        level = int(np.ceil(np.log2(ratio))) if ratio > 1 else 0
+        return min(level, self.levels)
+
+    def aggregate(self, canvas, agg=None):
+        """Compute ``agg`` over the view of ``canvas`` from the pyramid.
+
+        Equivalent to ``canvas.points(self, self.x, self.y, agg)``.
+        """
+        if agg is None:
+            agg = rd.count()
+        names = _base_names(agg)
+        for name in names:
+            if name not in self.names:
+                raise ValueError('The pyramid holds no {0!r} aggregate needed '
+                                 'by the reduction'.format(name))
+        from .core import LinearAxis
+        if not (isinstance(canvas.x_axis, LinearAxis) and
+                isinstance(canvas.y_axis, LinearAxis)):
+            raise ValueError('Aggregate pyramids only support linear axes')
+
+        x_range = canvas.x_range or self.x_range
+        y_range = canvas.y_range or self.y_range
+        width, height = canvas.plot_width, canvas.plot_height
+        level = self.select_level(canvas)
+        cols, col_starts, col_index = _bins(self.x_range, x_range, level, width)
+        rows, row_starts, row_index = _bins(self.y_range, y_range, level, height)
+
+        bases = {}
+        for name in names:
+            array = self.window(level, name, rows, cols)
+            out = np.zeros((height, width), dtype=array.dtype)
+            if array.size:
+                array = np.add.reduceat(array, col_starts, axis=1)
+                array = np.add.reduceat(array, row_starts, axis=0)
+                out[np.ix_(row_index, col_index)] = array
+            bases[name] = out
+
+        x_st = canvas.x_axis.compute_scale_and_translate(x_range, width)
+        y_st = canvas.y_axis.compute_scale_and_translate(y_range, height)
+        coords = OrderedDict([
+            (self.x, canvas.x_axis.compute_index(x_st, width)),
+            (self.y, canvas.y_axis.compute_index(y_st, height))])
+        dims = [self.y, self.x]
+
+        def finalize(red):
+            if type(red) is rd.count:
+                name = 'count' if red.column is None else 'count_' + red.column
+                return xr.DataArray(bases[name], coords=coords, dims=dims)
+            counts = bases['count_' + red.column]
+            sums = bases['sum_' + red.column]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                data = sums / counts if type(red) is rd.mean else sums
+            data = np.where(counts > 0, data, np.nan)
+            return xr.DataArray(data, coords=coords, dims=dims)
+
+        if isinstance(agg, rd.summary):
+            return xr.Dataset(OrderedDict((key, finalize(red)) for key, red
+                                          in zip(agg.keys, agg.values)))
+        return finalize(agg)
+
+
+def _bins(extent, view, level, n):
+    """Map the pixels of ``level`` along one axis to the ``n`` pixels of a
+    view.
+
+    Returns the slice of level pixels whose centers fall in the view, the
+    start of each run of consecutive level pixels falling in the same view
+    pixel (relative to the slice), and the view pixel of each run.
+    """
+    size = 2 ** level
+    centers = extent[0] + (np.arange(size) + 0.5) * (
+        (extent[1] - extent[0]) / size)
+    index = np.floor((centers - view[0]) * (n / (view[1] - view[0])))
+    inside = np.flatnonzero((index >= 0) & (index < n))
+    if not len(inside):
+        return slice(0, 0), np.zeros(0, dtype='i8'), np.zeros(0, dtype='i8')
+    index = index[inside[0]:inside[-1] + 1].astype('i8')
+    starts = np.flatnonzero(np.diff(index, prepend=-1))
+    return slice(inside[0], inside[-1] + 1), starts, index[starts]
@@ -148,15 +148,33 @@ class by(Reduction):
         categories present.
     reduction : Reduction
         Per-category reduction function.
+    top_k : int, optional
+        If given, only the ``top_k`` most frequent categories of ``column``
+        (counted over the whole source) get their own slice of the
+        aggregate, and all the others are merged into a single ``other``
+        category, which is placed last. This bounds the size of the
+        aggregate to ``top_k + 1`` slices for columns with many categories.
+    other : str, optional
+        Name of the category holding the categories not in the top ``top_k``.
     """
-    def __init__(self, cat_column, reduction):
+    def __init__(self, cat_column, reduction, top_k=None, other='other'):
+        if top_k is not None and top_k < 1:
+            raise ValueError("top_k must be at least 1")
         self.columns = (cat_column, getattr(reduction, 'column', None))
         self.reduction = reduction
         self.column = cat_column # for backwards compatibility with count_cat
+        self.top_k = top_k
+        self.other = other
 
     def __hash__(self):
         return hash((type(self), self._hashable_inputs(), self.reduction))
 
+    def _hashable_inputs(self):
+        inputs = super(by, self)._hashable_inputs()
+        if self.top_k is None:
+            return inputs
+        return inputs + (self.top_k, self.other)
+
     def _build_temps(self, cuda=False):
         return tuple(by(self.cat_column, tmp) for tmp in self.reduction._build_temps(cuda))
 
@@ -173,6 +191,9 @@ class by(Reduction):
             raise ValueError("specified column not found")
         if not isinstance(in_dshape.measure[self.cat_column], ct.Categorical):
             raise ValueError("input must be categorical")
+        if getattr(self.reduction, 'order', None) is not None:
+            raise ValueError("reductions with an order column are not "
+                             "supported per category")
 
         self.reduction.validate(in_dshape)
 
@@ -211,6 +232,8 @@ class by(Reduction):
         def finalize(bases, cuda=False, **kwargs):
             kwargs['dims'] += [self.cat_column]
             kwargs['coords'][self.cat_column] = cats
+            if self.top_k is not None:
+                kwargs['attrs'] = dict(other_category=self.other)
             return self.reduction._finalize(bases, cuda=cuda, **kwargs)
 
         return finalize
@@ -523,9 +546,15 @@ class count_cat(by):
         Name of the column to aggregate over. Column data type must be
         categorical. Resulting aggregate has a outer dimension axis along the
         categories present.
+    top_k : int, optional
+        If given, count only the ``top_k`` most frequent categories
+        separately, and all others together. See ``by``.
+    other : str, optional
+        Name of the category counting the categories not in the top
+        ``top_k``.
     """
-    def __init__(self, column):
-        super(count_cat, self).__init__(column, count())
+    def __init__(self, column, top_k=None, other='other'):
+        super(count_cat, self).__init__(column, count(), top_k, other)
 
 
 class mean(Reduction):
@@ -594,72 +623,316 @@ class std(Reduction):
         return xr.DataArray(x, **kwargs)
 
 
-class first(Reduction):
-    """First value encountered in ``column``.
+class _histogram(Reduction):
+    """Per-pixel histogram of the values in ``column``, counted in ``bins``
+    equal bins spanning ``range``, with values outside ``range`` counted in
+    the first or last bin.
 
-    Useful for categorical data where an actual value must always be returned,
-    not an average or other numerical calculation.
+    Intermediate value for computing ``quantile``, not intended to be used
+    on its own. The base array has an extra trailing axis of length ``bins``.
+    """
+    _dshape = dshape(ct.uint32)
 
-    Currently only supported for rasters, externally to this class.
+    def __init__(self, column, range, bins):
+        self.column = column
+        self.range = tuple(range)
+        self.bins = bins
+
+    def _hashable_inputs(self):
+        return (super(_histogram, self)._hashable_inputs() +
+                (self.range, self.bins))
+
+    def _build_create(self, dshape):
+        bins = self.bins
+        return lambda shape, array_module: array_module.zeros(
+            shape + (bins,), dtype='u4')
+
+    def _build_append(self, dshape, schema, cuda=False):
+        if cuda:
+            raise ValueError("The 'quantile' reduction operation is not yet "
+                             "supported on the GPU")
+        lo = float(self.range[0])
+        scale = self.bins / float(self.range[1] - self.range[0])
+        last = self.bins - 1
+
+        @ngjit
+        def _append(x, y, agg, field):
+            if not isnull(field):
+                b = (field - lo) * scale
+                i = 0 if b <= 0 else last if b >= last else int(b)
+                agg[y, x, i] += 1
+        return _append
+
+    @staticmethod
+    def _combine(aggs):
+        return aggs.sum(axis=0, dtype='u4')
+
+
+class quantile(Reduction):
+    """Approximate quantile of all elements in ``column``.
+
+    Values are counted in a fixed-size histogram per pixel, so memory use is
+    bounded by ``bins`` counts per pixel however many rows fall in it. The
+    quantile is interpolated linearly within the histogram bin holding it,
+    so it is accurate to within one bin width, ``(range[1] - range[0]) /
+    bins``. Quantiles of the same column, range and bins (for instance the
+    median and the 95th percentile in a ``summary``) share one histogram.
 
     Parameters
     ----------
     column : str
-        Name of the column to aggregate over. If the data type is floating point,
+        Name of the column to aggregate over. Column data type must be numeric.
         ``NaN`` values in the column are skipped.
+    q : float
+        Quantile to compute, between 0 and 1. Defaults to the median.
+    range : tuple of float
+        ``(low, high)`` span of the histogram bins. Values outside ``range``
+        are counted in the first or last bin, so resulting quantiles are
+        always within ``range``.
+    bins : int, optional
+        Number of histogram bins per pixel.
     """
     _dshape = dshape(Option(ct.float64))
 
+    def __init__(self, column, q=0.5, range=None, bins=256):
+        if not 0 <= q <= 1:
+            raise ValueError("q must be between 0 and 1, got {0}".format(q))
+        if range is None or not range[0] < range[1]:
+            raise ValueError("quantile requires a range (low, high) with "
+                             "low < high, got {0}".format(range))
+        if bins < 1:
+            raise ValueError("bins must be at least 1")
+        self.column = column
+        self.q = q
+        self.range = tuple(range)
+        self.bins = bins
+
+    def _hashable_inputs(self):
+        return (super(quantile, self)._hashable_inputs() +
+                (self.q, self.range, self.bins))
+
+    def _build_bases(self, cuda=False):
+        return (_histogram(self.column, self.range, self.bins),)
+
+    def _finalize(self, bases, cuda=False, **kwargs):
+        counts = bases[0]
+        cum = counts.cumsum(axis=-1)
+        total = cum[..., -1:]
+        target = self.q * total
+        # First non-empty bin reaching the target, as the quantile is
+        # interpolated between the edges of a bin holding values
+        index = ((cum >= target) & (counts > 0)).argmax(axis=-1)[..., np.newaxis]
+        n = np.take_along_axis(counts, index, axis=-1)
+        before = np.take_along_axis(cum, index, axis=-1) - n
+        lo, hi = self.range
+        width = (hi - lo) / float(self.bins)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            x = lo + width * (index + (target - before) / n)
+        x = np.where(total > 0, x, np.nan)[..., 0]
+        return xr.DataArray(x, **kwargs)
+
+
+class _order_key(FloatingReduction):
+    """Smallest (or largest, if ``last``) value of the ``order`` column over
+    the rows whose ``column`` is not ``NaN``.
+
+    Intermediate value for computing ``first`` and ``last`` with an
+    ordering column, not intended to be used on its own.
+    """
+    def __init__(self, column, order, last=False):
+        self.column = column
+        self.order = order
+        self.last = last
+
+    def __hash__(self):
+        return hash((type(self), self._hashable_inputs(), self.last))
+
+    def __eq__(self, other):
+        return (super(_order_key, self).__eq__(other) and
+                self.last == other.last)
+
+    @property
+    def inputs(self):
+        return (extract(self.column), extract(self.order))
+
+    def _build_append(self, dshape, schema, cuda=False):
+        if cuda:
+            raise ValueError("The 'first' and 'last' reduction operations "
+                             "are not yet supported on the GPU")
+        return self._append_last if self.last else self._append_first
+
     @staticmethod
-    def _append(x, y, agg):
-        raise NotImplementedError("first is currently implemented only for rasters")
+    @ngjit
+    def _append_first(x, y, agg, field, order):
+        if not isnull(field) and not isnull(order):
+            if isnull(agg[y, x]) or order < agg[y, x]:
+                agg[y, x] = order
 
     @staticmethod
-    def _create(shape, array_module):
-        raise NotImplementedError("first is currently implemented only for rasters")
+    @ngjit
+    def _append_last(x, y, agg, field, order):
+        if not isnull(field) and not isnull(order):
+            if isnull(agg[y, x]) or order >= agg[y, x]:
+                agg[y, x] = order
+
+    def _build_combine(self, dshape):
+        return self._combine_last if self.last else self._combine_first
 
     @staticmethod
-    def _combine(aggs):
-        raise NotImplementedError("first is currently implemented only for rasters")
+    def _combine_first(aggs):
+        return np.nanmin(aggs, axis=0)
 
     @staticmethod
-    def _finalize(bases, **kwargs):
-        raise NotImplementedError("first is currently implemented only for rasters")
+    def _combine_last(aggs):
+        return np.nanmax(aggs, axis=0)
 
 
+def _select(aggs, index):
+    """Select ``aggs[index[...], ...]`` along the first (stacking) axis"""
+    return np.take_along_axis(aggs, index[np.newaxis], axis=0)[0]
 
-class last(Reduction):
-    """Last value encountered in ``column``.
+
+class first(FloatingReduction):
+    """First value encountered in ``column``.
 
     Useful for categorical data where an actual value must always be returned,
     not an average or other numerical calculation.
 
-    Currently only supported for rasters, externally to this class.
+    Rows are taken in the order they appear in the source (and in partition
+    order for Dask sources), unless an ``order`` column is given.
 
     Parameters
     ----------
     column : str
         Name of the column to aggregate over. If the data type is floating point,
         ``NaN`` values in the column are skipped.
+    order : str, optional
+        Name of a numeric column giving the order of the rows, for instance
+        timestamps converted to integers. The value of the row with the
+        smallest ``order`` is returned, ties going to the earliest row. Rows
+        with a missing ``order`` are skipped. Not supported with ``by``.
     """
-    _dshape = dshape(Option(ct.float64))
+    _last = False
+
+    def __init__(self, column=None, order=None):
+        self.column = column
+        self.order = order
+
+    def validate(self, in_dshape):
+        super(first, self).validate(in_dshape)
+        if self.order is not None:
+            if self.order not in in_dshape.dict:
+                raise ValueError("specified order column not found")
+            if not isnumeric(in_dshape.measure[self.order]):
+                raise ValueError("order column must be numeric")
+
+    @property
+    def inputs(self):
+        if self.order is None:
+            return (extract(self.column),)
+        return (extract(self.column), extract(self.order))
+
+    def _key(self):
+        return _order_key(self.column, self.order, self._last)
+
+    def _build_bases(self, cuda=False):
+        if self.order is None:
+            return (self,)
+        return (self._key(), self)
+
+    def _build_temps(self, cuda=False):
+        if self.order is None:
+            return ()
+        return (self._key(),)
+
+    def _build_append(self, dshape, schema, cuda=False):
+        if cuda:
+            raise ValueError("The 'first' and 'last' reduction operations "
+                             "are not yet supported on the GPU")
+        if self.order is not None:
+            return self._append_ordered
+        return self._append
 
     @staticmethod
-    def _append(x, y, agg):
-        raise NotImplementedError("last is currently implemented only for rasters")
+    @ngjit
+    def _append(x, y, agg, field):
+        if not isnull(field) and isnull(agg[y, x]):
+            agg[y, x] = field
 
     @staticmethod
-    def _create(shape, array_module):
-        raise NotImplementedError("last is currently implemented only for rasters")
+    @ngjit
+    def _append_ordered(x, y, agg, field, order, key):
+        # key is the order of the value in agg[y, x], before being updated
+        # by this row
+        if not isnull(field) and not isnull(order):
+            if isnull(key) or order < key:
+                agg[y, x] = field
 
     @staticmethod
-    def _combine(aggs):
-        raise NotImplementedError("last is currently implemented only for rasters")
+    def _combine(aggs, keys=None):
+        if keys is not None:
+            # The value of the aggregate holding the smallest key
+            missing = np.isnan(keys)
+            keys = np.where(missing, np.inf, keys)
+            index = np.where(missing.all(axis=0), 0, keys.argmin(axis=0))
+        else:
+            index = (~np.isnan(aggs)).argmax(axis=0)
+        return _select(aggs, index)
 
     @staticmethod
-    def _finalize(bases, **kwargs):
-        raise NotImplementedError("last is currently implemented only for rasters")
+    def _finalize(bases, cuda=False, **kwargs):
+        # With an order column, bases are (keys, values)
+        return xr.DataArray(bases[-1], **kwargs)
+
+
+class last(first):
+    """Last value encountered in ``column``.
+
+    Useful for categorical data where an actual value must always be returned,
+    not an average or other numerical calculation.
+
+    Rows are taken in the order they appear in the source (and in partition
+    order for Dask sources), unless an ``order`` column is given.
+
+    Parameters
+    ----------
+    column : str
+        Name of the column to aggregate over. If the data type is floating point,
+        ``NaN`` values in the column are skipped.
+    order : str, optional
+        Name of a numeric column giving the order of the rows, for instance
+        timestamps converted to integers. The value of the row with the
+        largest ``order`` is returned, ties going to the latest row. Rows
+        with a missing ``order`` are skipped. Not supported with ``by``.
+    """
+    _last = True
+
+    @staticmethod
+    @ngjit
+    def _append(x, y, agg, field):
+        if not isnull(field):
+            agg[y, x] = field
 
+    @staticmethod
+    @ngjit
+    def _append_ordered(x, y, agg, field, order, key):
+        # key is the order of the value in agg[y, x], before being updated
+        # by this row
+        if not isnull(field) and not isnull(order):
+            if isnull(key) or order >= key:
+                agg[y, x] = field
+
+    @staticmethod
+    def _combine(aggs, keys=None):
+        if keys is not None:
+            # The value of the last aggregate holding the largest key
+            missing = np.isnan(keys)
+            keys = np.where(missing, -np.inf, keys)[::-1]
+            index = np.where(missing.all(axis=0), 0,
+                             len(keys) - 1 - keys.argmax(axis=0))
+        else:
+            index = len(aggs) - 1 - (~np.isnan(aggs[::-1])).argmax(axis=0)
+        return _select(aggs, index)
 
 
 class mode(Reduction):
@@ -738,4 +1011,5 @@ class summary(Expr):
 __all__ = list(set([_k for _k,_v in locals().items()
                     if isinstance(_v,type) and (issubclass(_v,Reduction) or _v is summary)
                     and _v not in [Reduction, OptionalFieldReduction,
-                                   FloatingReduction, m2]]))
+                                   FloatingReduction, m2, _order_key,
+                                   _histogram]]))
@@ -0,0 +1,147 @@
+"""
+Approximate aggregation of a sample of the rows of a source.
+
+``Canvas.points(..., sample=fraction)`` aggregates a stratified sample of
+about ``fraction`` of the rows: the rows are split into consecutive strata
+of ``round(1 / fraction)`` rows, and one row is drawn at random from each.
+Pass ``random_state`` to draw the same sample on every call.
+Additive reductions (``count``, ``sum`` and their categorical versions)
+are scaled back up by the inverse of the fraction of rows sampled, other
+reductions are those of the sample.
+
+The aggregate carries the estimated relative standard error of the count
+of rows in each pixel, ``sqrt((1 - f) / n)`` for ``n`` rows sampled in the
+pixel out of a fraction ``f`` of the rows, as its ``relative_error``
+coordinate, aligned with its ``y`` and ``x`` coordinates. It is NaN in the
+pixels where no row was sampled. Sums of values of similar magnitude have
+about the same relative error, so that the error tells whether an exact
+aggregate is worth computing.
+"""
+from __future__ import absolute_import, division, print_function
+
+import numpy as np
+import pandas as pd
+import dask.dataframe as dd
+from dask import delayed
+
+from . import reductions as rd
+
+__all__ = ['sample_rows', 'sampled_aggregation', 'scale_aggregate']
+
+# Reductions whose aggregates are sums over the rows of each pixel
+_additive = (rd.count, rd.sum, rd._sum_zero)
+
+# Name of the count of rows sampled in each pixel added to the reduction
+_count_key = '_sample_count'
+
+# Name of the coordinate holding the relative error of the aggregates
+_error_key = 'relative_error'
+
+
+def sample_rows(source, fraction, random_state=None):
+    """Return a stratified sample of about ``fraction`` of the rows of the
+    pandas or Dask DataFrame ``source``, along with the fraction of rows
+    sampled.
+
+    One row is drawn at random from each stratum of ``round(1 / fraction)``
+    consecutive rows, within each partition of Dask frames. The fraction of
+    rows sampled is exact for pandas frames. The number of rows of Dask
+    frames isn't known without reading them, so the row drawn from the
+    shorter last stratum of each partition is only kept with a probability
+    of its length over ``round(1 / fraction)``: every row is then sampled
+    with the same probability, ``1 / round(1 / fraction)``, which is the
+    fraction returned.
+
+    Rows are drawn with a ``numpy.random.RandomState``, never with the
+    global ``numpy.random`` state. ``random_state`` is an int seed or a
+    ``RandomState``, a fresh unseeded one by default, in which case every
+    call draws another sample. The partitions of Dask frames are sampled
+    with states seeded from a seed drawn from ``random_state`` and the
+    index of the partition, so that they draw independent rows wherever
+    they are computed.
+    """
+    if not 0 < fraction <= 1:
+        raise ValueError('sample must be a fraction of rows in (0, 1], got '
+                         '{0!r}'.format(fraction))
+    step = max(1, int(round(1 / fraction)))
+    if step == 1:
+        return source, 1.0
+    if not isinstance(random_state, np.random.RandomState):
+        random_state = np.random.RandomState(random_state)
+    if isinstance(source, dd.DataFrame):
+        seed = random_state.randint(2**31 - 1)
+        parts = [delayed(_sample_frame)(part, step, [seed, i], True)
+                 for i, part in enumerate(source.to_delayed())]
+        return (dd.from_delayed(parts, meta=source._meta,
+                                divisions=source.divisions), 1 / step)
+    if not isinstance(source, pd.DataFrame):
+        raise ValueError('sample is only supported for pandas and Dask '
+                         'DataFrames')
+    if not len(source):
+        return source, 1.0
+    sample = _sample_frame(source, step, random_state)
+    return sample, len(sample) / len(source)
+
+
+def _sample_frame(df, step, random_state, uniform=False):
+    """Return one row drawn with ``random_state``, a ``RandomState`` or a
+    seed, from each stratum of ``step`` rows of ``df``, dropping the one of
+    a shorter last stratum with a probability of its missing rows over
+    ``step`` if ``uniform``."""
+    if not isinstance(random_state, np.random.RandomState):
+        random_state = np.random.RandomState(random_state)
+    starts = np.arange(0, len(df), step)
+    lengths = np.minimum(step, len(df) - starts)
+    draws = random_state.random_sample(len(starts))
+    rows = starts + (draws * lengths).astype('i8')
+    if uniform and len(lengths) and lengths[-1] < step:
+        # Kept with a probability of ``length / step``, so that each of its
+        # rows is sampled with a probability of ``1 / step`` as the others
+        if random_state.random_sample() * step >= lengths[-1]:
+            rows = rows[:-1]
+    return df.iloc[rows]
+
+
+def sampled_aggregation(agg):
+    """Return the ``summary`` computing ``agg`` and the count of rows in
+    each pixel needed to estimate its error."""
+    if isinstance(agg, rd.summary):
+        for key in (_count_key, _error_key):
+            if key in agg.keys:
+                raise ValueError('{0!r} is a reserved summary name with '
+                                 'sample'.format(key))
+        reductions = dict(zip(agg.keys, agg.values))
+    else:
+        reductions = {'value': agg}
+    reductions[_count_key] = rd.count()
+    return rd.summary(**reductions)
+
+
+def scale_aggregate(agg, result, fraction):
+    """Scale the additive reductions of ``result``, the aggregate of
+    ``sampled_aggregation(agg)`` over a fraction ``fraction`` of the rows,
+    and return it as the aggregate of ``agg`` with its ``relative_error``
+    coordinate and ``sample_fraction`` attribute set."""
+    counts = result[_count_key]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        error = np.where(counts.values > 0,
+                         np.sqrt((1 - fraction) / counts.values), np.nan)
+    result = result.drop(_count_key)
+
+    def scaled(red, array):
+        inner = red.reduction if isinstance(red, rd.by) else red
+        if isinstance(inner, _additive) and fraction < 1:
+            out = array / fraction
+            out.attrs = array.attrs
+            return out
+        return array
+
+    if isinstance(agg, rd.summary):
+        for key, red in zip(agg.keys, agg.values):
+            result[key] = scaled(red, result[key])
+    else:
+        result = scaled(agg, result['value'])
+        result.name = None
+    result = result.assign_coords(**{_error_key: (counts.dims, error)})
+    result.attrs['sample_fraction'] = fraction
+    return result
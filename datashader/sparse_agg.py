@@ -0,0 +1,199 @@
+"""
+Sparse aggregation of points onto very large canvases.
+
+Dense aggregation allocates every base array of a reduction at the full
+canvas size, which is prohibitive for print-sized or tiled canvases on which
+only a small fraction of the pixels receive data. Sparse aggregation instead
+computes the pixel of every row, reduces the rows of each chunk (pandas) or
+partition (dask) to per-pixel partial counts and sums, merges the partials
+of all chunks, and returns an ``xarray.DataArray`` backed by a ``sparse.COO``
+array holding only the pixels that received data. Memory use is therefore
+proportional to the number of pixels hit rather than to the canvas size.
+
+Only reductions that can be computed from per-pixel counts and sums are
+supported: ``count``, ``any``, ``sum`` and ``mean``, per category with
+``by``/``count_cat``, and ``summary`` of these. Requires the ``sparse``
+package.
+"""
+from __future__ import absolute_import, division
+
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+import dask
+import dask.dataframe as dd
+
+from . import reductions as rd
+from .glyphs import Point
+from .utils import ngjit
+
+try:
+    import sparse
+except ImportError:
+    sparse = None
+
+__all__ = ['sparse_bypixel']
+
+
+# Rows of a pandas DataFrame aggregated at a time, which bounds the memory
+# used for the pixel index of each row
+chunk_rows = 2**20
+
+_additive = (rd.count, rd.any, rd.sum, rd.mean)
+
+
+@ngjit
+def _append_index(i, x, y, index, width):
+    index[i] = y * width[0] + x
+
+
+def _no_columns(df):
+    return ()
+
+
+def _validate(agg):
+    for red in (agg.values if isinstance(agg, rd.summary) else (agg,)):
+        inner = red.reduction if isinstance(red, rd.by) else red
+        if type(inner) not in _additive:
+            raise ValueError("Sparse aggregation only supports count, any, "
+                             "sum and mean reductions, optionally by "
+                             "category; got {0}".format(type(red).__name__))
+
+
+def _partials(red, df, index, ncats):
+    """Reduce the rows of ``df`` to per-pixel ``(keys, counts, sums)`` for
+    ``red``. ``index`` holds the pixel of each row, -1 for rows outside the
+    canvas. ``sums`` is None for reductions that only count rows."""
+    inner = red.reduction if isinstance(red, rd.by) else red
+    keys = index
+    valid = index >= 0
+    if isinstance(red, rd.by):
+        codes = df[red.cat_column].cat.codes.values
+        valid &= codes >= 0
+        keys = index * ncats + codes
+    values = None
+    if inner.column is not None:
+        values = df[inner.column].values
+        valid &= ~pd.isnull(values)
+    keys = keys[valid]
+    sums = None
+    if isinstance(inner, (rd.sum, rd.mean)):
+        sums = values[valid].astype('f8')
+    return _merge([(keys, None, sums)])
+
+
+def _merge(partials):
+    """Combine per-pixel partials (``counts`` of None meaning one row per
+    key) into partials with unique, sorted keys"""
+    keys = np.concatenate([p[0] for p in partials])
+    uniq, inverse = np.unique(keys, return_inverse=True)
+    if all(p[1] is None for p in partials):
+        counts = np.bincount(inverse, minlength=len(uniq))
+    else:
+        weights = np.concatenate([np.ones(len(k)) if n is None else n
+                                  for k, n, _ in partials])
+        counts = np.bincount(inverse, weights, minlength=len(uniq))
+    counts = counts.astype('i8')
+    sums = None
+    if partials[0][2] is not None:
+        sums = np.bincount(inverse, np.concatenate([p[2] for p in partials]),
+                           minlength=len(uniq))
+    return uniq, counts, sums
+
+
+def _finalize(red, partial, shape, cats, coords, dims):
+    keys, counts, sums = partial
+    inner = red.reduction if isinstance(red, rd.by) else red
+    if isinstance(inner, rd.count):
+        data, fill = counts.astype('u4'), 0
+    elif isinstance(inner, rd.any):
+        data, fill = np.ones(len(keys), dtype='bool'), False
+    elif isinstance(inner, rd.sum):
+        data, fill = sums, np.nan
+    else:
+        data, fill = sums / counts, np.nan
+
+    if cats is not None:
+        keys, codes = np.divmod(keys, len(cats))
+        index = np.vstack(np.divmod(keys, shape[1]) + (codes,))
+        shape = shape + (len(cats),)
+        dims = dims + [red.cat_column]
+        coords = OrderedDict(coords)
+        coords[red.cat_column] = cats
+    else:
+        index = np.vstack(np.divmod(keys, shape[1]))
+    array = sparse.COO(index, data, shape=shape, fill_value=fill,
+                       has_duplicates=False, sorted=True)
+    return xr.DataArray(array, coords=coords, dims=dims)
+
+
+def sparse_bypixel(source, canvas, glyph, agg):
+    """Aggregate the points of ``source`` onto ``canvas`` sparsely.
+
+    Equivalent to ``bypixel``, but returns aggregates backed by
+    ``sparse.COO`` arrays. Empty pixels take the value they have in dense
+    aggregates (0 for counts, False for ``any`` and NaN otherwise), which is
+    the fill value of the sparse array.
+    """
+    from .core import _bypixel_source
+
+    if sparse is None:
+        raise ImportError('Sparse aggregation requires the sparse package '
+                          '(e.g. `conda install sparse`)')
+    if type(glyph) is not Point:
+        raise ValueError('Sparse aggregation is only supported for points '
+                         'given by x and y columns')
+    _validate(agg)
+    source, schema = _bypixel_source(source, canvas, glyph, agg)
+    if not isinstance(source, (pd.DataFrame, dd.DataFrame)):
+        raise ValueError('Sparse aggregation requires a pandas or dask '
+                         'DataFrame source')
+
+    if isinstance(source, dd.DataFrame):
+        x_range, y_range = canvas.x_range, canvas.y_range
+        if x_range is None or y_range is None:
+            bounds = glyph.compute_bounds_dask(source)
+            x_range = x_range or bounds[0]
+            y_range = y_range or bounds[1]
+    else:
+        x_range = canvas.x_range or glyph.compute_x_bounds(source)
+        y_range = canvas.y_range or glyph.compute_y_bounds(source)
+
+    width, height = canvas.plot_width, canvas.plot_height
+    x_st = canvas.x_axis.compute_scale_and_translate(x_range, width)
+    y_st = canvas.y_axis.compute_scale_and_translate(y_range, height)
+    vt = x_st + y_st
+    bounds = x_range + y_range
+    extend = glyph._build_extend(canvas.x_axis.mapper, canvas.y_axis.mapper,
+                                 _no_columns, _append_index)
+
+    reds = agg.values if isinstance(agg, rd.summary) else (agg,)
+    cats = [list(schema[red.cat_column].categories)
+            if isinstance(red, rd.by) else None for red in reds]
+
+    def aggregate(df):
+        index = np.full(len(df), -1, dtype='i8')
+        extend((index, np.array([width], dtype='i8')), df, vt, bounds)
+        return [_partials(red, df, index, len(c or ()))
+                for red, c in zip(reds, cats)]
+
+    if isinstance(source, dd.DataFrame):
+        chunks = dask.compute(*[dask.delayed(aggregate)(part)
+                                for part in source.to_delayed()])
+    else:
+        chunks = [aggregate(source.iloc[start:start + chunk_rows])
+                  for start in range(0, max(len(source), 1), chunk_rows)]
+
+    coords = OrderedDict([
+        (glyph.x_label, canvas.x_axis.compute_index(x_st, width)),
+        (glyph.y_label, canvas.y_axis.compute_index(y_st, height))])
+    dims = [glyph.y_label, glyph.x_label]
+    results = [_finalize(red, _merge([chunk[i] for chunk in chunks]),
+                         (height, width), cats[i], coords, dims)
+               for i, red in enumerate(reds)]
+
+    if isinstance(agg, rd.summary):
+        return xr.Dataset(OrderedDict(zip(agg.keys, results)))
+    return results[0]
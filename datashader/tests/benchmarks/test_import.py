@@ -0,0 +1,23 @@
+import subprocess
+import sys
+
+import pytest
+
+
+def _import(statement):
+    subprocess.check_call([sys.executable, '-c', statement])
+
+
+@pytest.mark.benchmark(group="import")
+def test_import_datashader(benchmark):
+    benchmark(_import, 'import datashader')
+
+
+@pytest.mark.benchmark(group="import")
+def test_import_canvas(benchmark):
+    benchmark(_import, 'from datashader import Canvas')
+
+
+@pytest.mark.benchmark(group="import")
+def test_import_transfer_functions(benchmark):
+    benchmark(_import, 'import datashader.transfer_functions')
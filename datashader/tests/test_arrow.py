@@ -0,0 +1,90 @@
+from __future__ import absolute_import
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import datashader as ds
+from datashader.tests.test_pandas import assert_eq_xr
+
+pa = pytest.importorskip('pyarrow')
+
+from datashader.data_libraries.arrow import (  # noqa (skipped without pyarrow)
+    ArrowFrame, arrow_to_numpy
+)
+
+np.random.seed(3)
+n = 1000
+df = pd.DataFrame({'x': np.random.uniform(0, 10, n),
+                   'y': np.random.uniform(0, 10, n),
+                   'v': np.random.normal(size=n),
+                   'i': np.arange(n),
+                   'cat': pd.Categorical(np.random.choice(['a', 'b', 'c'], n))})
+df.loc[::9, 'v'] = np.nan
+
+
+def chunked_table(df, nchunks=4):
+    """Arrow table made of chunks with their own dictionaries"""
+    bounds = np.linspace(0, len(df), nchunks + 1).astype(int)
+    tables = []
+    for start, stop in zip(bounds[:-1], bounds[1:]):
+        chunk = df.iloc[start:stop].copy()
+        if 'cat' in chunk:
+            chunk['cat'] = chunk['cat'].astype(str).astype('category')
+        tables.append(pa.Table.from_pandas(chunk, preserve_index=False))
+    return pa.concat_tables(tables)
+
+
+cvs = ds.Canvas(plot_width=15, plot_height=10)
+
+
+@pytest.mark.parametrize('nchunks', [1, 4])
+def test_points(nchunks):
+    table = chunked_table(df, nchunks)
+    assert table.num_rows == n and table.column('x').num_chunks == nchunks
+    agg = ds.summary(n=ds.count(), s=ds.sum('v'), m=ds.max('i'),
+                     c=ds.count_cat('cat'), cv=ds.by('cat', ds.mean('v')))
+    result = cvs.points(table, 'x', 'y', agg)
+    expected = cvs.points(df, 'x', 'y', agg)
+    for name in ['n', 's', 'm', 'c', 'cv']:
+        assert_eq_xr(result[name], expected[name], close=True)
+
+
+@pytest.mark.parametrize('nchunks', [1, 3])
+def test_line(nchunks):
+    data = df.sort_values('x')
+    table = chunked_table(data, nchunks)
+    assert_eq_xr(cvs.line(table, 'x', 'y', ds.count()),
+                 cvs.line(data, 'x', 'y', ds.count()))
+    assert_eq_xr(cvs.line(table, ['x', 'y'], ['y', 'x'], ds.count()),
+                 cvs.line(data, ['x', 'y'], ['y', 'x'], ds.count()))
+
+
+def test_nulls():
+    table = pa.table({'x': pa.array([0., 1, None, 3]),
+                      'y': pa.array([0., 1, 2, 3]),
+                      'i': pa.array([1, None, 3, 4]),
+                      'c': pa.array(['a', 'b', None, 'a']).dictionary_encode()})
+    frame = ArrowFrame(table.to_batches()[0])
+    assert len(frame) == 4
+    np.testing.assert_equal(frame['x'].values, [0, 1, np.nan, 3])
+    np.testing.assert_equal(frame['i'].values, [1, np.nan, 3, 4])
+    np.testing.assert_equal(frame['c'].cat.codes.values, [0, 1, -1, 0])
+
+    # Arrays without nulls are views of the Arrow buffers
+    y = table.column('y').chunk(0)
+    view = arrow_to_numpy(y)
+    assert view.ctypes.data == y.buffers()[1].address
+
+    agg = ds.Canvas(plot_width=2, plot_height=2).points(
+        table, 'x', 'y', ds.summary(n=ds.count(), i=ds.sum('i')))
+    assert int(agg.n.sum()) == 3
+    assert float(agg.i.sum()) == 5
+
+
+def test_errors():
+    table = chunked_table(df)
+    with pytest.raises(ValueError, match='Arrow'):
+        cvs.area(table, 'x', 'y')
+    with pytest.raises(ValueError, match='top_k'):
+        cvs.points(table, 'x', 'y', ds.count_cat('cat', top_k=1))
@@ -78,3 +78,27 @@ def test_interactive_image_update():
 
     # Ensure events are cleared after update
     assert img.doc._held_events == []
+
+
+def test_interactive_image_progressive():
+    p = figure(x_range=(0, 1), y_range=(0, 1), plot_width=2, plot_height=2)
+    calls = []
+
+    def progressive_images(x_range, y_range, plot_width, plot_height,
+                           final=False):
+        calls.append(final)
+        if not final:
+            yield create_image((0, 0.5), y_range, plot_width, plot_height)
+        yield create_image(x_range, y_range, plot_width, plot_height)
+
+    img = InteractiveImage(p, progressive_images, progressive=True)
+    assert calls == [True]
+    expected = create_image((0, 1), (0, 1)).data
+    assert np.array_equal(img.ds.data['image'][0], expected)
+
+    img._repr_html_()
+    img.update_image({'xmin': 0.5, 'xmax': 1, 'ymin': 0.5, 'ymax': 1,
+                      'w': 1, 'h': 1})
+    assert calls == [True, True]
+    expected = create_image((0.5, 1), (0.5, 1), 1, 1).data
+    assert np.array_equal(img.ds.data['image'][0], expected)
@@ -0,0 +1,178 @@
+from __future__ import absolute_import
+
+import dask.dataframe as dd
+import numpy as np
+import pandas as pd
+import pytest
+
+import datashader as ds
+from datashader.cache import (
+    LRUCache, AggregateCache, ExtentsCache, source_token
+)
+
+
+df = pd.DataFrame({'x': np.arange(10, dtype='f8'),
+                   'y': np.arange(10, dtype='f8'),
+                   'v': np.ones(10)})
+
+
+@pytest.fixture
+def agg_cache():
+    cache = AggregateCache(max_bytes=10000)
+    ds.core.bypixel.cache = cache
+    yield cache
+    ds.core.bypixel.cache = None
+
+
+@pytest.fixture
+def extents_cache():
+    cache = ExtentsCache(max_entries=4, cache_pandas=True, min_rows=0)
+    old, ds.glyphs.Glyph.extents_cache = ds.glyphs.Glyph.extents_cache, cache
+    yield cache
+    ds.glyphs.Glyph.extents_cache = old
+
+
+def test_lru_cache():
+    cache = LRUCache(max_size=3)
+    for k in 'abc':
+        cache.put(k, k.upper())
+    assert cache.get('a') == 'A'
+    cache.put('d', 'D')
+    # 'b' was least recently used
+    assert 'b' not in cache
+    assert cache.get('b') is None
+    assert len(cache) == 3
+    assert cache.stats() == dict(hits=1, misses=1, evictions=1, entries=3,
+                                 size=3, max_size=3)
+    cache.clear()
+    assert len(cache) == 0 and cache.size == 0
+
+
+def test_lru_cache_sizeof():
+    cache = LRUCache(max_size=10, sizeof=len)
+    cache.put('a', 'aaaa')
+    cache.put('b', 'bbbb')
+    cache.put('c', 'cccc')
+    assert list(cache._data) == ['b', 'c']
+    assert cache.size == 8
+    # Values larger than the budget are never stored
+    cache.put('d', 'd' * 11)
+    assert 'd' not in cache
+    assert cache.size == 8
+
+
+def test_source_token():
+    assert source_token(df) == source_token(df)
+    assert source_token(df) != source_token(df.copy())
+    ddf = dd.from_pandas(df, npartitions=2)
+    assert source_token(ddf) == source_token(ddf)
+    assert source_token(ddf) != source_token(ddf[ddf.x > 2])
+    assert source_token(np.arange(3)) is None
+
+
+def test_bypixel_cache(agg_cache):
+    cvs = ds.Canvas(plot_width=5, plot_height=5, x_range=(0, 9), y_range=(0, 9))
+    agg = cvs.points(df, 'x', 'y', ds.sum('v'))
+    assert agg_cache.misses == 1 and len(agg_cache) == 1
+    assert cvs.points(df, 'x', 'y', ds.sum('v')) is agg
+    assert agg_cache.hits == 1
+
+    # Any change of canvas, glyph or reduction is a different aggregate
+    cvs2 = ds.Canvas(plot_width=5, plot_height=5, x_range=(0, 5), y_range=(0, 9))
+    assert not cvs2.points(df, 'x', 'y', ds.sum('v')).equals(agg)
+    cvs.points(df, 'y', 'x', ds.sum('v'))
+    cvs.points(df, 'x', 'y', ds.max('v'))
+    assert agg_cache.misses == 4 and agg_cache.hits == 1
+
+    # Each 5x5 float64 aggregate takes 200 bytes
+    assert agg_cache.size == 4 * 200
+
+
+def test_bypixel_cache_base(agg_cache):
+    cvs = ds.Canvas(plot_width=5, plot_height=5, x_range=(0, 9), y_range=(0, 9))
+    agg = cvs.points(df, 'x', 'y')
+    expected = agg.copy()
+    total = cvs.points(df, 'x', 'y', base=agg)
+    assert int(total.sum()) == 2 * len(df)
+    # The cached aggregate used as a base is left unchanged
+    assert cvs.points(df, 'x', 'y') is agg
+    assert agg.equals(expected)
+
+
+def test_bypixel_cache_eviction(agg_cache):
+    agg_cache.max_size = 1000
+    for width in range(5, 10):
+        ds.Canvas(plot_width=width, plot_height=10).points(df, 'x', 'y')
+    # uint32 counts of 10 rows per unit of width
+    assert agg_cache.size <= 1000
+    assert agg_cache.evictions == 2
+
+
+def test_extents_cache_pandas(extents_cache):
+    cvs = ds.Canvas(plot_width=5, plot_height=5)
+    agg = cvs.points(df, 'x', 'y')
+    assert extents_cache.misses == 2 and len(extents_cache) == 2
+    # Lines over the same columns reuse the extents of the points
+    cvs.line(df, 'x', 'y')
+    assert extents_cache.hits == 2 and extents_cache.misses == 2
+    assert agg.x.values[0] == 0.9 and agg.y.values[-1] == 8.1
+
+    # Small frames are scanned rather than tokenized
+    extents_cache.min_rows = 100
+    cvs.points(df, 'x', 'v')
+    assert extents_cache.misses == 2
+
+
+def test_extents_cache_pandas_default():
+    cache = ExtentsCache(min_rows=0)
+    old, ds.glyphs.Glyph.extents_cache = ds.glyphs.Glyph.extents_cache, cache
+    try:
+        cvs = ds.Canvas(plot_width=5, plot_height=5)
+        frame = df.copy()
+        cvs.points(frame, 'x', 'y')
+        # pandas frames are scanned, so modifications in place are seen
+        frame.loc[frame.x > 8, 'x'] = 100
+        agg = cvs.points(frame, 'x', 'y')
+        assert len(cache) == 0
+        assert agg.x.values[-1] > 90
+    finally:
+        ds.glyphs.Glyph.extents_cache = old
+
+
+def test_extents_cache_dask(extents_cache):
+    ddf = dd.from_pandas(df, npartitions=3)
+    cvs = ds.Canvas(plot_width=5, plot_height=5)
+    expected = cvs.points(df, 'x', 'y', ds.sum('v'))
+    assert cvs.points(ddf, 'x', 'y', ds.sum('v')).equals(expected)
+    assert len(extents_cache) == 2
+    assert cvs.points(ddf, 'x', 'y', ds.sum('v')).equals(expected)
+    assert extents_cache.hits == 2
+
+    # Bounded by max_entries
+    for column in ['v', 'y']:
+        cvs.points(ddf, 'x', column)
+        cvs.points(ddf[ddf.x > 3], 'x', column)
+    assert len(extents_cache) == 4 and extents_cache.evictions > 0
+
+
+def test_extents_cache_known(extents_cache):
+    ddf = dd.from_pandas(df.set_index('x', drop=False), npartitions=2)
+    glyph = ds.Point('x', 'y')
+    assert glyph.compute_bounds_dask(ddf) == ((0, 9), (0, 9))
+    # Only y was scanned, x comes from the divisions
+    assert len(extents_cache) == 1
+
+    ddf = dd.from_pandas(df, npartitions=2)
+    extents_cache.register(ddf, {'x': (-10, 10), 'y': (-5, 5)})
+    assert glyph.compute_bounds_dask(ddf) == ((-10, 10), (-5, 5))
+    with pytest.raises(ValueError):
+        extents_cache.register(np.arange(3), {'x': (0, 1)})
+
+
+def test_parquet_extents(tmpdir):
+    pytest.importorskip('pyarrow')
+    from datashader.parquet import parquet_extents
+    path = str(tmpdir.join('data'))
+    dd.from_pandas(df, npartitions=3).to_parquet(path, engine='pyarrow')
+    assert parquet_extents(path, ['x', 'v', 'nope']) == {'x': (0, 9),
+                                                          'v': (1, 1)}
@@ -0,0 +1,89 @@
+from __future__ import absolute_import
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import datashader as ds
+from datashader.tests.test_pandas import assert_eq_xr
+
+np.random.seed(7)
+n = 1000
+df = pd.DataFrame({'x': np.cumsum(np.random.uniform(0, 1, n)),
+                   'y': np.random.normal(size=n),
+                   'v': np.random.uniform(size=n),
+                   'cat': pd.Categorical.from_codes(
+                       np.random.randint(0, 3, n), ['a', 'b', 'c'])})
+df.loc[::13, 'v'] = np.nan
+
+x_range = (df.x.min(), df.x.max())
+y_range = (df.y.min(), df.y.max())
+
+
+def chunks(size=170):
+    for start in range(0, len(df), size):
+        yield df.iloc[start:start + size]
+
+
+@pytest.mark.parametrize('threads', [None, 2])
+def test_points(threads):
+    cvs = ds.Canvas(plot_width=30, plot_height=20, x_range=x_range,
+                    y_range=y_range, threads=threads)
+    agg = ds.summary(n=ds.count(), s=ds.sum('v'), m=ds.mean('v'),
+                     c=ds.count_cat('cat'))
+    result = cvs.points(chunks(), 'x', 'y', agg)
+    expected = cvs.points(df, 'x', 'y', agg)
+    for name in ['n', 's', 'm', 'c']:
+        assert_eq_xr(result[name], expected[name], close=True)
+
+
+def test_lines_and_areas():
+    cvs = ds.Canvas(plot_width=40, plot_height=30, x_range=x_range,
+                    y_range=y_range)
+    # Segments joining consecutive chunks are drawn once
+    assert_eq_xr(cvs.line(chunks(), 'x', 'y', ds.count()),
+                 cvs.line(df, 'x', 'y', ds.count()))
+    assert_eq_xr(cvs.area(chunks(), 'x', 'y', ds.count()),
+                 cvs.area(df, 'x', 'y', ds.count()))
+
+
+def test_filter_and_base():
+    cvs = ds.Canvas(plot_width=30, plot_height=20, x_range=x_range,
+                    y_range=y_range)
+    flt = [('cat', '==', 'b')]
+    assert_eq_xr(cvs.points(chunks(), 'x', 'y', filter=flt),
+                 cvs.points(df, 'x', 'y', filter=flt))
+    base = cvs.points(df, 'x', 'y')
+    assert_eq_xr(cvs.points(chunks(), 'x', 'y', base=base.copy()), 2 * base)
+
+
+def test_auto_range():
+    cvs = ds.Canvas(plot_width=30, plot_height=20)
+    result = cvs.line(chunks, 'x', 'y', ds.count())
+    assert_eq_xr(result, cvs.line(df, 'x', 'y', ds.count()))
+    with pytest.raises(ValueError, match='x_range and y_range'):
+        cvs.points(chunks(), 'x', 'y')
+
+
+def test_read_csv(tmpdir):
+    path = str(tmpdir.join('points.csv'))
+    df.to_csv(path, index=False)
+    cvs = ds.Canvas(plot_width=30, plot_height=20, x_range=x_range,
+                    y_range=y_range)
+    result = cvs.points(pd.read_csv(path, chunksize=300), 'x', 'y',
+                        ds.sum('v'))
+    assert_eq_xr(result, cvs.points(df, 'x', 'y', ds.sum('v')), close=True)
+
+
+def test_errors():
+    cvs = ds.Canvas(plot_width=30, plot_height=20, x_range=x_range,
+                    y_range=y_range)
+    with pytest.raises(ValueError, match='empty'):
+        cvs.points(iter([]), 'x', 'y')
+    with pytest.raises(ValueError, match='same dtypes'):
+        cvs.points(iter([df, df.astype({'v': 'float32'})]), 'x', 'y',
+                   ds.sum('v'))
+    with pytest.raises(ValueError, match='top_k'):
+        cvs.points(chunks(), 'x', 'y', ds.count_cat('cat', top_k=1))
+    with pytest.raises(ValueError, match='pandas DataFrames'):
+        cvs.points(iter([df.values]), 'x', 'y')
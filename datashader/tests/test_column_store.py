@@ -0,0 +1,98 @@
+from __future__ import absolute_import
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import datashader as ds
+import datashader.data_libraries.column_store as cs
+from datashader.column_store import ColumnStore
+from datashader.tests.test_pandas import assert_eq_xr
+
+np.random.seed(6)
+n = 5000
+df = pd.DataFrame({'x': np.cumsum(np.random.uniform(0, 1, n)),
+                   'y': np.random.normal(size=n),
+                   'v': np.random.uniform(size=n),
+                   'cat': pd.Categorical.from_codes(
+                       np.random.randint(-1, 3, n), ['a', 'b', 'c'])})
+df.loc[::11, 'v'] = np.nan
+
+
+@pytest.fixture
+def store(tmpdir):
+    for name in ['x', 'y', 'v']:
+        np.save(str(tmpdir.join(name + '.npy')), df[name].values)
+    np.save(str(tmpdir.join('cat.npy')), df['cat'].cat.codes.values)
+    return ColumnStore.from_npy(str(tmpdir), categories={'cat': ['a', 'b', 'c']})
+
+
+@pytest.fixture
+def small_blocks(monkeypatch):
+    monkeypatch.setattr(cs, 'block_rows', 300)
+
+
+def test_from_npy(store):
+    assert store.columns == ['cat', 'v', 'x', 'y']
+    assert len(store) == n
+    assert isinstance(store._columns['x'], np.memmap)
+    pd.testing.assert_series_equal(store['cat'], df['cat'])
+    block = store.iloc[10:20]
+    assert len(block) == 10
+    assert np.shares_memory(block['x'].values, store._columns['x'])
+
+
+@pytest.mark.parametrize('threads', [None, 3])
+def test_points(store, small_blocks, threads):
+    cvs = ds.Canvas(plot_width=30, plot_height=20, threads=threads)
+    agg = ds.summary(n=ds.count(), s=ds.sum('v'), c=ds.count_cat('cat'),
+                     m=ds.by('cat', ds.max('v')))
+    result = cvs.points(store, 'x', 'y', agg)
+    expected = cvs.points(df, 'x', 'y', agg)
+    for name in ['n', 's', 'c', 'm']:
+        assert_eq_xr(result[name], expected[name], close=True)
+
+
+def test_lines_and_areas(store, small_blocks):
+    cvs = ds.Canvas(plot_width=40, plot_height=30, x_range=(100, 1500))
+    # Segments and areas spanning the boundaries of the blocks are drawn
+    assert_eq_xr(cvs.line(store, 'x', 'y', ds.count()),
+                 cvs.line(df, 'x', 'y', ds.count()))
+    assert_eq_xr(cvs.area(store, 'x', 'y', ds.count()),
+                 cvs.area(df, 'x', 'y', ds.count()))
+
+
+def test_dict_source():
+    columns = {'x': df.x.values, 'y': df.y.values}
+    cvs = ds.Canvas(plot_width=10, plot_height=10)
+    assert_eq_xr(cvs.points(columns, 'x', 'y'), cvs.points(df, 'x', 'y'))
+
+
+def test_token(store):
+    from datashader.cache import source_token
+    assert source_token(store) == source_token(store.iloc[:])
+    assert source_token(store) != source_token(store.iloc[1:])
+    assert source_token(store.iloc[:10]) != source_token(store.iloc[1:11])
+    assert source_token(store[['x', 'y']]) != source_token(store)
+    # Stores of in-memory arrays can't be identified without reading them
+    assert source_token(ColumnStore({'x': df.x.values})) is None
+
+
+def test_dict_source_not_cached():
+    cvs = ds.Canvas(plot_width=10, plot_height=10)
+    first = cvs.points({'x': df.x.values, 'y': df.y.values}, 'x', 'y')
+    # Same columns and length, different data and ranges
+    second = cvs.points({'x': -df.x.values, 'y': df.y.values}, 'x', 'y')
+    assert_eq_xr(second, cvs.points(df.assign(x=-df.x), 'x', 'y'))
+    assert not first.equals(second)
+
+
+def test_errors():
+    with pytest.raises(ValueError, match='same length'):
+        ColumnStore({'x': np.arange(3), 'y': np.arange(4)})
+    with pytest.raises(ValueError, match='integer codes'):
+        ColumnStore({'x': np.arange(3.)}, categories={'x': ['a']})
+    store = ColumnStore({'x': np.arange(3.), 'y': np.arange(3.),
+                         'c': np.zeros(3, dtype='i1')}, categories={'c': ['a']})
+    with pytest.raises(ValueError, match='top_k'):
+        ds.Canvas().points(store, 'x', 'y', ds.count_cat('c', top_k=1))
@@ -190,6 +190,46 @@ def test_mean(ddf):
     assert_eq_xr(c.points(ddf, 'x', 'y', ds.mean('f64')), out)
 
 
+@pytest.mark.parametrize('npartitions', [1, 2, 3, 7])
+def test_first_last(npartitions):
+    ddf = dd.from_pandas(df_pd, npartitions=npartitions)
+    vals = values(df_pd.i64).reshape((2, 2, 5)).astype('f8')
+    out = xr.DataArray(vals[:, :, 0].T, coords=coords, dims=dims)
+    assert_eq_xr(c.points(ddf, 'x', 'y', ds.first('f64')), out)
+    out = xr.DataArray(vals[:, :, -1].T, coords=coords, dims=dims)
+    assert_eq_xr(c.points(ddf, 'x', 'y', ds.last('f64')), out)
+
+    # A single pixel, combined across all partitions
+    cvs = ds.Canvas(plot_width=1, plot_height=1, x_range=(0, 1),
+                    y_range=(0, 1))
+    assert cvs.points(ddf, 'x', 'y', ds.first('i64')).item() == 0
+    assert cvs.points(ddf, 'x', 'y', ds.last('i64')).item() == 19
+
+
+@pytest.mark.parametrize('npartitions', [1, 2, 3, 7])
+def test_first_last_order(npartitions):
+    shuffled = df_pd.sample(frac=1, random_state=1)
+    ddf = dd.from_pandas(shuffled, npartitions=npartitions, sort=False)
+    for red in (ds.first, ds.last):
+        assert_eq_xr(c.points(ddf, 'x', 'y', red('f64', order='i64')),
+                     c.points(df_pd, 'x', 'y', red('f64')))
+
+
+@pytest.mark.parametrize('npartitions', [1, 3, 7])
+def test_quantile(npartitions):
+    ddf = dd.from_pandas(df_pd, npartitions=npartitions)
+    agg = ds.summary(median=ds.quantile('f64', range=(0, 20), bins=40),
+                     p90=ds.quantile('f64', 0.9, range=(0, 20), bins=40))
+    xr.testing.assert_equal(c.points(ddf, 'x', 'y', agg),
+                            c.points(df_pd, 'x', 'y', agg))
+
+    cvs = ds.Canvas(plot_width=1, plot_height=1, x_range=(0, 1),
+                    y_range=(0, 1))
+    median = cvs.points(ddf, 'x', 'y', ds.quantile('i64', range=(0, 20),
+                                                   bins=20))
+    assert median.item() == 10
+
+
 @pytest.mark.parametrize('ddf', ddfs)
 def test_var(ddf):
     if dask_cudf and isinstance(ddf, dask_cudf.DataFrame):
@@ -236,6 +276,17 @@ def test_count_cat(ddf):
     agg = c.points(ddf, 'x', 'y', ds.count_cat('cat'))
     assert_eq_xr(agg, out)
 
+def test_count_cat_top_k():
+    cats = ['a'] * 1 + ['b'] * 5 + ['c'] * 3 + ['d'] * 2
+    df = pd.DataFrame({'x': np.linspace(0, 0.9, 11), 'y': np.zeros(11),
+                       'cat': pd.Categorical(cats)})
+    ddf = dd.from_pandas(df, npartitions=3)
+    agg = c.points(ddf, 'x', 'y', ds.count_cat('cat', top_k=2))
+    assert_eq_xr(agg, c.points(df, 'x', 'y', ds.count_cat('cat', top_k=2)))
+    assert list(agg.cat.values) == ['b', 'c', 'other']
+    np.testing.assert_equal(agg.sum(['x', 'y']).values, [5, 3, 3])
+
+
 @pytest.mark.parametrize('ddf', ddfs)
 def test_categorical_sum(ddf):
     sol = np.array([[[ 10, nan, nan, nan],
@@ -468,6 +519,53 @@ def test_points_geometry():
     assert_eq_xr(agg, out)
 
 
+@pytest.mark.parametrize('x_range', [None, (2.5, 7.3)])
+def test_line_decimate(x_range):
+    from datashader.tests.test_pandas import random_walk
+    df = random_walk(20000)
+    ddf = dd.from_pandas(df, npartitions=7)
+    cvs = ds.Canvas(plot_width=50, plot_height=40, x_range=x_range)
+    assert_eq_xr(cvs.line(ddf, 'x', 'y', decimate=True),
+                 cvs.line(df, 'x', 'y'))
+
+
+def test_sorted_x_divisions():
+    n = 1000
+    df = pd.DataFrame({'x': np.linspace(0, 10, n),
+                       'y': np.sin(np.linspace(0, 40, n))})
+    ddf = dd.from_pandas(df.set_index('x', drop=False), npartitions=10)
+    cvs = ds.Canvas(plot_width=30, plot_height=20, x_range=(4.02, 6.5),
+                    y_range=(-1, 1))
+
+    glyph = ds.Point('x', 'y')
+    assert ds.core._prune_sorted(ddf, cvs, glyph, None).npartitions == 3
+    glyph = ds.glyphs.LineAxis0('x', 'y')
+    assert ds.core._prune_sorted(ddf, cvs, glyph, None).npartitions == 5
+    assert ds.core._prune_sorted(ddf, cvs, glyph, False).npartitions == 10
+
+    for method in (cvs.points, cvs.line):
+        assert_eq_xr(method(ddf, 'x', 'y', ds.count()),
+                     method(df, 'x', 'y', ds.count(), x_sorted=False))
+
+    # Views outside the divisions keep a single partition
+    cvs = ds.Canvas(plot_width=30, plot_height=20, x_range=(20, 30),
+                    y_range=(-1, 1))
+    assert ds.core._prune_sorted(ddf, cvs, glyph, None).npartitions == 1
+    assert cvs.points(ddf, 'x', 'y').sum() == 0
+
+
+@pytest.mark.parametrize('npartitions', [1, 3])
+def test_filter(npartitions):
+    ddf = dd.from_pandas(df_pd, npartitions=npartitions)
+    flt = [('cat', 'in', ['b', 'c']), ('f64', '>=', 6)]
+    mask = df_pd.cat.isin(['b', 'c']) & (df_pd.f64 >= 6)
+    agg = ds.summary(n=ds.count(), m=ds.mean('i32'), c=ds.count_cat('cat'))
+    out = c.points(ddf, 'x', 'y', agg, filter=flt)
+    expected = c.points(df_pd[mask], 'x', 'y', agg)
+    for name in ['n', 'm', 'c']:
+        assert_eq_xr(out[name], expected[name])
+
+
 @pytest.mark.parametrize('DataFrame', DataFrames)
 def test_line(DataFrame):
     axis = ds.core.LinearAxis()
@@ -1183,3 +1281,40 @@ def test_trimesh_dask_partitions(npartitions):
     ], dtype='i4')
     np.testing.assert_array_equal(
         np.flipud(agg.fillna(0).astype('i4').values)[:5], sol)
+
+
+@pytest.mark.parametrize('split_every', [2, 3, 8])
+@pytest.mark.parametrize('agg', [ds.count(), ds.sum('f64'), ds.mean('f64'),
+                                 ds.std('f64'), ds.count_cat('cat')])
+def test_combine_tree(split_every, agg):
+    ddf = dd.from_pandas(df_pd, npartitions=10)
+    with config.set({'datashader.split_every': split_every}):
+        tree = c.points(ddf, 'x', 'y', agg)
+    assert_eq_xr(tree, c.points(df_pd, 'x', 'y', agg), close=True)
+
+
+def test_combine_tree_graph():
+    from datashader.data_libraries.dask import combine_tree
+    dsk = {}
+    keys = [('agg', i) for i in range(10)]
+    top = combine_tree(dsk, 'agg', keys, sum, split_every=3)
+    # 10 -> 4 -> 2 aggregates, combined by the caller
+    assert len(top) == 2
+    assert len(dsk) == 6
+    assert all(len(task[1]) <= 3 for task in dsk.values())
+
+    with pytest.raises(ValueError):
+        combine_tree({}, 'agg', keys, sum, split_every=1)
+
+
+@pytest.mark.parametrize('agg', [ds.count(), ds.max('f64'), ds.count_cat('cat'),
+                                 ds.summary(s=ds.sum('f64'), n=ds.count('f64'))])
+def test_points_base(agg):
+    ddf = dd.from_pandas(df_pd, npartitions=3)
+    base = c.points(df_pd.iloc[:8], 'x', 'y', agg)
+    result = c.points(ddf.loc[8:], 'x', 'y', agg, base=base)
+    expected = c.points(df_pd, 'x', 'y', agg)
+    if isinstance(expected, xr.Dataset):
+        xr.testing.assert_equal(result, expected)
+    else:
+        assert_eq_xr(result, expected)
@@ -0,0 +1,45 @@
+from __future__ import absolute_import
+import subprocess
+import sys
+
+import pytest
+
+import datashader as ds
+import datashader.reductions
+
+
+def test_reduction_names():
+    assert sorted(ds._reduction_names) == sorted(datashader.reductions.__all__)
+    for name in ds._reduction_names:
+        assert getattr(ds, name) is getattr(datashader.reductions, name)
+
+
+def test_lazy_attributes():
+    from datashader.core import Canvas
+    from datashader.pipeline import Pipeline
+    from datashader import transfer_functions, utils
+
+    assert ds.Canvas is Canvas
+    assert ds.Pipeline is Pipeline
+    assert ds.tf is transfer_functions
+    assert ds.utils is utils
+    assert {'Canvas', 'tf', 'count', 'data_libraries'} <= set(dir(ds))
+    with pytest.raises(AttributeError):
+        ds.not_an_attribute
+
+
+@pytest.mark.skipif(sys.version_info < (3, 7),
+                    reason='Lazy imports require Python 3.7')
+def test_import_is_lazy():
+    code = ("import sys, datashader; "
+            "print(' '.join(m for m in ('dask', 'numba', 'xarray', 'datashape', "
+            "'datashader.core', 'cudf', 'cupy') if m in sys.modules))")
+    out = subprocess.check_output([sys.executable, '-c', code])
+    assert out.decode().strip() == ''
+
+
+def test_ragged_dtype_registered():
+    code = ("import datashader, pandas as pd; "
+            "print(pd.api.types.pandas_dtype('Ragged[float64]'))")
+    out = subprocess.check_output([sys.executable, '-c', code])
+    assert out.decode().strip() == 'Ragged[float64]'
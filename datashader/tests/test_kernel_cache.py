@@ -0,0 +1,139 @@
+from __future__ import absolute_import
+
+import importlib
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import datashader as ds
+from datashader import kernel_cache
+
+
+pytestmark = pytest.mark.skipif(not kernel_cache.PY3,
+                                reason="kernel cache requires Python 3")
+
+df = pd.DataFrame({'kc_x': np.linspace(0, 1, 50),
+                   'kc_y': np.linspace(1, 0, 50),
+                   'kc_v': np.arange(50, dtype='f8')})
+
+
+@pytest.fixture
+def cache_dir(tmpdir):
+    kernel_cache.set_cache_dir(str(tmpdir))
+    yield str(tmpdir)
+    kernel_cache.set_cache_dir(None)
+
+
+def test_import_path():
+    assert kernel_cache.import_path(ds.reductions.count._append) == (
+        'datashader.reductions', 'count._append')
+    assert kernel_cache.import_path(ds.core.LinearAxis.mapper) == (
+        'datashader.core', 'LinearAxis.mapper')
+
+    def closure():
+        pass
+    assert kernel_cache.import_path(closure) is None
+
+
+def test_disabled():
+    assert kernel_cache.get_cache_dir() is None
+    assert kernel_cache.load_kernel('@_jit\ndef f():\n    return 1\n',
+                                    'f', {}) is None
+
+
+def test_cached_points(cache_dir):
+    cvs = ds.Canvas(plot_width=5, plot_height=5)
+    agg = ds.summary(kc_max=ds.max('kc_v'), kc_count=ds.count())
+    result = cvs.points(df, 'kc_x', 'kc_y', agg)
+
+    modules = [f for f in os.listdir(cache_dir) if f.endswith('.py')]
+    # One module for append, and one for each of the two points kernels
+    assert len(modules) == 3
+
+    counts, _, _ = np.histogram2d(df.kc_y, df.kc_x, bins=5,
+                                  range=[(0, 1), (0, 1)])
+    np.testing.assert_equal(result.kc_count.values, counts)
+    xi = np.minimum((df.kc_x.values * 5).astype(int), 4)
+    yi = np.minimum((df.kc_y.values * 5).astype(int), 4)
+    maxes = np.full((5, 5), np.nan)
+    np.fmax.at(maxes, (yi, xi), df.kc_v.values)
+    np.testing.assert_equal(result.kc_max.values, maxes)
+
+
+@pytest.mark.parametrize('glyph', ['line', 'area'])
+def test_cached_glyph_kernels(tmpdir, glyph):
+    cvs = ds.Canvas(plot_width=5, plot_height=5)
+    expected = getattr(cvs, glyph)(df, 'kc_x', 'kc_y', ds.count())
+
+    # Other columns make other glyphs, whose kernels aren't memoized yet
+    renamed = df.rename(columns={'kc_x': 'kc_' + glyph + '_x',
+                                 'kc_y': 'kc_' + glyph + '_y'})
+    kernel_cache.set_cache_dir(str(tmpdir))
+    try:
+        result = getattr(cvs, glyph)(renamed, 'kc_' + glyph + '_x',
+                                     'kc_' + glyph + '_y', ds.count())
+    finally:
+        kernel_cache.set_cache_dir(None)
+
+    modules = [f for f in os.listdir(str(tmpdir)) if f.endswith('.py')]
+    assert len(modules) > 1
+    np.testing.assert_equal(result.values, expected.values)
+
+
+def test_jit_function_nested(cache_dir):
+    offset = 2.0
+
+    @ds.utils.ngjit
+    def add_offset(a):
+        return ds.core.LinearAxis.mapper(a) + offset
+
+    assert add_offset(1.0) == 3.0
+    assert add_offset.py_func.__module__.startswith('datashader_kernel_')
+
+    def uses_module(a):
+        return a + np.zeros(1)
+
+    assert kernel_cache.jit_function(uses_module)(1.0)[0] == 1.0
+
+    def uses_array(a):
+        return a + values[0]
+
+    values = np.ones(1)
+    assert kernel_cache.jit_function(uses_array) is None
+
+
+def test_load_kernel_reuses_compiled_code(cache_dir):
+    code = '@_jit\ndef add(a, b):\n    return mapper(a) + b\n'
+    namespace = dict(mapper=ds.core.LinearAxis.mapper)
+    add = kernel_cache.load_kernel(code, 'add', namespace)
+    assert add(1.0, 2.0) == 3.0
+    assert add.stats.cache_misses
+
+    # Simulate a fresh process by forgetting the loaded module
+    del sys.modules[add.py_func.__module__]
+    add2 = kernel_cache.load_kernel(code, 'add', namespace)
+    assert add2 is not add
+    assert add2(1.0, 2.0) == 3.0
+    assert add2.stats.cache_hits
+
+
+def test_source_digest_follows_helpers(tmpdir, monkeypatch):
+    monkeypatch.syspath_prepend(str(tmpdir))
+    module = tmpdir.join('kc_helpers.py')
+
+    def digest(helper_body):
+        module.write('def helper(a):\n    return {0}\n\n\n'
+                     'def kernel(a):\n    return helper(a)\n'
+                     .format(helper_body))
+        sys.modules.pop('kc_helpers', None)
+        importlib.invalidate_caches()
+        import kc_helpers
+        return kernel_cache._source_digest([kc_helpers.kernel])
+
+    # Editing a function called by a kernel function gives a new module
+    assert digest('a + 1') == digest('a + 1')
+    # (of a different length, as stale bytecode is detected by size)
+    assert digest('a + 1') != digest('a + 10')
@@ -200,6 +200,115 @@ def test_mean(df):
     assert_eq_xr(c.points(df, 'x', 'y', ds.mean('f64')), out)
 
 
+@pytest.mark.parametrize('df', [df_pd])
+def test_first(df):
+    out = xr.DataArray(values(df.i64).reshape((2, 2, 5))[:, :, 0].astype('f8').T,
+                       coords=coords, dims=dims)
+    assert_eq_xr(c.points(df, 'x', 'y', ds.first('i32')), out)
+    assert_eq_xr(c.points(df, 'x', 'y', ds.first('i64')), out)
+    assert_eq_xr(c.points(df, 'x', 'y', ds.first('f64')), out)
+
+
+@pytest.mark.parametrize('df', [df_pd])
+def test_last(df):
+    out = xr.DataArray(values(df.i64).reshape((2, 2, 5))[:, :, -1].astype('f8').T,
+                       coords=coords, dims=dims)
+    assert_eq_xr(c.points(df, 'x', 'y', ds.last('i32')), out)
+    assert_eq_xr(c.points(df, 'x', 'y', ds.last('i64')), out)
+    assert_eq_xr(c.points(df, 'x', 'y', ds.last('f64')), out)
+
+
+def test_first_skips_nan():
+    df = df_pd.assign(f64=df_pd.f64.where(df_pd.i64 % 5 != 0))
+    out = xr.DataArray(np.array([[1., 11.], [6., 16.]]),
+                       coords=coords, dims=dims)
+    assert_eq_xr(c.points(df, 'x', 'y', ds.first('f64')), out)
+
+
+def test_first_last_order():
+    shuffled = df_pd.sample(frac=1, random_state=1)
+    reverse = shuffled.assign(rev=-shuffled.i64)
+    for red, other in ((ds.first, ds.last), (ds.last, ds.first)):
+        expected = c.points(df_pd, 'x', 'y', red('f64'))
+        assert_eq_xr(c.points(shuffled, 'x', 'y', red('f64', order='i64')),
+                     expected)
+        # Reversing the order swaps first and last
+        assert_eq_xr(c.points(reverse, 'x', 'y', other('f64', order='rev')),
+                     expected)
+
+    with pytest.raises(ValueError, match='order column'):
+        c.points(df_pd, 'x', 'y', ds.first('f64', order='missing'))
+    with pytest.raises(ValueError, match='per category'):
+        c.points(df_pd, 'x', 'y', ds.by('cat', ds.last('f64', order='i64')))
+
+
+def test_first_last_threads():
+    cvs = ds.Canvas(plot_width=1, plot_height=1, x_range=(0, 1),
+                    y_range=(0, 1), threads=4)
+    n = 400000
+    df = pd.DataFrame({'x': np.zeros(n), 'y': np.zeros(n),
+                       'v': np.arange(n, dtype='f8')})
+    assert cvs.points(df, 'x', 'y', ds.first('v')).item() == 0
+    assert cvs.points(df, 'x', 'y', ds.last('v')).item() == n - 1
+    df['rev'] = -df.v
+    assert cvs.points(df, 'x', 'y', ds.first('v', order='rev')).item() == n - 1
+    assert cvs.points(df, 'x', 'y', ds.last('v', order='rev')).item() == 0
+
+
+def test_quantile():
+    # Bins of width 1 starting at each integer, interpolated linearly
+    start = values(df_pd.i64).reshape((2, 2, 5))[:, :, 0].T
+    for q, offset in [(0, 0), (0.5, 2.5), (0.9, 4.5), (1, 5)]:
+        out = xr.DataArray(start + offset, coords=coords, dims=dims)
+        agg = ds.quantile('i64', q, range=(0, 20), bins=20)
+        assert_eq_xr(c.points(df_pd, 'x', 'y', agg), out, close=True)
+
+    # Values outside the range are counted in the first or last bin
+    out = xr.DataArray(np.array([[6, 10], [10, 10]], dtype='f8'),
+                       coords=coords, dims=dims)
+    agg = ds.quantile('f64', 1, range=(0, 10), bins=5)
+    assert_eq_xr(c.points(df_pd, 'x', 'y', agg), out, close=True)
+
+
+def test_quantile_accuracy():
+    cvs = ds.Canvas(plot_width=1, plot_height=1, x_range=(0, 1),
+                    y_range=(0, 1))
+    np.random.seed(1)
+    df = pd.DataFrame({'x': np.zeros(10000), 'y': np.zeros(10000),
+                       'v': np.random.lognormal(size=10000)})
+    df.loc[::10, 'v'] = np.nan
+    agg = ds.summary(
+        median=ds.quantile('v', 0.5, range=(0, 20), bins=2000),
+        p95=ds.quantile('v', 0.95, range=(0, 20), bins=2000))
+    result = cvs.points(df, 'x', 'y', agg)
+    assert abs(result.median.item() - df.v.median()) < 0.02
+    assert abs(result.p95.item() - df.v.quantile(0.95)) < 0.02
+    # Both quantiles are computed from the same histogram
+    assert (agg.values[0]._build_bases() == agg.values[1]._build_bases())
+
+
+def test_categorical_quantile():
+    agg = c.points(df_pd, 'x', 'y',
+                   ds.by('cat', ds.quantile('i64', range=(0, 20), bins=20)))
+    assert agg.dims == ('y', 'x', 'cat')
+    # Each category falls in a single pixel
+    medians = np.nanmax(agg.values, axis=(0, 1))
+    np.testing.assert_allclose(medians, [2.5, 7.5, 12.5, 17.5])
+    assert np.isnan(agg.values).sum() == 12
+
+
+def test_quantile_errors():
+    with pytest.raises(ValueError, match='range'):
+        ds.quantile('f64')
+    with pytest.raises(ValueError, match='range'):
+        ds.quantile('f64', range=(1, 1))
+    with pytest.raises(ValueError, match='q must be'):
+        ds.quantile('f64', 1.5, range=(0, 1))
+    agg = c.points(df_pd, 'x', 'y', ds.quantile('f64', range=(0, 20)))
+    with pytest.raises(ValueError, match="can't be used as a base"):
+        c.points(df_pd, 'x', 'y', ds.quantile('f64', range=(0, 20)), base=agg)
+
+
 @pytest.mark.parametrize('df', [df_pd])
 def test_var(df):
     out = xr.DataArray(values(df.i32).reshape((2, 2, 5)).var(axis=2, dtype='f8').T,
@@ -250,6 +359,52 @@ def test_categorical_count(df):
     agg = c.points(df, 'x', 'y', ds.by('cat', ds.count('i32')))
     assert_eq_xr(agg, out)
 
+def test_count_cat_top_k():
+    cats = ['a'] * 1 + ['b'] * 5 + ['c'] * 3 + ['d'] * 2
+    df = pd.DataFrame({'x': np.linspace(0, 0.9, 11), 'y': np.zeros(11),
+                       'v': np.arange(11, dtype='f8'),
+                       'cat': pd.Categorical(cats, categories=list('dcba'))})
+    agg = c.points(df, 'x', 'y', ds.count_cat('cat', top_k=2))
+    assert list(agg.cat.values) == ['c', 'b', 'other']
+    assert agg.attrs['other_category'] == 'other'
+    np.testing.assert_equal(agg.sum(['x', 'y']).values, [3, 5, 3])
+    full = c.points(df, 'x', 'y', ds.count_cat('cat'))
+    np.testing.assert_equal(
+        agg.sel(cat='other').values,
+        full.sel(cat=['a', 'd']).sum('cat').values)
+
+    agg = c.points(df, 'x', 'y', ds.by('cat', ds.sum('v'), top_k=1,
+                                       other='rest'))
+    assert list(agg.cat.values) == ['b', 'rest']
+    assert agg.sel(cat='rest').sum().item() == df.v[df.cat != 'b'].sum()
+
+    # Fewer categories than top_k are kept as they are
+    agg = c.points(df, 'x', 'y', ds.count_cat('cat', top_k=10))
+    assert list(agg.cat.values) == list('dcba')
+
+    with pytest.raises(ValueError, match='Conflicting'):
+        c.points(df, 'x', 'y', ds.summary(a=ds.count_cat('cat', top_k=2),
+                                          b=ds.count_cat('cat', top_k=3)))
+
+
+def test_top_categories_remapped():
+    from datashader.core import _top_categories
+    cats = ['a'] * 1 + ['b'] * 5 + ['c'] * 3 + ['d'] * 2 + [None]
+    df = pd.DataFrame({'v': np.arange(12, dtype='f8'),
+                       'cat': pd.Categorical(cats, categories=list('dcba'))})
+    agg = ds.count_cat('cat', top_k=2)
+    merged = _top_categories(df, agg)
+    assert list(merged.cat[:-1]) == (['other'] + ['b'] * 5 + ['c'] * 3 +
+                                     ['other'] * 2)
+    assert pd.isnull(merged.cat.iloc[-1])
+    assert list(merged.cat.cat.categories) == ['c', 'b', 'other']
+    # The source is left as is, and its other columns are shared
+    assert list(df.cat.cat.categories) == list('dcba')
+    assert np.shares_memory(merged.v.values, df.v.values)
+    # The merged frame is reused, keeping its identity for the caches
+    assert _top_categories(df, agg) is merged
+
+
 @pytest.mark.parametrize('df', dfs)
 def test_categorical_sum(df):
     sol = np.array([[[ 10, nan, nan, nan],
@@ -547,6 +702,120 @@ def test_line():
     assert_eq_xr(agg, out)
 
 
+def test_sorted_x_pruning():
+    n = 1000
+    df = pd.DataFrame({'x': np.linspace(0, 10, n),
+                       'y': np.sin(np.linspace(0, 40, n)),
+                       'v': np.arange(n, dtype='f8')})
+    cvs = ds.Canvas(plot_width=30, plot_height=20, x_range=(4.02, 6.5),
+                    y_range=(-1, 1))
+    for method, agg, pad in [(cvs.points, ds.sum('v'), 0),
+                             (cvs.line, ds.count(), 1)]:
+        expected = method(df, 'x', 'y', agg, x_sorted=False)
+        assert_eq_xr(method(df, 'x', 'y', agg), expected)
+        assert_eq_xr(method(df, 'x', 'y', agg, x_sorted=True), expected)
+
+        glyph = ds.glyphs.LineAxis0('x', 'y') if pad else ds.Point('x', 'y')
+        pruned = ds.core._prune_sorted(df, cvs, glyph, True)
+        inside = df.x.between(4.02, 6.5)
+        assert len(pruned) == inside.sum() + 2 * pad
+
+    # pandas sources are only pruned on request, as checking would scan x,
+    # and not without a y_range
+    glyph = ds.Point('x', 'y')
+    assert len(ds.core._prune_sorted(df, cvs, glyph, None)) == n
+    cvs = ds.Canvas(plot_width=30, plot_height=20, x_range=(4, 6.5))
+    assert len(ds.core._prune_sorted(df, cvs, glyph, True)) == n
+
+
+def random_walk(n, seed=2):
+    np.random.seed(seed)
+    df = pd.DataFrame({'x': np.linspace(-1, 11, n),
+                       'y': np.cumsum(np.random.normal(size=n))})
+    df.loc[n // 3, 'y'] = np.nan
+    df.loc[n // 2, 'x'] = np.nan
+    return df
+
+
+@pytest.mark.parametrize('x_range,y_range', [
+    (None, None), ((0, 10), None), ((2.5, 7.3), (-20, 20)),
+])
+@pytest.mark.parametrize('x_axis_type', ['linear', 'log'])
+def test_line_decimate(x_range, y_range, x_axis_type):
+    df = random_walk(20000)
+    if x_axis_type == 'log':
+        df['x'] += 2
+        x_range = x_range and (x_range[0] + 2, x_range[1] + 2)
+    cvs = ds.Canvas(plot_width=50, plot_height=40, x_range=x_range,
+                    y_range=y_range, x_axis_type=x_axis_type)
+    assert_eq_xr(cvs.line(df, 'x', 'y', decimate=True),
+                 cvs.line(df, 'x', 'y'))
+
+    # Unsorted vertices are decimated within runs in the same column
+    blocks = np.random.permutation(len(df) // 50)
+    shuffled = df.iloc[(blocks[:, None] * 50 + np.arange(50)).ravel()]
+    assert_eq_xr(cvs.line(shuffled, 'x', 'y', decimate=True),
+                 cvs.line(shuffled, 'x', 'y'))
+
+
+def test_m4_indices():
+    from datashader.glyphs.line import m4_indices
+    cols = np.array([0, 0, 0, 0, 0, 1, np.nan, 1, 1, 2], dtype='f8')
+    ys = np.array([3, 5, 1, 4, 2, 0, 0, 7, 6, 1], dtype='f8')
+    np.testing.assert_equal(m4_indices(cols, ys), [0, 1, 2, 4, 5, 6, 7, 8, 9])
+
+
+def test_line_decimate_errors():
+    df = random_walk(100)
+    cvs = ds.Canvas(plot_width=50, plot_height=40)
+    with pytest.raises(ValueError, match='any'):
+        cvs.line(df, 'x', 'y', ds.count(), decimate=True)
+    with pytest.raises(ValueError, match='single line'):
+        cvs.line(df, ['x', 'x'], ['y', 'y'], decimate=True)
+
+
+@pytest.mark.parametrize('flt,mask', [
+    (('i32', '>', 7), df_pd.i32 > 7),
+    ([('f64', 'between', (3, 12)), ('y', '==', 1)],
+     df_pd.f64.between(3, 12) & (df_pd.y == 1)),
+    (('f64', '!=', 4), df_pd.f64 != 4),
+    (('i64', 'not in', [1, 5, 19]), ~df_pd.i64.isin([1, 5, 19])),
+    (('i64', '<=', np.inf), df_pd.i64 <= np.inf),
+    (('cat', 'in', ['a', 'd', 'z']), df_pd.cat.isin(['a', 'd'])),
+    (('cat', '!=', 'b'), df_pd.cat != 'b'),
+    (('cat', '==', 'z'), df_pd.cat == 'z'),
+])
+def test_filter(flt, mask):
+    agg = ds.summary(n=ds.count(), s=ds.sum('f64'), c=ds.count_cat('cat'))
+    out = c.points(df_pd, 'x', 'y', agg, filter=flt)
+    expected = c.points(df_pd[mask], 'x', 'y', agg)
+    for name in ['n', 's', 'c']:
+        assert_eq_xr(out[name], expected[name])
+
+
+def test_filter_line():
+    df = pd.DataFrame({'x': np.arange(10.), 'y': np.arange(10.) % 3,
+                       'i': np.arange(10)})
+    cvs = ds.Canvas(plot_width=20, plot_height=6, x_range=(0, 9),
+                    y_range=(0, 2))
+    # Only the segments starting at the rows kept are drawn
+    out = cvs.line(df, 'x', 'y', ds.count(), filter=('i', '<', 5))
+    assert_eq_xr(out, cvs.line(df.iloc[:6], 'x', 'y', ds.count()))
+
+
+def test_filter_errors():
+    with pytest.raises(ValueError, match='not found'):
+        c.points(df_pd, 'x', 'y', filter=('nope', '==', 1))
+    with pytest.raises(ValueError, match='categorical'):
+        c.points(df_pd, 'x', 'y', filter=('cat', '<', 'b'))
+    with pytest.raises(ValueError, match='operator'):
+        c.points(df_pd, 'x', 'y', filter=('i32', '=', 1))
+    with pytest.raises(ValueError, match='NaN'):
+        c.points(df_pd, 'x', 'y', filter=('f64', '==', np.nan))
+    with pytest.raises(ValueError, match='filter'):
+        c.line(df_pd, 'x', 'y', filter=('i32', '>', 1), decimate=True)
+
+
 def test_points_on_edge():
     df = pd.DataFrame(dict(x=[0, 0.5, 1.1, 1.5, 2.2, 3, 3, 0],
                            y=[0, 0, 0, 0, 0, 0, 3, 3]))
@@ -1546,3 +1815,140 @@ def test_area_to_line_autorange_gap():
     out = xr.DataArray(sol, coords=[lincoords_y, lincoords_x],
                        dims=['y0', 'x'])
     assert_eq_xr(agg, out)
+
+
+@pytest.mark.parametrize('agg', [ds.count(), ds.sum('f64'), ds.min('f64'),
+                                 ds.max('f64'), ds.mean('f64'), ds.var('f64'),
+                                 ds.count_cat('cat')])
+def test_points_threads(agg, monkeypatch):
+    monkeypatch.setattr(ds.data_libraries.pandas, 'min_rows_per_thread', 1)
+    cvs = ds.Canvas(plot_width=2, plot_height=2, x_range=(0, 1), y_range=(0, 1))
+    cvs_threads = ds.Canvas(plot_width=2, plot_height=2, x_range=(0, 1),
+                            y_range=(0, 1), threads=3)
+    assert_eq_xr(cvs_threads.points(df_pd, 'x', 'y', agg),
+                 cvs.points(df_pd, 'x', 'y', agg), close=True)
+
+
+@pytest.mark.parametrize('threads', [2, 3, 7])
+def test_line_area_threads(threads, monkeypatch):
+    monkeypatch.setattr(ds.data_libraries.pandas, 'min_rows_per_thread', 1)
+    df = pd.DataFrame({'x': [4, 0, -4, -3, -2, -1.9, 0, 10, 10, 0, 4],
+                       'y': [0, -4, 0, 1, 2, 2.1, 4, 20, 30, 4, 0]})
+    cvs = ds.Canvas(plot_width=7, plot_height=7,
+                    x_range=(-3, 3), y_range=(-3, 3))
+    cvs_threads = ds.Canvas(plot_width=7, plot_height=7,
+                            x_range=(-3, 3), y_range=(-3, 3), threads=threads)
+    assert_eq_xr(cvs_threads.line(df, 'x', 'y', ds.count()),
+                 cvs.line(df, 'x', 'y', ds.count()))
+    assert_eq_xr(cvs_threads.area(df, 'x', 'y', ds.count()),
+                 cvs.area(df, 'x', 'y', ds.count()))
+
+
+def test_row_chunks():
+    from datashader.data_libraries.pandas import row_chunks
+    assert row_chunks(ds.glyphs.Point('x', 'y'), 10, 3) == [
+        (0, 3, True), (3, 6, True), (6, 10, True)]
+    assert row_chunks(ds.glyphs.LineAxis0('x', 'y'), 10, 3) == [
+        (0, 3, True), (2, 6, False), (5, 10, False)]
+    assert row_chunks(ds.glyphs.Triangles('x', 'y'), 10, 2) == [
+        (0, 3, True), (3, 10, True)]
+    assert row_chunks(ds.glyphs.Point('x', 'y'), 2, 4) == [
+        (0, 1, True), (1, 2, True)]
+
+
+def test_invalid_threads():
+    cvs = ds.Canvas(plot_width=2, plot_height=2, threads=0)
+    with pytest.raises(ValueError):
+        cvs.points(df_pd, 'x', 'y')
+
+
+@pytest.mark.parametrize('agg', [ds.count(), ds.any(), ds.sum('f64'),
+                                 ds.min('f64'), ds.max('f64'),
+                                 ds.count_cat('cat'),
+                                 ds.summary(s=ds.sum('f64'), n=ds.count('f64'))])
+def test_points_base(agg):
+    full = c.points(df_pd, 'x', 'y', agg)
+    result = c.points(df_pd.iloc[:7], 'x', 'y', agg)
+    result = c.points(df_pd.iloc[7:13], 'x', 'y', agg, base=result)
+    result = c.points(df_pd.iloc[13:], 'x', 'y', agg, base=result)
+    if isinstance(full, xr.Dataset):
+        xr.testing.assert_equal(result, full)
+    else:
+        assert_eq_xr(result, full)
+
+
+@pytest.mark.parametrize('threads', [None, 2])
+def test_points_base_arrays(threads, monkeypatch):
+    monkeypatch.setattr(ds.data_libraries.pandas, 'min_rows_per_thread', 1)
+    cvs = ds.Canvas(plot_width=2, plot_height=2, x_range=(0, 1),
+                    y_range=(0, 1), threads=threads)
+    sums = np.zeros((2, 2))
+    counts = np.zeros((2, 2), dtype='u4')
+    cvs.points(df_pd.iloc[:10], 'x', 'y', ds.mean('f64'), base=(sums, counts),
+               inplace=True)
+    result = cvs.points(df_pd.iloc[10:], 'x', 'y', ds.mean('f64'),
+                        base=(sums, counts), inplace=True)
+    assert_eq_xr(result, c.points(df_pd, 'x', 'y', ds.mean('f64')), close=True)
+
+
+def test_points_base_copied():
+    counts = c.points(df_pd.iloc[:10], 'x', 'y')
+    expected = counts.copy()
+    result = c.points(df_pd.iloc[10:], 'x', 'y', base=counts)
+    assert_eq_xr(result, c.points(df_pd, 'x', 'y'))
+    assert_eq_xr(counts, expected)
+
+
+def test_line_base():
+    df = pd.DataFrame({'x': [4, 0, -4, -3, -2, -1.9, 0, 10, 10, 0, 4],
+                       'y': [0, -4, 0, 1, 2, 2.1, 4, 20, 30, 4, 0]})
+    cvs = ds.Canvas(plot_width=7, plot_height=7,
+                    x_range=(-3, 3), y_range=(-3, 3))
+    # Batches overlap by one row, as lines aren't joined across batches
+    agg = cvs.line(df.iloc[:6], 'x', 'y', ds.count())
+    agg = cvs.line(df.iloc[5:], 'x', 'y', ds.count(), base=agg)
+    full = cvs.line(df, 'x', 'y', ds.count())
+    # The vertex shared by both batches is hit twice
+    assert (agg.values - full.values).sum() == 1
+
+
+def test_points_base_errors():
+    mean = c.points(df_pd, 'x', 'y', ds.mean('f64'))
+    with pytest.raises(ValueError, match="can't be used as a base"):
+        c.points(df_pd, 'x', 'y', ds.mean('f64'), base=mean)
+
+    counts = c.points(df_pd, 'x', 'y', ds.count())
+    with pytest.raises(ValueError, match='x_range and y_range'):
+        ds.Canvas(plot_width=2, plot_height=2).points(
+            df_pd, 'x', 'y', ds.count(), base=counts)
+
+    cvs = ds.Canvas(plot_width=3, plot_height=2, x_range=(0, 1), y_range=(0, 1))
+    with pytest.raises(ValueError, match='shape'):
+        cvs.points(df_pd, 'x', 'y', ds.count(), base=counts)
+
+    with pytest.raises(ValueError, match='Expected 2 base arrays'):
+        c.points(df_pd, 'x', 'y', ds.mean('f64'), base=(counts.data,))
+
+
+def test_bypixel_many(monkeypatch):
+    from datashader.core import bypixel_many
+    monkeypatch.setattr(ds.data_libraries.pandas, 'views_block_rows', 7)
+    df = random_walk(100)
+    overview = ds.Canvas(plot_width=30, plot_height=20)
+    detail = ds.Canvas(plot_width=40, plot_height=40, x_range=(2, 5),
+                       y_range=(-3, 3))
+    views = [(overview, ds.glyphs.Point('x', 'y'), ds.count()),
+             (detail, ds.glyphs.Point('x', 'y'),
+              ds.summary(s=ds.sum('y'), m=ds.max('x'))),
+             (detail, ds.glyphs.LineAxis0('x', 'y'), ds.count())]
+    points, detail_points, detail_line = bypixel_many(df, views)
+    assert_eq_xr(points, overview.points(df, 'x', 'y'))
+    expected = detail.points(df, 'x', 'y',
+                             ds.summary(s=ds.sum('y'), m=ds.max('x')))
+    assert_eq_xr(detail_points['s'], expected['s'], close=True)
+    assert_eq_xr(detail_points['m'], expected['m'])
+    # Lines are joined across blocks
+    assert_eq_xr(detail_line, detail.line(df, 'x', 'y', ds.count()))
+
+    with pytest.raises(ValueError, match='tuples'):
+        bypixel_many(df, [(overview, ds.count())])
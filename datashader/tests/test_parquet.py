@@ -0,0 +1,101 @@
+from __future__ import absolute_import
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import datashader as ds
+from datashader.data_libraries.dask import prune_row_groups
+
+pq = pytest.importorskip('pyarrow.parquet')
+pa = pytest.importorskip('pyarrow')
+
+from datashader.parquet import (  # noqa (skipped without pyarrow)
+    read_parquet, partition_statistics, prune_partitions
+)
+
+np.random.seed(4)
+n = 1000
+df = pd.DataFrame({'x': np.sort(np.random.uniform(0, 10, n)),
+                   'y': np.random.uniform(0, 10, n),
+                   'v': np.random.normal(size=n)})
+
+
+@pytest.fixture(scope='module')
+def path(tmpdir_factory):
+    path = str(tmpdir_factory.mktemp('parquet').join('points.parquet'))
+    pq.write_table(pa.Table.from_pandas(df, preserve_index=False), path,
+                   row_group_size=100)
+    return path
+
+
+def test_read_parquet(path):
+    ddf = read_parquet(path)
+    assert ddf.npartitions == 10
+    stats = partition_statistics(ddf)
+    assert len(stats) == 10
+    assert stats[0]['x'] == (df.x[0], df.x[99])
+    pd.testing.assert_frame_equal(ddf.compute().reset_index(drop=True), df)
+
+    ddf = read_parquet(path, columns=['x', 'y'])
+    assert list(ddf.columns) == ['x', 'y']
+    assert set(partition_statistics(ddf)[0]) == {'x', 'y'}
+
+
+def test_prune_partitions(path):
+    ddf = read_parquet(path)
+    pruned = prune_partitions(ddf, {'x': (df.x[150], df.x[320])})
+    assert pruned.npartitions == 3
+    assert len(partition_statistics(pruned)) == 3
+    # The statistics are kept by graph name, persisting keeps them
+    assert partition_statistics(ddf.persist()) == partition_statistics(ddf)
+    expected = df[df.x.between(df.x[150], df.x[320])]
+    result = pruned.compute()
+    assert result.x.between(df.x[100], df.x[399]).all()
+    assert set(expected.x) <= set(result.x)
+    # No partition intersects, one is kept
+    assert prune_partitions(ddf, {'x': (20, 30)}).npartitions == 1
+    # Frames without statistics are returned as is
+    other = ddf[ddf.v > 0]
+    assert prune_partitions(other, {'x': (20, 30)}) is other
+
+
+def test_prune_partitions_datetime(tmpdir):
+    path = str(tmpdir.join('times.parquet'))
+    times = pd.DataFrame({'t': pd.date_range('2019-01-01', periods=100,
+                                             freq='H'),
+                          'y': np.arange(100.)})
+    pq.write_table(pa.Table.from_pandas(times, preserve_index=False), path,
+                   row_group_size=10)
+    ddf = read_parquet(path)
+    stats = partition_statistics(ddf)
+    assert stats[1]['t'] == (np.datetime64(times.t[10]),
+                             np.datetime64(times.t[19]))
+    # Ranges of datetime columns are compared as nanoseconds or datetimes
+    lo, hi = times.t[25], times.t[44]
+    for bounds in [(lo.value, hi.value),
+                   (np.datetime64(lo), np.datetime64(hi))]:
+        pruned = prune_partitions(ddf, {'t': bounds})
+        assert pruned.npartitions == 3
+
+
+@pytest.mark.parametrize('x_range,y_range,npartitions', [
+    ((2.5, 4.1), (0, 10), 3),
+    ((2.5, 4.1), (20, 30), 1),
+    ((-5, 15), (0, 5), 10),
+])
+def test_points_pruned(path, x_range, y_range, npartitions):
+    ddf = read_parquet(path)
+    cvs = ds.Canvas(plot_width=20, plot_height=20, x_range=x_range,
+                    y_range=y_range)
+    glyph = ds.Point('x', 'y')
+    assert prune_row_groups(ddf, cvs, glyph).npartitions == npartitions
+    agg = ds.summary(n=ds.count(), s=ds.sum('v'))
+    result = cvs.points(ddf, 'x', 'y', agg)
+    expected = cvs.points(df, 'x', 'y', agg)
+    for name in ['n', 's']:
+        np.testing.assert_allclose(result[name].values, expected[name].values)
+
+    # Lines cross the gaps between row groups, and aren't pruned
+    glyph = ds.glyphs.LineAxis0('x', 'y')
+    assert prune_row_groups(ddf, cvs, glyph) is ddf
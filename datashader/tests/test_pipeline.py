@@ -1,8 +1,10 @@
 from __future__ import absolute_import
 import numpy as np
+import pytest
 import pandas as pd
 import datashader as ds
 import datashader.transfer_functions as tf
+from datashader.glyphs import LineAxis0
 
 
 df = pd.DataFrame({'x': np.array(([0.] * 10 + [1] * 10)),
@@ -33,3 +35,129 @@ def test_pipeline():
     img = pipeline((0, 1), (0, 1), 2, 2)
     agg = cvs.points(df, 'x', 'y', ds.sum('f64'))
     assert img.equals(tf.shade(agg))
+
+
+def test_pipeline_timings():
+    pipeline = ds.Pipeline(df, ds.Point('x', 'y'))
+    pipeline((0, 1), (0, 1), 2, 2)
+    assert list(pipeline.timings) == ['aggregate', 'transform', 'shade',
+                                      'spread', 'total']
+
+
+def test_pipeline_cancelled(monkeypatch):
+    from datashader.pipeline import RenderCancelled, _CancelToken
+    monkeypatch.setattr(ds.pipeline, 'chunk_rows', 5)
+    pipeline = ds.Pipeline(df, ds.Point('x', 'y'))
+    token = _CancelToken()
+    img = pipeline._render((0, 1), (0, 1), 2, 2, token)
+    assert img.equals(pipeline((0, 1), (0, 1), 2, 2))
+    token.cancel()
+    with pytest.raises(RenderCancelled):
+        pipeline._render((0, 1), (0, 1), 2, 2, token)
+
+
+def test_pipeline_cancelled_not_chunkable(monkeypatch):
+    from datashader.cache import AggregateCache
+    from datashader.pipeline import _CancelToken
+    monkeypatch.setattr(ds.pipeline, 'chunk_rows', 5)
+    monkeypatch.setattr(ds.core.bypixel, 'cache', AggregateCache())
+    cats = df.assign(cat=pd.Categorical(['a', 'b', 'b', 'c'] * 5))
+    # top_k isn't supported by chunks, the frame is aggregated at once
+    pipeline = ds.Pipeline(cats, ds.Point('x', 'y'),
+                           ds.by('cat', ds.count(), top_k=1))
+    img = pipeline._render((0, 1), (0, 1), 2, 2, _CancelToken())
+    assert img.equals(pipeline((0, 1), (0, 1), 2, 2))
+
+    # Aggregates of chunks are cached as those of bypixel
+    pipeline = ds.Pipeline(cats, ds.Point('x', 'y'))
+    pipeline._render((0, 1), (0, 1), 2, 2, _CancelToken())
+    hits = ds.core.bypixel.cache.hits
+    token = _CancelToken()
+    pipeline._render((0, 1), (0, 1), 2, 2, token)
+    assert ds.core.bypixel.cache.hits == hits + 1
+
+
+def test_pipeline_cancel_callback_thread():
+    import threading
+    import dask.dataframe as dd
+    from datashader.pipeline import (RenderCancelled, _CancelCallback,
+                                     _CancelToken)
+    ddf = dd.from_pandas(df, npartitions=2)
+    token = _CancelToken()
+    token.cancel()
+    results = []
+
+    def compute():
+        results.append(ddf.x.sum().compute(scheduler='sync'))
+
+    with _CancelCallback(token):
+        # Graphs computed by other threads aren't cancelled
+        thread = threading.Thread(target=compute)
+        thread.start()
+        thread.join()
+        assert results == [10]
+        with pytest.raises(RenderCancelled):
+            ddf.x.sum().compute(scheduler='sync')
+
+
+def test_pipeline_render_async():
+    asyncio = pytest.importorskip('asyncio')
+    pipeline = ds.Pipeline(df, ds.Point('x', 'y'))
+    loop = asyncio.new_event_loop()
+    try:
+        asyncio.set_event_loop(loop)
+        futures = [pipeline.render_async((0, 1), (0, 1), 2, 2),
+                   pipeline.render_async((0, 2), (0, 1), 2, 2),
+                   pipeline.render_async((0, 1), (0, 3), 2, 2)]
+        images = loop.run_until_complete(asyncio.gather(*futures))
+    finally:
+        asyncio.set_event_loop(None)
+        loop.close()
+    # Superseded requests get the image of the latest viewport
+    expected = pipeline((0, 1), (0, 3), 2, 2)
+    for img in images:
+        assert img.equals(expected)
+
+
+def test_pipeline_progressive(monkeypatch):
+    monkeypatch.setattr(ds.pipeline, 'chunk_rows', 3)
+    monkeypatch.setattr(ds.pipeline, 'sample_rows', 4)
+    pipeline = ds.Pipeline(df, ds.Point('x', 'y'), ds.sum('f64'))
+    images = list(pipeline.progressive(None, None, 2, 2))
+    # The sample, then after 1, 2, 4 and all 7 chunks
+    assert len(images) == 5
+    assert images[-1].equals(pipeline(None, None, 2, 2))
+    assert all(img.shape == (2, 2) for img in images)
+
+    images = list(pipeline.progressive(None, None, 2, 2, final=True))
+    assert len(images) == 1
+    assert images[0].equals(pipeline(None, None, 2, 2))
+
+
+@pytest.mark.parametrize('glyph', [ds.Point('x', 'y'),
+                                   LineAxis0('x', 'y')])
+def test_pipeline_progressive_dask(monkeypatch, glyph):
+    import dask.dataframe as dd
+    monkeypatch.setattr(ds.pipeline, 'prefetch_partitions', 2)
+    ddf = dd.from_pandas(df, npartitions=5)
+    pipeline = ds.Pipeline(ddf, glyph)
+    images = list(pipeline.progressive((0, 1), (0, 1), 2, 2))
+    # After 1, 2, 4 and all 5 partitions
+    assert len(images) == 4
+    assert images[-1].equals(pipeline((0, 1), (0, 1), 2, 2))
+
+
+def test_iter_bypixel_snapshots():
+    chunks = [df.iloc[i:i + 4] for i in range(0, 20, 4)]
+    requested = []
+
+    def snapshot(i):
+        requested.append(i)
+        return i == 2
+
+    aggs = list(ds.core.iter_bypixel(iter(chunks), cvs, ds.Point('x', 'y'),
+                                     ds.count(), progressive=snapshot))
+    assert requested == [1, 2, 3, 4, 5]
+    assert len(aggs) == 2
+    assert aggs[0].sum() == 8
+    assert aggs[1].equals(cvs.points(df, 'x', 'y', ds.count()))
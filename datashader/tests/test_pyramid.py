@@ -0,0 +1,131 @@
+from __future__ import absolute_import
+import numpy as np
+import pandas as pd
+import dask.dataframe as dd
+import xarray as xr
+import pytest
+
+import datashader as ds
+from datashader.pyramid import AggregatePyramid, build_pyramid
+
+np.random.seed(5)
+n = 5000
+df = pd.DataFrame({'x': np.random.uniform(0, 8, n),
+                   'y': np.random.uniform(-4, 4, n),
+                   'v': np.random.normal(size=n)})
+df.loc[::7, 'v'] = np.nan
+
+agg = ds.summary(n=ds.count(), nv=ds.count('v'), s=ds.sum('v'),
+                 m=ds.mean('v'))
+
+
+@pytest.fixture(scope='module')
+def pyramid(tmpdir_factory):
+    path = str(tmpdir_factory.mktemp('pyramid'))
+    return build_pyramid(path, df, 'x', 'y', agg, levels=6,
+                         x_range=(0, 8), y_range=(-4, 4))
+
+
+def test_levels(pyramid):
+    for level in range(7):
+        counts = pyramid.level(level, 'count')
+        assert counts.shape == (2 ** level, 2 ** level)
+        assert counts.sum() == n
+    reopened = AggregatePyramid(pyramid.path)
+    assert reopened.levels == 6
+    assert reopened.x_range == (0, 8)
+
+
+@pytest.mark.parametrize('width,height,x_range,y_range', [
+    (64, 64, (0, 8), (-4, 4)),
+    (16, 8, (0, 8), (-4, 4)),
+    (16, 16, (2, 4), (-1, 1)),
+    (5, 10, (1, 6), (-4, 1)),
+])
+def test_points_exact(pyramid, width, height, x_range, y_range):
+    # Views aligned with the pixels of a level match aggregating the rows
+    cvs = ds.Canvas(plot_width=width, plot_height=height, x_range=x_range,
+                    y_range=y_range)
+    xr.testing.assert_allclose(cvs.points(pyramid, 'x', 'y', agg),
+                               cvs.points(df, 'x', 'y', agg))
+
+
+def test_points_unaligned(pyramid):
+    cvs = ds.Canvas(plot_width=7, plot_height=9, x_range=(0.3, 7.1),
+                    y_range=(-2.2, 3.3))
+    result = cvs.points(pyramid, 'x', 'y', ds.count())
+    expected = cvs.points(df, 'x', 'y', ds.count())
+    assert result.dims == expected.dims
+    xr.testing.assert_equal(result.x, expected.x)
+    # Only the rows within half a pixel of the finest level of the view's
+    # edges may be counted differently
+    assert abs(int(result.sum()) - int(expected.sum())) < 0.05 * n
+
+    # Full extent by default
+    result = ds.Canvas(plot_width=4, plot_height=4).points(pyramid, 'x', 'y')
+    assert result.sum() == n
+
+
+def test_points_outside(pyramid):
+    cvs = ds.Canvas(plot_width=4, plot_height=4, x_range=(10, 12),
+                    y_range=(10, 12))
+    result = cvs.points(pyramid, 'x', 'y', ds.mean('v'))
+    assert np.isnan(result.values).all()
+
+
+def test_build_dask(tmpdir, pyramid):
+    other = build_pyramid(str(tmpdir), dd.from_pandas(df, npartitions=3),
+                          'x', 'y', agg, levels=6, x_range=(0, 8),
+                          y_range=(-4, 4))
+    for name in pyramid.names:
+        np.testing.assert_allclose(other.level(6, name),
+                                   pyramid.level(6, name))
+
+
+@pytest.mark.parametrize('dask', [False, True])
+def test_tiles(tmpdir, monkeypatch, dask):
+    import datashader.pyramid as pyr
+    # Only the lower left quadrant holds points
+    quadrant = df[(df.x < 4) & (df.y < 0)]
+    untiled = build_pyramid(str(tmpdir.join('untiled')), quadrant, 'x', 'y',
+                            agg, levels=6, x_range=(0, 8), y_range=(-4, 4))
+
+    monkeypatch.setattr(pyr, 'tile_size', 8)
+    monkeypatch.setattr(pyr, 'chunk_rows', 1000)
+    monkeypatch.setattr(pyr, 'chunk_partitions', 2)
+    source = dd.from_pandas(quadrant, npartitions=5) if dask else quadrant
+    path = tmpdir.join('tiled')
+    tiled = build_pyramid(str(path), source, 'x', 'y', agg, levels=6,
+                          x_range=(0, 8), y_range=(-4, 4))
+    assert tiled.tile_size == 8
+    # Only the tiles of the quadrant are stored
+    assert len(path.join('level_6').listdir()) == 16 * len(tiled.names)
+    for level in range(7):
+        for name in tiled.names:
+            np.testing.assert_allclose(tiled.level(level, name),
+                                       untiled.level(level, name))
+
+    cvs = ds.Canvas(plot_width=16, plot_height=16, x_range=(2, 6),
+                    y_range=(-2, 2))
+    xr.testing.assert_allclose(cvs.points(tiled, 'x', 'y', agg),
+                               cvs.points(quadrant, 'x', 'y', agg))
+
+    # Building again replaces the pyramid
+    tiled = build_pyramid(str(path), df, 'x', 'y', agg, levels=3,
+                          x_range=(0, 8), y_range=(-4, 4))
+    assert not path.join('level_6').exists()
+    assert tiled.level(3, 'count').sum() == n
+
+
+def test_errors(pyramid, tmpdir):
+    cvs = ds.Canvas(plot_width=4, plot_height=4)
+    with pytest.raises(ValueError, match='holds no'):
+        cvs.points(pyramid, 'x', 'y', ds.sum('x'))
+    with pytest.raises(ValueError, match='only support'):
+        cvs.points(pyramid, 'x', 'y', ds.max('v'))
+    with pytest.raises(ValueError, match='aggregates columns'):
+        cvs.points(pyramid, 'v', 'y')
+    with pytest.raises(ValueError, match='linear'):
+        ds.Canvas(x_axis_type='log').points(pyramid, 'x', 'y')
+    with pytest.raises(ValueError, match='only support'):
+        build_pyramid(str(tmpdir), df, 'x', 'y', ds.var('v'))
@@ -0,0 +1,125 @@
+from __future__ import absolute_import
+
+import numpy as np
+import pandas as pd
+import dask.dataframe as dd
+import pytest
+import xarray as xr
+
+import datashader as ds
+from datashader.sampling import sample_rows
+
+np.random.seed(8)
+n = 100000
+df = pd.DataFrame({'x': np.random.uniform(0, 1, n),
+                   'y': np.random.uniform(0, 1, n),
+                   'v': np.random.uniform(1, 2, n),
+                   'cat': pd.Categorical.from_codes(
+                       np.random.randint(0, 2, n), ['a', 'b'])})
+cvs = ds.Canvas(plot_width=4, plot_height=4, x_range=(0, 1), y_range=(0, 1))
+
+
+def test_sample_rows():
+    sample, fraction = sample_rows(df, 0.1)
+    assert len(sample) == n // 10
+    assert fraction == 0.1
+    # One row per stratum of 10 rows
+    np.testing.assert_array_equal(sample.index.values // 10,
+                                  np.arange(n // 10))
+    sample, fraction = sample_rows(df, 1)
+    assert sample is df and fraction == 1
+
+    ddf = dd.from_pandas(df, npartitions=3)
+    sample, fraction = sample_rows(ddf, 0.25)
+    assert fraction == 0.25
+    assert abs(len(sample) - n // 4) <= 3
+
+
+def test_sample_rows_short_strata():
+    # Partitions of 15 rows have a last stratum of 5 rows out of 10, whose
+    # row is only kept half of the time
+    ddf = dd.from_pandas(pd.DataFrame({'x': np.arange(15 * 400)}),
+                         chunksize=15)
+    sample, fraction = sample_rows(ddf, 0.1)
+    assert fraction == 0.1
+    sample = sample.compute()
+    assert 400 <= len(sample) <= 800
+    np.testing.assert_allclose(len(sample) / (15 * 400.), 0.1, rtol=0.15)
+
+    with pytest.raises(ValueError, match='fraction'):
+        sample_rows(df, 0)
+
+
+def test_sample_rows_random_state():
+    state = np.random.get_state()
+    sample, _ = sample_rows(df, 0.1, random_state=1)
+    assert sample.equals(sample_rows(df, 0.1, random_state=1)[0])
+    assert not sample.equals(sample_rows(df, 0.1, random_state=2)[0])
+    assert sample.equals(sample_rows(df, 0.1, np.random.RandomState(1))[0])
+
+    ddf = dd.from_pandas(df, npartitions=3)
+    sample = sample_rows(ddf, 0.1, random_state=1)[0].compute()
+    assert sample.equals(sample_rows(ddf, 0.1, random_state=1)[0].compute())
+    # Partitions draw different rows from their strata
+    index = sample.index.values
+    offsets = [(index[(index >= start) & (index < end)] - start)[:100] % 10
+               for start, end in zip(ddf.divisions[:2], ddf.divisions[1:3])]
+    assert not np.array_equal(offsets[0], offsets[1])
+
+    # The global state is left alone
+    assert np.array_equal(np.random.get_state()[1], state[1])
+
+    agg = cvs.points(df, 'x', 'y', ds.count(), sample=0.1, random_state=3)
+    assert agg.equals(cvs.points(df, 'x', 'y', ds.count(), sample=0.1,
+                                 random_state=3))
+
+
+@pytest.mark.parametrize('npartitions', [None, 4])
+def test_points_sample(npartitions):
+    source = df if npartitions is None else dd.from_pandas(df, npartitions)
+    agg = ds.summary(n=ds.count(), s=ds.sum('v'), m=ds.mean('v'),
+                     c=ds.count_cat('cat'))
+    exact = cvs.points(df, 'x', 'y', agg)
+    approx = cvs.points(source, 'x', 'y', agg, sample=0.1)
+    assert set(approx.data_vars) == {'n', 's', 'm', 'c'}
+    assert approx.attrs['sample_fraction'] == 0.1
+    error = approx['relative_error']
+    assert error.dims == ('y', 'x')
+    xr.testing.assert_equal(error.x, exact.x)
+    assert 'relative_error' not in approx.attrs
+    # About 625 rows sampled per pixel
+    np.testing.assert_allclose(error, np.sqrt(0.9 / 625), rtol=0.2)
+    for name in ['n', 's', 'c']:
+        np.testing.assert_allclose(approx[name].values, exact[name].values,
+                                   rtol=0.2)
+    np.testing.assert_allclose(approx['m'].values, exact['m'].values,
+                               rtol=0.05)
+
+
+def test_points_sample_single_reduction():
+    approx = cvs.points(df, 'x', 'y', ds.count(), sample=0.5)
+    assert approx.name is None
+    assert approx.dims == ('y', 'x')
+    np.testing.assert_allclose(approx.values, cvs.points(df, 'x', 'y').values,
+                               rtol=0.1)
+    assert approx.relative_error.shape == (4, 4)
+    # The error follows selections of the aggregate
+    assert approx[:2, 1:].relative_error.shape == (2, 3)
+
+    # Pixels without sampled rows have an unknown error
+    sparse = pd.DataFrame({'x': [0.1], 'y': [0.1]})
+    approx = cvs.points(sparse, 'x', 'y', sample=0.5)
+    assert np.isnan(approx.relative_error.values[3, 3])
+
+
+def test_points_sample_errors():
+    with pytest.raises(ValueError, match='base'):
+        cvs.points(df, 'x', 'y', base=cvs.points(df, 'x', 'y'), sample=0.1)
+    with pytest.raises(ValueError, match='sample'):
+        cvs.points(df, 'x', 'y', sparse=True, sample=0.1)
+    with pytest.raises(ValueError, match='reserved'):
+        cvs.points(df, 'x', 'y', ds.summary(_sample_count=ds.count()),
+                   sample=0.1)
+    with pytest.raises(ValueError, match='reserved'):
+        cvs.points(df, 'x', 'y', ds.summary(relative_error=ds.count()),
+                   sample=0.1)
@@ -0,0 +1,87 @@
+from __future__ import absolute_import
+import numpy as np
+import pandas as pd
+import dask.dataframe as dd
+import xarray as xr
+import pytest
+
+import datashader as ds
+import datashader.transfer_functions as tf
+
+sparse = pytest.importorskip('sparse')
+
+np.random.seed(3)
+n = 2000
+df = pd.DataFrame({'x': np.random.uniform(-1, 1, n),
+                   'y': np.random.uniform(-1, 1, n),
+                   'f64': np.random.normal(size=n),
+                   'cat': pd.Categorical(np.random.choice(['a', 'b', 'c'], n))})
+df.loc[::5, 'f64'] = np.nan
+ddf = dd.from_pandas(df, npartitions=3)
+
+cvs = ds.Canvas(plot_width=60, plot_height=40, x_range=(-1, 0.5))
+
+aggs = [ds.count(), ds.count('f64'), ds.any(), ds.sum('f64'), ds.mean('f64'),
+        ds.count_cat('cat'), ds.by('cat', ds.sum('f64'))]
+
+
+def densify(agg):
+    if isinstance(agg, xr.Dataset):
+        return agg.map(densify)
+    return agg.copy(data=agg.data.todense())
+
+
+def visible(img):
+    data = np.asarray(img.data.todense() if hasattr(img.data, 'todense')
+                      else img.data)
+    return np.where(data >> 24, data, 0)
+
+
+@pytest.mark.parametrize('source', [df, ddf])
+@pytest.mark.parametrize('agg', aggs)
+def test_points_sparse(source, agg):
+    result = cvs.points(source, 'x', 'y', agg, sparse=True)
+    assert isinstance(result.data, sparse.COO)
+    assert result.data.nnz < result.size
+    xr.testing.assert_allclose(densify(result), cvs.points(df, 'x', 'y', agg))
+
+
+def test_points_sparse_chunks(monkeypatch):
+    monkeypatch.setattr(ds.sparse_agg, 'chunk_rows', 300)
+    agg = ds.summary(n=ds.count(), mean=ds.mean('f64'))
+    result = cvs.points(df, 'x', 'y', agg, sparse=True)
+    assert isinstance(result, xr.Dataset)
+    xr.testing.assert_allclose(densify(result), cvs.points(df, 'x', 'y', agg))
+
+
+@pytest.mark.parametrize('agg', aggs)
+@pytest.mark.parametrize('how', ['eq_hist', 'log', 'linear'])
+def test_shade_sparse(agg, how):
+    img = tf.shade(cvs.points(df, 'x', 'y', agg, sparse=True), how=how)
+    assert isinstance(img.data, sparse.COO)
+    expected = tf.shade(cvs.points(df, 'x', 'y', agg), how=how)
+    np.testing.assert_equal(visible(img), visible(expected))
+    assert img.to_pil().size == (60, 40)
+
+
+def test_shade_sparse_empty():
+    empty = ds.Canvas(plot_width=6, plot_height=4, x_range=(5, 6),
+                      y_range=(5, 6))
+    img = tf.shade(empty.points(df, 'x', 'y', sparse=True))
+    assert img.data.nnz == 0
+    assert (img.data.todense() == 0).all()
+
+
+def test_points_sparse_errors():
+    with pytest.raises(ValueError, match='only supports'):
+        cvs.points(df, 'x', 'y', ds.max('f64'), sparse=True)
+    with pytest.raises(ValueError, match='only supports'):
+        cvs.points(df, 'x', 'y', ds.summary(a=ds.count(), b=ds.var('f64')),
+                   sparse=True)
+    with pytest.raises(ValueError, match='base'):
+        base = cvs.points(df, 'x', 'y')
+        cvs.points(df, 'x', 'y', base=base, sparse=True)
+    from datashader.sparse_agg import sparse_bypixel
+    from datashader.glyphs import LineAxis0
+    with pytest.raises(ValueError, match='points'):
+        sparse_bypixel(df, cvs, LineAxis0('x', 'y'), ds.count())
@@ -1,4 +1,5 @@
 from __future__ import absolute_import
+import json
 import datashader as ds
 import datashader.transfer_functions as tf
 
@@ -11,6 +12,7 @@ from datashader.tiles import calculate_zoom_level_stats
 from datashader.tiles import MercatorTileDefinition
 
 import numpy as np
+import pytest
 import pandas as pd
 
 TOLERANCE = 0.01
@@ -130,3 +132,206 @@ def test_meters_to_tile():
     tile_def = MercatorTileDefinition((xmin, xmax), (ymin, ymax), tile_size=256)
     tile = tile_def.meters_to_tile(xmin, ymin, zoom)
     assert tile == (1205, 1540) # using Google tile coordinates, not TMS
+
+
+def small_load_data_func(x_range, y_range):
+    np.random.seed(3)
+    xs = np.random.normal(loc=0, scale=5000000, size=2000)
+    ys = np.random.normal(loc=0, scale=5000000, size=2000)
+    df = pd.DataFrame(dict(x=xs, y=ys))
+    return df.loc[df['x'].between(*x_range) & df['y'].between(*y_range)]
+
+
+@pytest.mark.parametrize('combine', ['sum', 'max'])
+def test_combine_super_tile(combine):
+    from datashader.tiles import _combine_super_tile
+    full_extent = (-MERCATOR_CONST, -MERCATOR_CONST,
+                   MERCATOR_CONST, MERCATOR_CONST)
+    for level in [0, 1]:
+        children = {}
+        for super_tile in gen_super_tiles(full_extent, level + 1):
+            children[super_tile['tile']] = _get_super_tile_min_max(
+                super_tile, small_load_data_func, mock_rasterize_func)
+        for super_tile in gen_super_tiles(full_extent, level):
+            expected = _get_super_tile_min_max(
+                super_tile, small_load_data_func, mock_rasterize_func)
+            agg = _combine_super_tile(super_tile, children.get, combine)
+            assert agg.dims == expected.dims
+            np.testing.assert_allclose(agg.x.values, expected.x.values)
+            np.testing.assert_allclose(agg.y.values, expected.y.values)
+            if combine == 'sum':
+                np.testing.assert_array_equal(agg.values, expected.values)
+            else:
+                assert (agg.values <= expected.values).all()
+                assert agg.values.max() > 0
+
+
+def test_combine_super_tile_children():
+    from datashader.tiles import _combine_super_tile
+    full_extent = (-MERCATOR_CONST, -MERCATOR_CONST,
+                   MERCATOR_CONST, MERCATOR_CONST)
+    # From level 5, super-tiles are split into 2x2 super-tiles of the same
+    # size, whose y indices go southward
+    children = dict((super_tile['tile'], super_tile)
+                    for super_tile in gen_super_tiles(full_extent, 5))
+    assert len(children) == 4
+    loaded = []
+
+    def child_agg(tile):
+        loaded.append(tile)
+        return _get_super_tile_min_max(children[tile], small_load_data_func,
+                                       mock_rasterize_func)
+
+    super_tile, = gen_super_tiles(full_extent, 4)
+    agg = _combine_super_tile(super_tile, child_agg, 'sum')
+    assert sorted(loaded) == sorted(children)
+    expected = _get_super_tile_min_max(super_tile, small_load_data_func,
+                                       mock_rasterize_func)
+    assert agg.shape == expected.shape == (4096, 4096)
+    np.testing.assert_allclose(agg.x.values, expected.x.values)
+    np.testing.assert_allclose(agg.y.values, expected.y.values)
+    np.testing.assert_array_equal(agg.values, expected.values)
+    # The points are spread over the four quadrants
+    half = 2048
+    for rows in (slice(None, half), slice(half, None)):
+        for cols in (slice(None, half), slice(half, None)):
+            assert agg.values[rows, cols].sum() > 0
+
+
+def test_render_tiles_combine(tmpdir):
+    full_extent = (-MERCATOR_CONST, -MERCATOR_CONST,
+                   MERCATOR_CONST, MERCATOR_CONST)
+    calls = []
+
+    def load_data_func(x_range, y_range):
+        calls.append((x_range, y_range))
+        return small_load_data_func(x_range, y_range)
+
+    results = render_tiles(full_extent, [0, 1, 2], load_data_func,
+                           mock_rasterize_func, mock_shader_func,
+                           mock_post_render_func, str(tmpdir),
+                           combine='sum')
+    # Only the deepest level is rasterized
+    assert len(calls) == 1
+    assert sorted(results) == [0, 1, 2]
+    for level in [0, 1, 2]:
+        assert results[level]['supertile_count'] == 1
+        assert tmpdir.join(str(level)).check(dir=True)
+    # Coarser pixels sum the counts of finer ones
+    assert results[0]['stats'][1] >= results[2]['stats'][1]
+
+    with pytest.raises(ValueError, match='combine'):
+        render_tiles(full_extent, [0], load_data_func, mock_rasterize_func,
+                     mock_shader_func, mock_post_render_func, str(tmpdir),
+                     combine='mean')
+
+
+@pytest.mark.parametrize('pool', [None, 'threads'])
+def test_render_tiles_manifest(tmpdir, pool):
+    from concurrent.futures import ThreadPoolExecutor
+    full_extent = (-MERCATOR_CONST, -MERCATOR_CONST,
+                   MERCATOR_CONST, MERCATOR_CONST)
+    manifest = str(tmpdir.join('manifest.jsonl'))
+    output_path = str(tmpdir.join('tiles'))
+    executor = ThreadPoolExecutor(2) if pool else None
+    calls = []
+
+    def load_data_func(x_range, y_range):
+        calls.append((x_range, y_range))
+        return small_load_data_func(x_range, y_range)
+
+    results = render_tiles(full_extent, [0, 1], load_data_func,
+                           mock_rasterize_func, mock_shader_func,
+                           mock_post_render_func, output_path,
+                           executor=executor, manifest=manifest)
+    expected = render_tiles(full_extent, [0, 1], small_load_data_func,
+                            mock_rasterize_func, mock_shader_func,
+                            mock_post_render_func, str(tmpdir.join('ref')))
+    for level in [0, 1]:
+        assert results[level]['stats'] == tuple(expected[level]['stats'])
+        assert results[level]['supertile_count'] == 1
+    # Each super-tile is rasterized once, its aggregate is saved for
+    # rendering once the span of the level is known
+    assert len(calls) == 2
+    assert len(tmpdir.join('tiles', '1').listdir()) == 2
+    assert not tmpdir.join('manifest.jsonl.aggregates').check()
+
+    # Everything is recorded, rendering again reads nothing
+    del calls[:]
+    results = render_tiles(full_extent, [0, 1], load_data_func,
+                           mock_rasterize_func, mock_shader_func,
+                           mock_post_render_func, output_path,
+                           executor=executor, manifest=manifest)
+    assert calls == []
+    assert results[1]['stats'] == tuple(expected[1]['stats'])
+
+    # An interrupted build only renders the super-tiles not recorded
+    with open(manifest) as f:
+        lines = f.readlines()
+    with open(manifest, 'w') as f:
+        f.writelines(lines[:-1])
+    render_tiles(full_extent, [0, 1], load_data_func, mock_rasterize_func,
+                 mock_shader_func, mock_post_render_func, output_path,
+                 executor=executor, manifest=manifest)
+    assert len(calls) == 1
+
+    # The manifest records what it was written for
+    with pytest.raises(ValueError, match='manifest'):
+        render_tiles(full_extent, [0, 1, 2], load_data_func,
+                     mock_rasterize_func, mock_shader_func,
+                     mock_post_render_func, output_path,
+                     executor=executor, manifest=manifest)
+    with pytest.raises(ValueError, match='manifest'):
+        render_tiles(full_extent, [0, 1], load_data_func,
+                     mock_rasterize_func, mock_shader_func,
+                     mock_post_render_func, output_path,
+                     executor=executor, manifest=manifest, combine='sum')
+    if executor is not None:
+        executor.shutdown()
+
+
+def test_render_tiles_combine_manifest(tmpdir):
+    full_extent = (-MERCATOR_CONST, -MERCATOR_CONST,
+                   MERCATOR_CONST, MERCATOR_CONST)
+    manifest = str(tmpdir.join('manifest.jsonl'))
+    aggregates = tmpdir.join('manifest.jsonl.aggregates')
+    calls = []
+
+    def load_data_func(x_range, y_range):
+        calls.append((x_range, y_range))
+        return small_load_data_func(x_range, y_range)
+
+    def post_render_func(img, **kwargs):
+        if kwargs['z'] == 0:
+            raise RuntimeError('interrupted')
+        return img
+
+    # Interrupted while writing level 0
+    with pytest.raises(RuntimeError, match='interrupted'):
+        render_tiles(full_extent, [0, 1, 2], load_data_func,
+                     mock_rasterize_func, mock_shader_func, post_render_func,
+                     str(tmpdir.join('tiles')), combine='sum',
+                     manifest=manifest)
+    assert len(calls) == 1
+    with open(manifest) as f:
+        records = [json.loads(line) for line in f]
+    assert records[0] == dict(full_extent=list(full_extent),
+                              levels=[0, 1, 2], combine='sum')
+    # The statistics of each super-tile are recorded as it's built
+    assert [r['level'] for r in records if 'stats' in r] == [2, 1, 0]
+    assert aggregates.check(dir=True)
+
+    results = render_tiles(full_extent, [0, 1, 2], load_data_func,
+                           mock_rasterize_func, mock_shader_func,
+                           mock_post_render_func, str(tmpdir.join('tiles')),
+                           combine='sum', manifest=manifest)
+    expected = render_tiles(full_extent, [0, 1, 2], small_load_data_func,
+                            mock_rasterize_func, mock_shader_func,
+                            mock_post_render_func, str(tmpdir.join('ref')),
+                            combine='sum')
+    # Level 0 is written from its saved aggregate
+    assert len(calls) == 1
+    for level in [0, 1, 2]:
+        assert results[level]['stats'] == expected[level]['stats']
+    assert tmpdir.join('tiles', '0').check(dir=True)
+    assert not aggregates.check()
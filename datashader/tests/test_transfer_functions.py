@@ -260,6 +260,23 @@ def test_shade_mpl_cmap(agg):
     assert_eq_xr(img, sol)
 
 
+def test_shade_category_other():
+    coords = [np.array([0, 1]), np.array([2, 5])]
+    cat_agg = xr.DataArray(np.array([[(0, 12, 0), (3, 0, 3)],
+                                     [(0, 0, 12), (24, 0, 0)]], dtype='u4'),
+                           coords=(coords + [['a', 'b', 'other']]),
+                           dims=(dims + ['cats']),
+                           attrs=dict(other_category='other'))
+    colors = {'a': '#FF0000', 'b': '#0000FF'}
+    img = tf.shade(cat_agg, color_key=colors, how='linear')
+    assert img.data[1, 0] & 0xFFFFFF == 0x808080
+    assert img.data[0, 0] & 0xFFFFFF == 0xFF0000
+
+    cat_agg.attrs = {}
+    with pytest.raises(ValueError, match='Insufficient colors'):
+        tf.shade(cat_agg, color_key=colors)
+
+
 @pytest.mark.parametrize('array', arrays)
 def test_shade_category(array):
     coords = [np.array([0, 1]), np.array([2, 5])]
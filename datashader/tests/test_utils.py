@@ -19,6 +19,26 @@ def test_Dispatcher():
     assert foo(b, 2) == 10
 
 
+def test_Dispatcher_register_lazy():
+    foo = Dispatcher()
+    calls = []
+
+    @foo.register_lazy('fractions')
+    def register_fractions():
+        from fractions import Fraction
+        calls.append(Fraction)
+        foo.register(Fraction, lambda a: 'fraction')
+
+    foo.register(object, lambda a: 'object')
+    assert foo(1) == 'object'
+    assert calls == []
+
+    from fractions import Fraction
+    assert foo(Fraction(1, 2)) == 'fraction'
+    assert foo(Fraction(1, 3)) == 'fraction'
+    assert calls == [Fraction]
+
+
 def test_isreal():
     assert isreal('int32')
     assert isreal(dshape('int32'))
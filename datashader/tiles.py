@@ -1,18 +1,28 @@
 from __future__ import absolute_import, division, print_function
 from io import BytesIO
 
+import json
 import math
 import os
+import shutil
+import tempfile
 
 import dask
 import dask.bag as db
 
 import numpy as np
+import xarray as xr
 
 from PIL.Image import fromarray
 
+from .utils import is_sparse
+
 __all__ = ['render_tiles', 'MercatorTileDefinition']
 
+# Super-tiles submitted to the executor of render_tiles at a time, bounding
+# the number of aggregates held in memory
+max_pending_super_tiles = 16
+
 
 # helpers ---------------------------------------------------------------------
 def _create_dir(path):
@@ -52,7 +62,50 @@ def calculate_zoom_level_stats(super_tiles, load_data_func,
 
 def render_tiles(full_extent, levels, load_data_func,
                  rasterize_func, shader_func,
-                 post_render_func, output_path, color_ranging_strategy='fullscan'):
+                 post_render_func, output_path, color_ranging_strategy='fullscan',
+                 combine=None, executor=None, manifest=None):
+    """Render the tiles of ``levels`` zoom levels covering ``full_extent``.
+
+    By default every super-tile of every level is rasterized from the data
+    returned by ``load_data_func``. If ``combine`` is given, only the
+    super-tiles of the deepest level are, and those of each coarser level
+    are derived from the aggregates of the level below by combining blocks
+    of 2x2 pixels with ``combine``: ``'sum'`` for counts and sums, or
+    ``'min'`` or ``'max'``. Reductions such as ``mean`` can't be combined
+    this way.
+
+    If ``combine``, ``executor``, a ``concurrent.futures`` process or
+    thread pool, or ``manifest`` is given, super-tiles are streamed through
+    the executor (or computed in turn without one) instead of being all
+    held in memory, and ``rasterize_func`` must return a 2D ``DataArray``.
+    The aggregate of each super-tile is saved to a ``.npy`` file as it is
+    built, recording its minimum and maximum, and the super-tiles of a
+    level are shaded and written from these files once the color range of
+    the level is known. The files of a level are deleted once it is
+    written, or once the coarser level is derived from them when
+    combining, so at most ``max_pending_super_tiles`` aggregates are held
+    in memory at a time. The functions must be picklable to be sent to a
+    process pool.
+
+    ``manifest`` is the path of a file recording the levels rendered and
+    the statistics of each super-tile and the super-tiles written as they
+    complete, the aggregates being saved in the ``manifest + '.aggregates'``
+    directory, so that rendering again resumes where an interrupted build
+    stopped. Rendering other levels or extents, or combining differently,
+    with an existing manifest is an error. Without a manifest the
+    aggregates are saved in a temporary directory.
+    """
+    if combine is not None:
+        if combine not in _combine_funcs:
+            raise ValueError("Invalid combine option {0!r}, must be one of "
+                             "'sum', 'min' or 'max'".format(combine))
+    if combine is not None or executor is not None or manifest is not None:
+        if color_ranging_strategy != 'fullscan':
+            raise ValueError('Invalid color_ranging_strategy option')
+        return _render_tiles_stored(full_extent, levels, load_data_func,
+                                    rasterize_func, shader_func,
+                                    post_render_func, output_path, combine,
+                                    executor, manifest)
     results = dict()
     for level in levels:
         print('calculating statistics for level {}'.format(level))
@@ -67,6 +120,296 @@ def render_tiles(full_extent, levels, load_data_func,
     return results
 
 
+def _render_tiles_stored(full_extent, levels, load_data_func,
+                         rasterize_func, shader_func, post_render_func,
+                         output_path, combine, executor, manifest):
+    levels = sorted(set(levels))
+    header = dict(full_extent=list(full_extent), levels=levels,
+                  combine=combine)
+    stats, done = _read_manifest(manifest, header)
+    if manifest is None:
+        store = tempfile.mkdtemp(prefix='datashader_tiles_')
+    else:
+        store = manifest + '.aggregates'
+        _create_dir(store)
+    if combine is None:
+        build_levels = levels
+    else:
+        # Coarser levels are derived from finer ones, down to the coarsest
+        build_levels = range(levels[-1], levels[0] - 1, -1)
+
+    results = dict()
+    try:
+        for level in build_levels:
+            super_tiles = list(gen_super_tiles(full_extent, level))
+            todo = [super_tile for super_tile in super_tiles
+                    if (level,) + super_tile['tile'] not in stats]
+            if combine is None or level == levels[-1]:
+                print('rasterizing {} of {} supertiles for zoom level {}'.format(len(todo), len(super_tiles), level))
+                func, args = _rasterize_to_store, (store, load_data_func,
+                                                   rasterize_func)
+            else:
+                print('combining {} of {} supertiles for zoom level {} from level {}'.format(len(todo), len(super_tiles), level, level + 1))
+                func, args = _combine_to_store, (store, combine)
+            for super_tile, tile_stats in _map_unordered(executor, func,
+                                                         todo, *args):
+                stats[(level,) + super_tile['tile']] = tile_stats
+                _write_manifest(manifest, dict(level=level,
+                                               tile=list(super_tile['tile']),
+                                               stats=tile_stats))
+
+            if level in levels:
+                span = _zoom_level_span(
+                    [stats[(level,) + super_tile['tile']]
+                     for super_tile in super_tiles])
+                todo = [super_tile for super_tile in super_tiles
+                        if (level,) + super_tile['tile'] not in done]
+                print('rendering {} of {} supertiles for zoom level {} with span={}'.format(len(todo), len(super_tiles), level, span))
+                for super_tile, _ in _map_unordered(
+                        executor, _render_stored_super_tile, todo, span,
+                        store, output_path, load_data_func, rasterize_func,
+                        shader_func, post_render_func):
+                    _write_manifest(manifest, dict(
+                        level=level, tile=list(super_tile['tile']),
+                        rendered=True))
+                results[level] = dict(success=True, stats=span, supertile_count=len(super_tiles))
+
+            # Only the aggregates of the level below are needed to derive a
+            # level
+            if combine is None:
+                _remove_stored_level(store, level)
+            elif level < levels[-1]:
+                _remove_stored_level(store, level + 1)
+    except BaseException:
+        # The aggregates saved next to a manifest are kept to resume
+        if manifest is None:
+            shutil.rmtree(store, ignore_errors=True)
+        raise
+    shutil.rmtree(store, ignore_errors=True)
+
+    return results
+
+
+def _map_unordered(executor, func, items, *args):
+    """Yield ``(item, func(item, *args))`` for each of ``items`` as they're
+    computed by ``executor``, submitting at most
+    ``max_pending_super_tiles`` items at a time, or computed in turn if
+    ``executor`` is None."""
+    if executor is None:
+        for item in items:
+            yield item, func(item, *args)
+        return
+    from concurrent.futures import FIRST_COMPLETED, wait
+    items = iter(items)
+    pending = {}
+    while True:
+        for item in items:
+            pending[executor.submit(func, item, *args)] = item
+            if len(pending) >= max_pending_super_tiles:
+                break
+        if not pending:
+            return
+        finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in finished:
+            yield pending.pop(future), future.result()
+
+
+def _read_manifest(manifest, header):
+    """Return the ``(min, max)`` statistics by ``(level, x, y)`` super-tile
+    and the set of super-tiles written recorded in the manifest file
+    ``manifest``, checking that it was written for the same ``header``
+    parameters, or recording them if it's new."""
+    stats, done = {}, set()
+    if manifest is None:
+        return stats, done
+    # As read back from JSON
+    header = json.loads(json.dumps(header))
+    found = None
+    if os.path.exists(manifest):
+        with open(manifest) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # A line cut short by an interruption
+                    continue
+                if 'levels' in record:
+                    found = record
+                    continue
+                tile = (record['level'],) + tuple(record['tile'])
+                if record.get('rendered'):
+                    done.add(tile)
+                else:
+                    tile_stats = record['stats']
+                    stats[tile] = (None if tile_stats is None
+                                   else tuple(tile_stats))
+    if found is None:
+        _write_manifest(manifest, header)
+    elif found != header:
+        raise ValueError("manifest {0!r} records rendering {1}, not {2}; "
+                         "remove it to render anew".format(manifest, found,
+                                                           header))
+    return stats, done
+
+
+def _write_manifest(manifest, record):
+    if manifest is None:
+        return
+    with open(manifest, 'a') as f:
+        f.write(json.dumps(record) + '\n')
+
+
+def _zoom_level_span(stats):
+    """Return the ``(min, max)`` of the ``(min, max)`` statistics of the
+    super-tiles of a level, None for empty super-tiles"""
+    stats = [tile_stats for tile_stats in stats if tile_stats is not None]
+    if not stats:
+        return (np.nan, np.nan)
+    return (min(lo for lo, _ in stats), max(hi for _, hi in stats))
+
+
+def _aggregate_stats(data):
+    if not data.size or np.isnan(data).all():
+        return None
+    # Python scalars, to be recorded in a manifest
+    return (np.nanmin(data).item(), np.nanmax(data).item())
+
+
+def _stored_file(store, tile_info):
+    tx, ty = tile_info['tile']
+    return os.path.join(store, '{0}_{1}_{2}'.format(tile_info['level'],
+                                                    tx, ty))
+
+
+def _store_aggregate(store, tile_info, agg):
+    """Save the aggregate ``agg`` of the super-tile ``tile_info`` in the
+    directory ``store``, returning its ``(min, max)``, or None if it's
+    empty."""
+    data = agg.data
+    if is_sparse(data):
+        data = data.todense()
+    data = np.asarray(data)
+    filename = _stored_file(store, tile_info)
+    with open(filename + '.json', 'w') as f:
+        json.dump(dict(dims=list(agg.dims),
+                       coords=[agg[dim].values.tolist() for dim in agg.dims]),
+                  f)
+    np.save(filename + '.npy', data)
+    return _aggregate_stats(data)
+
+
+def _load_aggregate(store, tile_info):
+    """Return the aggregate of ``tile_info`` saved in ``store``, memory-mapped
+    from its file, or None if there is none."""
+    filename = _stored_file(store, tile_info)
+    if not os.path.exists(filename + '.npy'):
+        return None
+    with open(filename + '.json') as f:
+        meta = json.load(f)
+    data = np.load(filename + '.npy', mmap_mode='r')
+    return xr.DataArray(data, coords=list(zip(meta['dims'], meta['coords'])),
+                        dims=meta['dims'])
+
+
+def _remove_stored_level(store, level):
+    prefix = '{0}_'.format(level)
+    for name in os.listdir(store):
+        if name.startswith(prefix):
+            os.remove(os.path.join(store, name))
+
+
+def _rasterize_to_store(tile_info, store, load_data_func, rasterize_func):
+    return _store_aggregate(store, tile_info, _get_super_tile_min_max(
+        tile_info, load_data_func, rasterize_func))
+
+
+def _combine_to_store(tile_info, store, combine):
+    level = tile_info['level']
+    agg = _combine_super_tile(
+        tile_info,
+        lambda tile: _load_aggregate(store, dict(level=level + 1, tile=tile)),
+        combine)
+    if agg is None:
+        return None
+    return _store_aggregate(store, tile_info, agg)
+
+
+def _render_stored_super_tile(tile_info, span, store, output_path,
+                              load_data_func, rasterize_func, shader_func,
+                              post_render_func):
+    agg = _load_aggregate(store, tile_info)
+    if agg is None:
+        # Not saved, as an empty combined super-tile, or removed since its
+        # statistics were recorded
+        agg = _get_super_tile_min_max(tile_info, load_data_func,
+                                      rasterize_func)
+    tile_info = dict(tile_info, agg=agg)
+    return render_super_tile(tile_info, span, output_path, shader_func,
+                             post_render_func)
+
+
+def _combine_sum(blocks):
+    if blocks.dtype.kind != 'f':
+        return blocks.sum(axis=3).sum(axis=1)
+    # Pixels without data stay NaN
+    empty = np.isnan(blocks).all(axis=3).all(axis=1)
+    result = np.nansum(np.nansum(blocks, axis=3), axis=1)
+    result[empty] = np.nan
+    return result
+
+
+_combine_funcs = {
+    'sum': _combine_sum,
+    'min': lambda blocks: np.fmin.reduce(np.fmin.reduce(blocks, axis=3), axis=1),
+    'max': lambda blocks: np.fmax.reduce(np.fmax.reduce(blocks, axis=3), axis=1),
+}
+
+
+def _combine_super_tile(tile_info, child_agg, combine):
+    """Return the aggregate of the super-tile ``tile_info``, combining the
+    2x2 blocks of pixels of the aggregates of its children super-tiles of
+    the next level. ``child_agg(tile)`` returns the aggregate of the child
+    ``tile``, or None if it has none. Each child is reduced into the part
+    of the aggregate it covers in turn, so only one is needed at a time."""
+    size = tile_info['tile_size']
+    tx, ty = tile_info['tile']
+    level = tile_info['level']
+    # Super-tiles up to level 4 cover the whole world and have a single
+    # child twice their size, larger ones have 2x2 children of their size
+    child_size = min(2 ** 4 * 256, 2 ** (level + 1) * 256)
+    k = 2 * size // child_size
+    half = child_size // 2
+    data = template = None
+    # Tile y indices are flipped, convert them back to TMS to find children
+    ty = invert_y_tile(ty, level)
+    for dx in range(k):
+        for dy in range(k):
+            child = child_agg((tx * k + dx,
+                               invert_y_tile(ty * k + dy, level + 1)))
+            if child is None:
+                continue
+            if data is None:
+                template = child
+                fill = np.nan if child.dtype.kind == 'f' else 0
+                data = np.full((size, size), fill, dtype=child.dtype)
+            # Rows of aggregates go northward, as TMS y indices
+            row = dy * half
+            col = dx * half
+            blocks = np.asarray(child.data).reshape(half, 2, half, 2)
+            data[row:row + half, col:col + half] = \
+                _combine_funcs[combine](blocks)
+            del child, blocks
+    if data is None:
+        return None
+
+    (xmin, xmax), (ymin, ymax) = tile_info['x_range'], tile_info['y_range']
+    xs = xmin + (np.arange(size) + 0.5) * (xmax - xmin) / size
+    ys = ymin + (np.arange(size) + 0.5) * (ymax - ymin) / size
+    ydim, xdim = template.dims
+    return xr.DataArray(data, coords=[(ydim, ys), (xdim, xs)],
+                        dims=template.dims, attrs=template.attrs)
+
+
 def gen_super_tiles(extent, zoom_level, span=None):
     xmin, ymin, xmax, ymax = extent
     super_tile_size = min(2 ** 4 * 256,
@@ -78,6 +421,7 @@ def gen_super_tiles(extent, zoom_level, span=None):
         x_range = (st_extent[0], st_extent[2])
         y_range = (st_extent[1], st_extent[3])
         yield {'level': zoom_level,
+               'tile': (s[0], s[1]),
                'x_range': x_range,
                'y_range': y_range,
                'tile_size': super_tile_def.tile_size,
@@ -297,7 +641,11 @@ class TileRenderer(object):
             if 0 in arr.shape:
                 continue
 
-            img = fromarray(np.flip(arr.data, 0), 'RGBA')  # flip since y tiles go down (Google map tiles)
+            data = arr.data
+            if is_sparse(data):
+                # Only densify the tile, not the whole (super) tile image
+                data = data.todense()
+            img = fromarray(np.flip(data, 0), 'RGBA')  # flip since y tiles go down (Google map tiles)
 
             if self.post_render_func:
                 extras = dict(x=x, y=y, z=z)
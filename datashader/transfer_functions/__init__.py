@@ -16,7 +16,7 @@ from PIL.Image import fromarray
 
 from datashader.colors import rgb, Sets1to3
 from datashader.composite import composite_op_lookup, over
-from datashader.utils import nansum_missing, ngjit, orient_array
+from datashader.utils import is_sparse, nansum_missing, ngjit, orient_array
 
 try:
     import cupy
@@ -33,6 +33,8 @@ class Image(xr.DataArray):
 
     def to_pil(self, origin='lower'):
         data = self.data
+        if is_sparse(data):
+            data = data.todense()
         if cupy:
             data = cupy.asnumpy(data)
         arr = np.flipud(data) if origin == 'lower' else data
@@ -294,6 +296,11 @@ def _interpolate(agg, cmap, how, alpha, span, min_alpha, name):
     return Image(img, coords=agg.coords, dims=agg.dims, name=name)
 
 
+# Color of the category merging the less frequent categories of top_k
+# categorical aggregates, when the color key doesn't include it
+other_color = '#808080'
+
+
 def _colorize(agg, color_key, how, alpha, span, min_alpha, name, color_baseline):
     if cupy and isinstance(agg.data, cupy.ndarray):
         from ._cuda_utils import interp, masked_clip_2d 
@@ -318,6 +325,11 @@ def _colorize(agg, color_key, how, alpha, span, min_alpha, name, color_baseline)
                          "colors as there are categorical fields")
     if not isinstance(color_key, dict):
         color_key = dict(zip(cats, color_key))
+    other = agg.attrs.get('other_category')
+    if other is not None and other in cats and other not in color_key:
+        # Categories merged by top_k reductions are gray unless given a color
+        color_key = dict(color_key)
+        color_key[other] = other_color
     if len(color_key) < len(cats):
         raise ValueError("Insufficient colors provided ({}) for the categorical fields available ({})"
                          .format(len(color_key), len(cats)))
@@ -449,7 +461,9 @@ def shade(agg, cmap=["lightblue", "darkblue"], color_key=Sets1to3,
         The colors to use for a 3D (categorical) agg array.  Can be
         either a ``dict`` mapping from field name to colors, or an
         iterable of colors in the same order as the record fields,
-        and including at least that many distinct colors.
+        and including at least that many distinct colors. The category
+        merging less frequent categories in ``by`` aggregates with
+        ``top_k`` set is colored gray if the ``dict`` doesn't include it.
     how : str or callable, optional
         The interpolation method to use, for the ``cmap`` of a 2D
         DataArray or the alpha channel of a 3D DataArray. Valid
@@ -507,7 +521,10 @@ def shade(agg, cmap=["lightblue", "darkblue"], color_key=Sets1to3,
     if not ((0 <= min_alpha <= 255) and (0 <= alpha <= 255)):
         raise ValueError("min_alpha ({}) and alpha ({}) must be between 0 and 255".format(min_alpha,alpha))
 
-    if agg.ndim == 2:
+    if is_sparse(agg.data):
+        return _shade_sparse(agg, cmap, color_key, how, alpha, span,
+                             min_alpha, name, color_baseline)
+    elif agg.ndim == 2:
         return _interpolate(agg, cmap, how, alpha, span, min_alpha, name)
     elif agg.ndim == 3:
         return _colorize(agg, color_key, how, alpha, span, min_alpha, name, color_baseline)
@@ -515,6 +532,65 @@ def shade(agg, cmap=["lightblue", "darkblue"], color_key=Sets1to3,
         raise ValueError("agg must use 2D or 3D coordinates")
 
 
+def _shade_sparse(agg, cmap, color_key, how, alpha, span, min_alpha, name,
+                  color_baseline):
+    """Shade an aggregate backed by a ``sparse.COO`` array into an image
+    backed by a ``sparse.COO`` array, without densifying either.
+
+    Empty pixels are transparent, so only the colors of the pixels holding
+    data are computed. Their values, along with a single empty pixel, are
+    packed into one row and shaded like a dense aggregate. Apart from
+    statistics that don't depend on the number of empty pixels, shading is
+    elementwise, so this gives the same colors as shading the dense
+    aggregate.
+    """
+    import sparse
+
+    data = agg.data
+    fill = data.fill_value
+    empty = (np.isnan(fill) if data.dtype.kind == 'f' else
+             fill == 0 if data.dtype.kind in 'ub' else False)
+    if not empty or agg.ndim not in (2, 3):
+        # Filled pixels aren't transparent, shade densely
+        return shade(agg.copy(data=data.todense()), cmap, color_key, how,
+                     alpha, min_alpha, span, name, color_baseline)
+
+    coords = OrderedDict((d, agg.coords[d]) for d in agg.dims[:2])
+    if data.nnz == 0:
+        return Image(sparse.zeros(agg.shape[:2], dtype='uint32'),
+                     coords=coords, dims=agg.dims[:2], name=name)
+    elif agg.ndim == 2:
+        pixels, values = data.coords, data.data
+    else:
+        pixels, inverse = np.unique(data.coords[:2], axis=1,
+                                    return_inverse=True)
+        values = np.full((pixels.shape[1], agg.shape[2]), fill,
+                         dtype=data.dtype)
+        values[inverse.ravel(), data.coords[2]] = data.data
+    npixels = pixels.shape[1]
+    if npixels < agg.shape[0] * agg.shape[1]:
+        # Add an empty pixel, which statistics such as the baseline of
+        # categorical aggregates take into account
+        values = np.concatenate([values, np.full((1,) + values.shape[1:], fill,
+                                                 dtype=values.dtype)])
+
+    row = xr.DataArray(
+        values[np.newaxis], dims=agg.dims, attrs=agg.attrs,
+        coords=OrderedDict([(agg.dims[0], [0.]),
+                            (agg.dims[1], np.arange(values.shape[0], dtype='f8'))] +
+                           [(d, agg.coords[d]) for d in agg.dims[2:]]))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # The resolution of a single row is undefined, leaving it unflipped
+        if agg.ndim == 2:
+            img = _interpolate(row, cmap, how, alpha, span, min_alpha, name)
+        else:
+            img = _colorize(row, color_key, how, alpha, span, min_alpha, name,
+                            color_baseline)
+    colors = sparse.COO(pixels, img.data[0, :npixels], shape=agg.shape[:2],
+                        fill_value=0)
+    return Image(colors, coords=coords, dims=agg.dims[:2], name=name)
+
+
 def set_background(img, color=None, name=None):
     """Return a new image, with the background set to `color`.
 
@@ -587,7 +663,7 @@ def spread(img, px=1, shape='circle', how='over', mask=None, name=None):
 @tz.memoize
 def _build_spread_kernel(how):
     """Build a spreading kernel for a given composite operator"""
-    op = composite_op_lookup[how]
+    op = composite_op_lookup[how].ufunc
 
     @ngjit
     def kernel(arr, mask, out):
@@ -15,7 +15,8 @@ import dask.dataframe as dd
 import datashape
 
 try:
-    from datashader.datatypes import RaggedDtype
+    from datashader.datatypes import RaggedDtype, _register_dask
+    _register_dask()
 except ImportError:
     RaggedDtype = type(None)
 
@@ -39,7 +40,25 @@ class VisibleDeprecationWarning(UserWarning):
     """
 
 
-ngjit = nb.jit(nopython=True, nogil=True)
+_ngjit = nb.jit(nopython=True, nogil=True)
+
+
+def ngjit(func):
+    """Compile ``func`` with numba in nopython and nogil mode.
+
+    Functions nested in others, such as the kernels glyphs build in
+    ``_build_extend``, are compiled through the kernel cache when it is
+    enabled (see ``datashader.kernel_cache``), so that fresh processes load
+    their compiled code rather than JIT compiling them again.
+    """
+    if (hasattr(func, '_kernel_source') or
+            '<locals>' in getattr(func, '__qualname__', '')):
+        from .kernel_cache import jit_function
+        jitted = jit_function(func)
+        if jitted is not None:
+            return jitted
+    return _ngjit(func)
+
 ngjit_parallel = nb.jit(nopython=True, nogil=True, parallel=True)
 
 
@@ -81,6 +100,7 @@ class Dispatcher(object):
     """Simple single dispatch."""
     def __init__(self):
         self._lookup = {}
+        self._lazy = {}
 
     def register(self, typ, func=None):
         """Register dispatch of `func` on arguments of type `typ`"""
@@ -93,6 +113,18 @@ class Dispatcher(object):
             self._lookup[typ] = func
         return func
 
+    def register_lazy(self, toplevel, func=None):
+        """Register `func` to be called the first time dispatch is attempted
+        on a type defined in the top-level module `toplevel`.
+
+        `func` takes no arguments and is expected to register the
+        implementations for that library, which therefore don't need to be
+        imported until they are first used."""
+        if func is None:
+            return lambda f: self.register_lazy(toplevel, f)
+        self._lazy[toplevel] = func
+        return func
+
     def __call__(self, head, *rest, **kwargs):
         # We dispatch first on type(head), and fall back to iterating through
         # the mro. This is significantly faster in the common case where
@@ -101,9 +133,13 @@ class Dispatcher(object):
         typ = type(head)
         if typ in lk:
             return lk[typ](head, *rest, **kwargs)
-        for cls in getmro(typ)[1:]:
+        for cls in getmro(typ):
             if cls in lk:
                 return lk[cls](head, *rest, **kwargs)
+            toplevel = getattr(cls, '__module__', '').partition('.')[0]
+            if toplevel in self._lazy:
+                self._lazy.pop(toplevel)()
+                return self(head, *rest, **kwargs)
         raise TypeError("No dispatch for {0} type".format(typ))
 
 
@@ -125,6 +161,12 @@ def isrealfloat(dt):
     return isinstance(dt, datashape.Unit) and dt in datashape.typesets.floating
 
 
+def is_sparse(data):
+    """Whether ``data`` is an array from the ``sparse`` package (without
+    importing it)"""
+    return type(data).__module__.partition('.')[0] == 'sparse'
+
+
 def isreal(dt):
     """Check if a datashape is numeric and real.
 
@@ -463,10 +505,22 @@ def dshape_from_pandas_helper(col):
     return dshape
 
 
-def dshape_from_pandas(df):
-    """Return a datashape.DataShape object given a pandas dataframe."""
+def dshape_from_pandas(df, columns=None):
+    """Return a datashape.DataShape object given a pandas dataframe,
+    describing only ``columns`` if given."""
+    if columns is None:
+        columns = df.columns
     return len(df) * datashape.Record([(k, dshape_from_pandas_helper(df[k]))
-                                       for k in df.columns])
+                                       for k in columns])
+
+
+def dshape_from_arrow(table):
+    """Return a datashape.DataShape object given a pyarrow Table."""
+    # The columns of an empty slice are converted to pandas without copying
+    # any data, dictionary encoded columns becoming categoricals of their
+    # dictionary. The pandas metadata may refer to dropped index columns.
+    empty = table.slice(0, 0).replace_schema_metadata()
+    return len(table) * dshape_from_pandas(empty.to_pandas()).measure
 
 
 @memoize(key=lambda args, kwargs: tuple(args[0].__dask_keys__()))
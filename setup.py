@@ -45,6 +45,7 @@ extras_require = {
         'flake8',
         'nbsmoke[all] >=0.4.0',
         'fastparquet >=0.1.6',  # optional dependency
+        'sparse',  # optional dependency
         'holoviews >=1.10.0',
     ],
     'examples': examples,